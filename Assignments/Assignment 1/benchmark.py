@@ -0,0 +1,158 @@
+import argparse
+import csv
+import json
+import time
+import numpy as np
+from mip import OptimizationStatus
+from graph import Graph, read_graph
+from dsatur import dsatur_branch_and_bound
+from reduction import reduced_coloring
+from ex3 import ColoringModel, price_and_branch
+
+# Bundled instances
+INSTANCES = ["n3.txt", "n5.txt", "n10.txt", "n20.txt"]
+
+FIELDS = ["instance", "n", "m", "density", "seed", "engine", "repeat",
+          "build_time", "lp_time", "start_time", "solve_time", "nodes", "lp_bound", "optimum", "gap", "optimal"]
+
+def random_graph(n, density, seed):
+    """
+    Generates a random graph where every edge is present with probability density.
+
+    Args:
+        n (int): Number of vertices.
+        density (float): Probability of every edge.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        Graph: The random graph.
+    """
+    rng = np.random.default_rng(seed)
+    v, w = np.triu_indices(n, k=1)
+    keep = rng.random(len(v)) < density
+    return Graph(n, np.stack((v[keep], w[keep]), axis=1))
+
+# Every engine returns (build time, LP time, start time, solve time, nodes, LP bound, optimum, optimal). The start
+# time is the relaxation solved to warm start a MIP, which the solve time does not include. The MIP models
+# are solved by CBC, whose python-mip interface does not report its node count, so their nodes are None.
+
+def run_model(graph, kind, max_seconds, **options):
+    """Benchmarks a ColoringModel: LP bound and optimum of one freshly built model"""
+    start = time.perf_counter()
+    coloring = ColoringModel(graph, kind, **options)
+    coloring.model.verbose = 0
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    lp_bound = coloring.lp_bound()
+    lp_time = time.perf_counter() - start
+
+    # The relaxation of the colour variables that guides the MIP start, timed apart from the MIP itself
+    start_time = None
+    if coloring.optimum is None:
+        start = time.perf_counter()
+        coloring.solve(True, max_seconds)
+        start_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    optimum = coloring.solve(False, max_seconds)
+    solve_time = time.perf_counter() - start
+
+    optimal = coloring.optimum is not None or coloring.model.status == OptimizationStatus.OPTIMAL
+    return build_time, lp_time, start_time, solve_time, None, lp_bound, optimum, optimal
+
+def run_set_cover(graph, max_seconds):
+    """Benchmarks the set cover model: column generation bound and price-and-branch optimum, in one run"""
+    lp_bound, optimum, lp_time, solve_time, nodes, optimal = price_and_branch(graph, False, max_seconds)
+    return None, lp_time, None, solve_time, nodes, lp_bound, optimum, optimal
+
+def run_dsatur(graph, max_seconds):
+    """Benchmarks the DSatur branch & bound"""
+    start = time.perf_counter()
+    optimum, _, nodes = dsatur_branch_and_bound(graph.n, graph.adjacency())
+    return None, None, None, time.perf_counter() - start, nodes, None, optimum, True
+
+def run_reduced(graph, max_seconds):
+    """Benchmarks the reduction + per-component colouring"""
+    start = time.perf_counter()
+    optimum, _, nodes = reduced_coloring(graph)
+    return None, None, None, time.perf_counter() - start, nodes, None, optimum, True
+
+ENGINES = {
+    "binary": lambda graph, max_seconds: run_model(graph, ColoringModel.BINARY, max_seconds),
+    "binary-clique": lambda graph, max_seconds: run_model(graph, ColoringModel.BINARY, max_seconds, formulation=ColoringModel.CLIQUE),
+    "binary-raw": lambda graph, max_seconds: run_model(graph, ColoringModel.BINARY, max_seconds, preprocess=False),
+    "integer": lambda graph, max_seconds: run_model(graph, ColoringModel.INTEGER, max_seconds),
+    "set-cover": run_set_cover,
+    "dsatur": run_dsatur,
+    "reduced": run_reduced,
+}
+
+def benchmark(instances, engines, repeats, max_seconds):
+    """
+    Runs every engine on every instance.
+
+    Args:
+        instances (list): (name, density, seed, Graph) tuples.
+        engines (list): Names of the engines (keys of ENGINES).
+        repeats (int): Number of runs of every engine on every instance.
+        max_seconds (float): Time limit of the MIP solves.
+
+    Returns:
+        list: One record (dict with FIELDS) per run.
+    """
+    records = []
+    for name, density, seed, graph in instances:
+        for engine in engines:
+            for repeat in range(repeats):
+                build_time, lp_time, start_time, solve_time, nodes, lp_bound, optimum, optimal = ENGINES[engine](graph, max_seconds)
+                gap = None
+                if lp_bound is not None and optimum:
+                    gap = (optimum - lp_bound) / optimum
+                records.append({
+                    "instance": name, "n": graph.n, "m": graph.m, "density": density, "seed": seed,
+                    "engine": engine, "repeat": repeat, "build_time": build_time, "lp_time": lp_time, "start_time": start_time,
+                    "solve_time": solve_time,
+                    "nodes": nodes, "lp_bound": lp_bound, "optimum": optimum, "gap": gap, "optimal": optimal,
+                })
+                print("%-16s %-14s %3d  build %8s  lp %8s  start %8s  solve %8.4f  LP %8s  opt %6s" % (
+                    name, engine, repeat,
+                    "-" if build_time is None else "%.4f" % build_time,
+                    "-" if lp_time is None else "%.4f" % lp_time,
+                    "-" if start_time is None else "%.4f" % start_time, solve_time,
+                    "-" if lp_bound is None else "%.3f" % lp_bound, optimum))
+    return records
+
+def write_records(records, path):
+    """Writes the records as JSON if path ends with .json and as CSV otherwise"""
+    with open(path, "w", newline="") as archive:
+        if path.endswith(".json"):
+            json.dump(records, archive, indent=2)
+        else:
+            writer = csv.DictWriter(archive, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(records)
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Benchmark the graph colouring engines and formulations.")
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES), choices=list(ENGINES))
+    parser.add_argument("--instances", nargs="*", default=INSTANCES, help="graph files in the \"n m\" edge-list format")
+    parser.add_argument("--sizes", nargs="*", type=int, default=[10, 15, 20], help="vertices of the random graphs")
+    parser.add_argument("--densities", nargs="*", type=float, default=[0.1, 0.3, 0.5], help="edge densities of the random graphs")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first random graph")
+    parser.add_argument("--repeats", type=int, default=1, help="runs of every engine on every instance")
+    parser.add_argument("--max-seconds", type=float, default=60, help="time limit of every MIP solve")
+    parser.add_argument("--output", default="benchmark.csv", help="results file (.csv or .json)")
+    args = parser.parse_args()
+
+    instances = [(path, None, None, read_graph(path)) for path in args.instances]
+    seed = args.seed
+    for n in args.sizes:
+        for density in args.densities:
+            instances.append(("random-%d-%g" % (n, density), density, seed, random_graph(n, density, seed)))
+            seed += 1
+
+    records = benchmark(instances, args.engines, args.repeats, args.max_seconds)
+    write_records(records, args.output)
+    print("Results written to", args.output)
@@ -0,0 +1,128 @@
+from graph import as_graph, read_graph
+from heuristics import dsatur_coloring, greedy_clique
+
+def adjacency_bits(n, adjacency):
+    """
+    Converts adjacency sets into bitsets: bit w of bits[v] is set if v and w are adjacent.
+    """
+    bits = [0] * n
+    for v in range(n):
+        for w in adjacency[v]:
+            bits[v] |= 1 << w
+    return bits
+
+def dsatur_branch_and_bound(n, adjacency, lower_bound=0, upper_bound=None, colors=None):
+    """
+    Exact colouring by DSatur branch & bound. Vertices are coloured in DSatur
+    order; every vertex is tried with each colour already in use and, if that
+    can still beat the incumbent, with a new colour. The search stops as soon
+    as a colouring with lower_bound colours is found.
+
+    Args:
+        n (int): Number of vertices.
+        adjacency (list): Adjacency sets of the graph.
+        lower_bound (int): Known lower bound on the chromatic number.
+        upper_bound (int): Number of colours of the initial colouring.
+        colors (list): Initial colouring, computed with DSatur if None.
+
+    Returns:
+        tuple: (chromatic number, colouring, number of search nodes).
+    """
+    if n == 0:
+        return 0, [], 0
+
+    if colors is None:
+        upper_bound, colors = dsatur_coloring(n, adjacency)
+
+    # Clique lower bound, its vertices are fixed to the first colours
+    clique = greedy_clique(n, adjacency)
+    lower_bound = max(lower_bound, len(clique))
+
+    best = {"k": upper_bound, "colors": list(colors)}
+    nodes = 0
+    if lower_bound >= upper_bound:
+        return upper_bound, best["colors"], nodes
+
+    bits = adjacency_bits(n, adjacency)
+    current = [-1] * n
+    classes = []
+    uncolored = (1 << n) - 1
+    for k, v in enumerate(clique):
+        current[v] = k
+        classes.append(1 << v)
+        uncolored &= ~(1 << v)
+
+    def select_vertex(uncolored):
+        # Vertex with the highest saturation, ties broken by the uncoloured degree
+        best_v, best_key = -1, (-1, -1)
+        remaining = uncolored
+        while remaining:
+            low = remaining & -remaining
+            v = low.bit_length() - 1
+            remaining ^= low
+            saturation = sum(1 for c in classes if bits[v] & c)
+            key = (saturation, (bits[v] & uncolored).bit_count())
+            if key > best_key:
+                best_v, best_key = v, key
+        return best_v
+
+    def search(uncolored):
+        nonlocal nodes
+        nodes += 1
+
+        # All vertices coloured: new incumbent
+        if uncolored == 0:
+            best["k"] = len(classes)
+            best["colors"] = list(current)
+            return best["k"] <= lower_bound
+
+        v = select_vertex(uncolored)
+        bit = 1 << v
+        uncolored ^= bit
+
+        # Colours already in use
+        for c in range(len(classes)):
+            if bits[v] & classes[c] == 0:
+                current[v] = c
+                classes[c] |= bit
+                done = search(uncolored)
+                classes[c] ^= bit
+                if done:
+                    return True
+
+        # A new colour, only if it can still improve the incumbent
+        if len(classes) + 1 < best["k"]:
+            current[v] = len(classes)
+            classes.append(bit)
+            done = search(uncolored)
+            classes.pop()
+            if done:
+                return True
+
+        current[v] = -1
+        return False
+
+    search(uncolored)
+    return best["k"], best["colors"], nodes
+
+def dsatur_model(graph):
+    """
+    Returns the chromatic number of the graph and an optimal colouring, without calling a MIP solver.
+
+    Args:
+        graph (Graph): Parsed graph, or its "n m" edge-list text.
+
+    Returns:
+        tuple: (chromatic number, colours) where colours[v] is the colour of vertex v.
+    """
+    graph = as_graph(graph)
+    k, colors, _ = dsatur_branch_and_bound(graph.n, graph.adjacency())
+    return k, colors
+
+if __name__ == '__main__':
+
+    archive_name = "n20.txt"
+    graph = read_graph(archive_name)
+
+    print("DSATUR BRANCH AND BOUND")
+    print(dsatur_model(graph))
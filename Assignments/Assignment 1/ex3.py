@@ -1,160 +1,547 @@
 from mip import *
+import math
+import time
+from collections import OrderedDict
+from graph import as_graph, read_graph
+from dsatur import dsatur_branch_and_bound
+from heuristics import dsatur_coloring, greedy_clique, greedy_clique_cover, greedy_independent_set
 import sys
 
-def binary_model(graph, relaxation):
-    """Returns the minimum number of colours using the linear relaxation of the binary model"""
-    
-    # Create a model
-    model = Model()
+# Number of built models kept alive for later solves
+MODEL_CACHE_SIZE = 8
 
-    # Do not output solver statistics
-    model.verbose = 1
+# Number of objective values kept, the relaxation and the MIP of every kept model
+RESULT_CACHE_SIZE = 2 * MODEL_CACHE_SIZE
 
-    ####################################
-    # Getting the data from the graph. #
-    ####################################
+# Built models per (graph digest, kind, options) and objective values per (graph digest, kind, options, relaxation),
+# both least recently used first
+_models = OrderedDict()
+_results = OrderedDict()
 
-    # Number of vertices & number of edges
-    list_graph = graph.split()
-    n, m = int(list_graph[0]), int(list_graph[1])
+class ColoringModel:
+    """
+    A colouring model whose constraints are built once. The same model is
+    then solved as its relaxation (the colour variables X are continuous) or
+    as the MIP (X integral) by only switching the variable types; the MIP is
+    warm-started with a colouring rounded from the relaxed solution.
+    """
 
-    # Getting all edges
-    edges = []
-    for i in range(m):
-        from_vertex, to_vertex = int(list_graph[2+i*2]), int(list_graph[3+i*2])
-        edges.append((from_vertex, to_vertex))
+    BINARY = "binary"
+    INTEGER = "integer"
 
-    #############################
-    # Adding decision variables #
-    #############################
+    # Formulations of the colour conflicts in the binary model
+    EDGE = "edge"
+    CLIQUE = "clique"
 
-    if relaxation:
-        # Continous variables indicating if vertex v has color i
-        X = [[model.add_var(lb=0, ub=1) for v in range(n)] for i in range(n)]
+    def __init__(self, graph, kind, preprocess=True, formulation=EDGE):
+        """
+        Builds the model.
 
-    else:
-        # Binary variables indicating if vertex v has color i
-        X = [[model.add_var(var_type=BINARY) for v in range(n)] for i in range(n)]
+        Args:
+            graph (Graph): Parsed graph, or its "n m" edge-list text.
+            kind (str): ColoringModel.BINARY or ColoringModel.INTEGER.
+            preprocess (bool): Whether to bound the colours of the binary model (DSatur + clique).
+            formulation (str): ColoringModel.EDGE or ColoringModel.CLIQUE conflict rows in the binary model.
+        """
+        self.graph = as_graph(graph)
+        self.kind = kind
 
-    # Binary variables indicating if color i is present in the Graph
-    C = [model.add_var(var_type=BINARY) for i in range(n)]
-        
-    #########################################################################
-    # Objective function: Minimize the number of colors used in the graph. #
-    #########################################################################
+        # Create a model
+        self.model = Model()
 
-    model.objective = minimize(xsum(C[i] for i in range(n)))
+        # Do not output solver statistics
+        self.model.verbose = 1
 
-    ######################################
-    # Function subject to (CONSTRAINTS): #
-    ######################################
+        # Objective value known without solving the MIP
+        self.optimum = None
 
-    # Every node has a single color
-    for v in range(n):
-        model += xsum(X[v][i] for i in range(n)) == 1
+        # Relaxed solution of the colour variables X, used to warm start the MIP
+        self.relaxed_solution = None
 
-    # Color conflict constraint: 2 adjacent nodes cannot have the same color
-    for edge in edges:
-        v = edge[0]
-        w = edge[1]
-        for i in range(n):
-            model += X[v][i] + X[w][i] <= 1
+        if kind == ColoringModel.BINARY:
+            self._build_binary(preprocess, formulation)
+        else:
+            self._build_integer()
 
-    # Handling C variable: A node v cannot have color i if variable C[i] == 0 
-    for v in range(n):
-        for i in range(n):
-            model += X[v][i] <= C[i]
+    def _build_binary(self, preprocess, formulation):
+        """Builds the binary model: X[v][i] indicates if vertex v has colour i"""
+        model = self.model
 
-    # All colors assigned to vertices must be used colors
-    for i in range(n):
-        model += xsum(X[v][i] for v in range(n)) >= C[i]
+        ####################################
+        # Getting the data from the graph. #
+        ####################################
 
-    # Solve the model and return the objective value
-    model.optimize()
-    return model.objective_value
+        # Number of vertices & number of edges
+        n, m = self.graph.n, self.graph.m
 
-def integer_model(graph, relaxation):
-    """Returns the minimum number of colours using the linear relaxation of the integer model"""
-    
-    # Create a model
-    model = Model()
+        # Getting all edges
+        edges = self.graph.edge_list()
 
-    # Do not output solver statistics
-    model.verbose = 1
+        ###################################################
+        # Preprocessing: bounds on the number of colours. #
+        ###################################################
 
-    ####################################
-    # Getting the data from the graph. #
-    ####################################
+        # Without preprocessing every vertex may need its own colour
+        H, clique = n, []
 
-    # Number of vertices & number of edges
-    list_graph = graph.split()
-    n, m = int(list_graph[0]), int(list_graph[1])
+        if preprocess:
+            adjacency = self.graph.adjacency()
 
-    # Big M
-    M = n
+            # Upper bound: the colours used by DSatur are enough
+            H, _ = dsatur_coloring(n, adjacency)
 
-    # Getting all edges
-    edges = []
-    for i in range(m):
-        from_vertex, to_vertex = int(list_graph[2+i*2]), int(list_graph[3+i*2])
-        edges.append((from_vertex, to_vertex))
+            # Lower bound: every vertex of a clique needs a different colour
+            clique = greedy_clique(n, adjacency)
 
-    #############################
-    # Adding decision variables #
-    #############################
+            # Both bounds meet, the heuristic colouring is optimal
+            if len(clique) == H:
+                self.optimum = H
 
-    if relaxation:
-        # Continous variables indicating if vertex v has color i
-        X = [model.add_var(lb=1, ub=n) for _ in range(n)]
+        #############################
+        # Adding decision variables #
+        #############################
+
+        # Binary variables indicating if vertex v has color i
+        X = [[model.add_var(var_type=BINARY) for i in range(H)] for v in range(n)]
+
+        # Binary variables indicating if color i is present in the Graph
+        C = [model.add_var(var_type=BINARY) for i in range(H)]
+
+        # The k-th vertex of the clique gets the k-th colour
+        for k, v in enumerate(clique):
+            X[v][k].lb = 1
+            
+        #########################################################################
+        # Objective function: Minimize the number of colors used in the graph. #
+        #########################################################################
+
+        model.objective = minimize(xsum(C[i] for i in range(H)))
+
+        ######################################
+        # Function subject to (CONSTRAINTS): #
+        ######################################
+
+        # Every node has a single color
+        for v in range(n):
+            model += xsum(X[v][i] for i in range(H)) == 1
+
+        if formulation == ColoringModel.CLIQUE:
+            # Clique constraint: at most one node of a clique has color i, and only if C[i] == 1.
+            # The cliques cover every edge and every node, so the two families below are implied.
+            for clique_cover in greedy_clique_cover(n, self.graph.adjacency()):
+                for i in range(H):
+                    model += xsum(X[v][i] for v in clique_cover) <= C[i]
+
+        else:
+            # Color conflict constraint: 2 adjacent nodes cannot have the same color
+            for edge in edges:
+                v = edge[0]
+                w = edge[1]
+                for i in range(H):
+                    model += X[v][i] + X[w][i] <= 1
+
+            # Handling C variable: A node v cannot have color i if variable C[i] == 0 
+            for v in range(n):
+                for i in range(H):
+                    model += X[v][i] <= C[i]
+
+        # All colors assigned to vertices must be used colors
+        for i in range(H):
+            model += xsum(X[v][i] for v in range(n)) >= C[i]
+
+        # Symmetry breaking: colour i+1 can only be used if colour i is used
+        if preprocess:
+            for i in range(H - 1):
+                model += C[i] >= C[i+1]
+
+        self.X, self.C, self.H, self.clique = X, C, H, clique
+        self.relaxable = [x for row in X for x in row]
+
+    def _build_integer(self):
+        """Builds the integer model: X[v] is the colour of vertex v"""
+        model = self.model
+
+        ####################################
+        # Getting the data from the graph. #
+        ####################################
+
+        # Number of vertices & number of edges
+        n, m = self.graph.n, self.graph.m
+
+        # Big M
+        M = n
+
+        # Getting all edges
+        edges = self.graph.edge_list()
+
+        #############################
+        # Adding decision variables #
+        #############################
 
-    else:
         # Integer variables indicating the color of vertex v
         X = [model.add_var(var_type=INTEGER, lb=1, ub=n) for v in range(n)]
 
-    # Binary variables modeling OR restrictions for adjacent vertices to have different colors
-    z = [model.add_var(var_type=BINARY) for i in range(m)]
+        # Binary variables modeling OR restrictions for adjacent vertices to have different colors
+        z = [model.add_var(var_type=BINARY) for i in range(m)]
 
-    # Integer variable indicating the number of colors used
-    c  = model.add_var(var_type=INTEGER, lb=1, ub=n)
+        # Integer variable indicating the number of colors used
+        c  = model.add_var(var_type=INTEGER, lb=1, ub=n)
 
-    #########################################################################
-    # Objective function: Minimize the number of colors used in the graph. #
-    #########################################################################
+        #########################################################################
+        # Objective function: Minimize the number of colors used in the graph. #
+        #########################################################################
 
-    # model.objective = minimize(xsum(X[v] for v in range(n)))
-    model.objective = minimize(c)
+        # model.objective = minimize(xsum(X[v] for v in range(n)))
+        model.objective = minimize(c)
 
-    ###########################
-    # Constraints subject to: #
-    ###########################
+        ###########################
+        # Constraints subject to: #
+        ###########################
+
+        # X[v] != X[w] if v and w are adjacent
+        for i in range(m):
+            v = edges[i][0]
+            w = edges[i][1]
+            model += X[v] - X[w] >= 1 - M*z[i], "OR constraint 1"
+            model += X[w] - X[v] >= 1 - M*(1-z[i]), "OR constraint 2"
+        
+        # All colors must be less than the number of colors used
+        for v in range(n):
+            model += X[v] <= c, "all colors less than C"
+
+        self.X, self.z, self.c, self.edges = X, z, c, edges
+        self.relaxable = X
+
+    def lp_bound(self):
+        """Returns the bound of the full linear relaxation (all variables continuous)"""
+        self.model.optimize(relax=True)
+        return self.model.objective_value
+
+    def _round_relaxed_solution(self):
+        """
+        Greedily colours the vertices in the order (and with the colour
+        preference) suggested by the relaxed solution.
+
+        Returns:
+            list: colours[v] is the colour of vertex v.
+        """
+        n = self.graph.n
+        adjacency = self.graph.adjacency()
+        colors = [-1] * n
+
+        if self.kind == ColoringModel.BINARY:
+            # Most decided vertices first, each with its largest admissible colour value
+            order = sorted(range(n), key=lambda v: -max(self.relaxed_solution[v], default=0))
+            preference = lambda v: sorted(range(self.H), key=lambda i: -self.relaxed_solution[v][i])
+        else:
+            # Vertices with the smallest relaxed colour first
+            order = sorted(range(n), key=lambda v: self.relaxed_solution[v])
+            preference = lambda v: range(n)
+
+        for v in order:
+            used = {colors[w] for w in adjacency[v]}
+            colors[v] = next((i for i in preference(v) if i not in used), -1)
+        return colors
+
+    def _warm_start(self):
+        """Sets a MIP start from the rounded relaxed solution (or DSatur if the rounding does not fit)"""
+        n = self.graph.n
+        if self.relaxed_solution is None:
+            return
+        colors = self._round_relaxed_solution()
+
+        if self.kind == ColoringModel.BINARY:
+            # Clique colours stay fixed, the other used colours are compacted behind them
+            q = len(self.clique)
+            labels = {i: i for i in range(q)}
+            for i in sorted(set(colors) - set(range(q))):
+                labels[i] = len(labels)
+            if -1 in colors or len(labels) > self.H:
+                return
+            colors = [labels[i] for i in colors]
+
+            start = [(self.X[v][colors[v]], 1) for v in range(n)]
+            start += [(self.C[i], 1) for i in range(len(labels))]
+        else:
+            start = [(self.X[v], colors[v] + 1) for v in range(n)]
+            start += [(self.z[i], 0 if colors[v] > colors[w] else 1) for i, (v, w) in enumerate(self.edges)]
+            start += [(self.c, max(colors, default=0) + 1)]
+
+        self.model.start = start
+
+    def solve(self, relaxation, max_seconds=INF):
+        """
+        Solves the model.
+
+        Args:
+            relaxation (bool): Whether to solve the relaxation (X continuous) or the MIP.
+            max_seconds (float): Time limit of the solver.
+
+        Returns:
+            float: The objective value.
+        """
+        if relaxation:
+            for x in self.relaxable:
+                x.var_type = CONTINUOUS
+            self.model.optimize(max_seconds=max_seconds)
+
+            # Nothing to warm start with if the time limit was hit before a solution
+            if self.model.num_solutions == 0:
+                return self.model.objective_value
+
+            if self.kind == ColoringModel.BINARY:
+                self.relaxed_solution = [[x.x for x in row] for row in self.X]
+            else:
+                self.relaxed_solution = [x.x for x in self.X]
+            return self.model.objective_value
+
+        if self.optimum is not None:
+            return self.optimum
+
+        # The relaxed solution guides the MIP start
+        if self.relaxed_solution is None:
+            self.solve(True, max_seconds)
+
+        for x in self.relaxable:
+            x.var_type = BINARY if self.kind == ColoringModel.BINARY else INTEGER
+        self._warm_start()
+        self.model.optimize(max_seconds=max_seconds)
+        return self.model.objective_value
+
+def memoized(key, compute):
+    """Returns the cached objective value for key, computing (and caching) it if needed"""
+    if key in _results:
+        _results.move_to_end(key)
+    else:
+        _results[key] = compute()
+        if len(_results) > RESULT_CACHE_SIZE:
+            _results.popitem(last=False)
+    return _results[key]
+
+def solve_model(graph, kind, relaxation, **options):
+    """
+    Returns the objective value of the given colouring model. Built models and
+    objective values are cached, so the relaxation and the MIP of a graph share
+    one model and repeated requests are answered without solving again.
+
+    Args:
+        graph (Graph): Parsed graph, or its "n m" edge-list text.
+        kind (str): ColoringModel.BINARY or ColoringModel.INTEGER.
+        relaxation (bool): Whether to solve the relaxation or the MIP.
+        options: Keyword arguments for the ColoringModel.
+
+    Returns:
+        float: The objective value.
+    """
+    graph = as_graph(graph)
+    key = (graph.digest(), kind, tuple(sorted(options.items())))
+
+    def compute():
+        if key in _models:
+            _models.move_to_end(key)
+        else:
+            _models[key] = ColoringModel(graph, kind, **options)
+            if len(_models) > MODEL_CACHE_SIZE:
+                _models.popitem(last=False)
+        return _models[key].solve(relaxation)
+
+    return memoized(key + (relaxation,), compute)
+
+def binary_model(graph, relaxation, preprocess=True, formulation=ColoringModel.EDGE):
+    """Returns the minimum number of colours using the linear relaxation of the binary model.
+    The graph is a parsed Graph (see graph.read_graph); edge-list text is parsed on the fly."""
+    return solve_model(graph, ColoringModel.BINARY, relaxation, preprocess=preprocess, formulation=formulation)
+
+def integer_model(graph, relaxation):
+    """Returns the minimum number of colours using the linear relaxation of the integer model.
+    The graph is a parsed Graph (see graph.read_graph); edge-list text is parsed on the fly."""
+    return solve_model(graph, ColoringModel.INTEGER, relaxation)
 
-    # X[v] != X[w] if v and w are adjacent
-    for i in range(m):
-        v = edges[i][0]
-        w = edges[i][1]
-        model += X[v] - X[w] >= 1 - M*z[i], "OR constraint 1"
-        model += X[w] - X[v] >= 1 - M*(1-z[i]), "OR constraint 2"
-    
-    # All colors must be less than the number of colors used
-    for v in range(n):
-        model += X[v] <= c, "all colors less than C"
+def compare_formulations(graph, preprocess=True):
+    """
+    Prints (and returns) the size and the bounds of the edge and clique formulations of the binary model.
+
+    Args:
+        graph (Graph): Parsed graph, or its "n m" edge-list text.
+        preprocess (bool): Whether to bound the colours (DSatur + clique).
+
+    Returns:
+        list: One (formulation, variables, rows, LP bound, relaxation bound) tuple per formulation.
+    """
+    graph = as_graph(graph)
+    report = []
+    for formulation in (ColoringModel.EDGE, ColoringModel.CLIQUE):
+        coloring = ColoringModel(graph, ColoringModel.BINARY, preprocess, formulation)
+        coloring.model.verbose = 0
+        report.append((formulation, coloring.model.num_cols, coloring.model.num_rows, coloring.lp_bound(), coloring.solve(True)))
+
+    print("%-12s %10s %10s %10s %12s" % ("formulation", "variables", "rows", "LP bound", "relaxation"))
+    for formulation, cols, rows, lp, relaxed in report:
+        print("%-12s %10d %10d %10.4f %12.4f" % (formulation, cols, rows, lp, relaxed))
+    return report
+
+def maximum_weight_independent_set(n, edges, weights):
+    """Returns a maximum weight independent set of the graph and its weight"""
+
+    model = Model(sense=MAXIMIZE)
+    model.verbose = 0
+
+    # Binary variables indicating if vertex v is in the set
+    Y = [model.add_var(var_type=BINARY) for v in range(n)]
+
+    model.objective = xsum(weights[v] * Y[v] for v in range(n))
+
+    # Adjacent vertices cannot both be in the set
+    for v, w in edges:
+        model += Y[v] + Y[w] <= 1
 
-    # Solve the model and return the objective value
     model.optimize()
-    return model.objective_value
-
-archive_name = "n10.txt"
-with open(archive_name, "r") as archivo:
-    graph = archivo.read()
-
-
-# print("BINARY MODEL NO RELAXATION")
-# print(binary_model(graph, False))
-# print('-'*50)
-# print("BINARY MODEL WITH RELAXATION")
-# print(binary_model(graph, True))
-print("INTEGER MODEL NO RELAXATION")
-print(integer_model(graph, False))
-print('-'*50)
-print("INTEGER MODEL WITH RELAXATION")
-print(integer_model(graph, True))
\ No newline at end of file
+    independent = [v for v in range(n) if Y[v].x >= 0.5]
+    return independent, sum(weights[v] for v in independent)
+
+def set_cover_model(graph, relaxation):
+    """Returns the minimum number of colours using the independent set (set cover) model.
+    Columns are maximal independent sets generated by column generation; without
+    relaxation the remaining integrality gap is closed with DSatur branch & bound."""
+    graph = as_graph(graph)
+    return memoized((graph.digest(), "set_cover", (), relaxation), lambda: column_generation(graph, relaxation))
+
+def column_generation(graph, relaxation):
+    """Solves the set cover model by column generation (see set_cover_model)"""
+    lower_bound, k, _, _, _, _ = price_and_branch(graph, relaxation)
+    return lower_bound if relaxation else k
+
+def price_and_branch(graph, relaxation=False, max_seconds=INF):
+    """
+    Solves the set cover model in two phases: column generation of the LP
+    bound, then the integer master over the generated columns with the gap
+    closed by DSatur branch & bound.
+
+    Args:
+        graph (Graph): Parsed graph, or its "n m" edge-list text.
+        relaxation (bool): Whether to stop after the LP phase.
+        max_seconds (float): Time limit of both phases (the DSatur search is not limited).
+
+    Returns:
+        tuple: (LP bound, chromatic number, seconds of the LP phase, seconds of the integer phase,
+        DSatur search nodes, whether both phases finished within the time limit). The LP bound is None
+        if the time limit stopped the pricing, the chromatic number is None with relaxation.
+    """
+    start = time.perf_counter()
+    deadline = start + max_seconds
+
+    # Reduced costs above -EPSILON do not improve the master problem
+    EPSILON = 1e-6
+
+    ####################################
+    # Getting the data from the graph. #
+    ####################################
+
+    graph = as_graph(graph)
+    n = graph.n
+    edges = graph.edge_list()
+    adjacency = graph.adjacency()
+
+    if n == 0:
+        return 0, None if relaxation else 0, 0.0, 0.0, 0, True
+
+    # The colour classes of DSatur are the initial columns
+    H, colors = dsatur_coloring(n, adjacency)
+    columns = [greedy_independent_set(n, adjacency, [0] * n, [v for v in range(n) if colors[v] == i]) for i in range(H)]
+
+    ###################################
+    # Restricted master problem (LP). #
+    ###################################
+
+    model = Model()
+    model.verbose = 0
+
+    # Variables indicating if independent set S is a colour class
+    L = [model.add_var(obj=1) for S in columns]
+
+    # Every vertex is covered by at least one independent set
+    cover = [model.add_constr(xsum(L[j] for j, S in enumerate(columns) if v in S) >= 1) for v in range(n)]
+
+    #######################################################
+    # Column generation: price maximal independent sets. #
+    #######################################################
+
+    finished = True
+    while True:
+        if time.perf_counter() >= deadline:
+            finished = False
+            break
+        model.optimize(relax=True)
+        duals = [cover[v].pi for v in range(n)]
+
+        # Greedy pricing first, exact pricing only if the greedy set does not price out
+        S = greedy_independent_set(n, adjacency, duals)
+        if sum(duals[v] for v in S) <= 1 + EPSILON:
+            S, weight = maximum_weight_independent_set(n, edges, duals)
+            if weight <= 1 + EPSILON:
+                break
+            S = greedy_independent_set(n, adjacency, duals, S)
+
+        columns.append(S)
+        L.append(model.add_var(obj=1, column=Column(constrs=[cover[v] for v in S], coeffs=[1] * len(S))))
+
+    # Without all columns priced, the restricted master does not bound the chromatic number
+    lower_bound = model.objective_value if finished else None
+    lp_time = time.perf_counter() - start
+    if relaxation:
+        return lower_bound, None, lp_time, 0.0, 0, finished
+    start = time.perf_counter()
+
+    ###########################################
+    # Integer master over generated columns. #
+    ###########################################
+
+    for l in L:
+        l.var_type = BINARY
+    if finished and time.perf_counter() < deadline:
+        finished = model.optimize(max_seconds=deadline - time.perf_counter()) == OptimizationStatus.OPTIMAL
+    else:
+        finished = False
+
+    # Colour every vertex with the first selected independent set containing it
+    colors = [-1] * n
+    selected = [S for S, l in zip(columns, L) if l.x is not None and l.x >= 0.5]
+    for i, S in enumerate(selected):
+        for v in S:
+            if colors[v] == -1:
+                colors[v] = i
+
+    # Without a cover from the integer master (time limit), DSatur starts from its own colouring
+    if -1 in colors:
+        H, colors = dsatur_coloring(n, adjacency)
+        selected = range(H)
+
+    # Close the remaining gap (if any) with DSatur branch & bound
+    known = 0 if lower_bound is None else math.ceil(lower_bound - EPSILON)
+    k, _, nodes = dsatur_branch_and_bound(n, adjacency, known, len(selected), colors)
+    return lower_bound, k, lp_time, time.perf_counter() - start, nodes, finished
+
+if __name__ == '__main__':
+
+    archive_name = "n10.txt"
+    graph = read_graph(archive_name)
+
+    # print("BINARY MODEL NO RELAXATION")
+    # print(binary_model(graph, False))
+    # print('-'*50)
+    # print("BINARY MODEL WITH RELAXATION")
+    # print(binary_model(graph, True))
+    # print('-'*50)
+    # print("BINARY MODEL FORMULATIONS")
+    # compare_formulations(graph)
+    print("INTEGER MODEL NO RELAXATION")
+    print(integer_model(graph, False))
+    print('-'*50)
+    print("INTEGER MODEL WITH RELAXATION")
+    print(integer_model(graph, True))
+    # print('-'*50)
+    # print("SET COVER MODEL NO RELAXATION")
+    # print(set_cover_model(graph, False))
+    # print('-'*50)
+    # print("SET COVER MODEL WITH RELAXATION")
+    # print(set_cover_model(graph, True))
\ No newline at end of file
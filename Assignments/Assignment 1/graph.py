@@ -0,0 +1,143 @@
+import hashlib
+import os
+import numpy as np
+
+# Directory (next to the graph file) of the memory-mapped copies of the parsed graphs
+CACHE_DIRECTORY = "__graphcache__"
+
+class Graph:
+    """
+    Undirected graph in compressed sparse row (CSR) form. The neighbours of
+    vertex v are neighbors[offsets[v]:offsets[v+1]].
+
+    Attributes:
+        n (int): Number of vertices.
+        m (int): Number of (distinct, non-loop) edges.
+        edges (np.ndarray): m x 2 array of edges with from_vertex < to_vertex.
+        offsets (np.ndarray): n + 1 offsets into neighbors.
+        neighbors (np.ndarray): Concatenated neighbour lists, sorted per vertex.
+    """
+
+    def __init__(self, n, edges):
+        """
+        Builds the CSR adjacency from an edge array.
+
+        Args:
+            n (int): Number of vertices.
+            edges (np.ndarray): Array of shape (m, 2) with the endpoints of every edge.
+
+        Raises:
+            ValueError: If an endpoint is not a vertex id in 0..n-1.
+        """
+        edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+        if len(edges) > 0 and (edges.min() < 0 or edges.max() >= n):
+            raise ValueError("Edge endpoints must be vertex ids in 0..%d, got %d..%d" % (n - 1, edges.min(), edges.max()))
+
+        # Drop self loops and duplicated edges
+        low, high = np.minimum(edges[:, 0], edges[:, 1]), np.maximum(edges[:, 0], edges[:, 1])
+        keys = np.unique(low[low != high] * n + high[low != high])
+        self.edges = np.stack((keys // n, keys % n), axis=1) if n > 0 else np.empty((0, 2), dtype=np.int64)
+
+        self.n = n
+        self.m = len(self.edges)
+
+        # Every edge appears in the lists of both endpoints
+        sources = np.concatenate((self.edges[:, 0], self.edges[:, 1]))
+        targets = np.concatenate((self.edges[:, 1], self.edges[:, 0]))
+        order = np.lexsort((targets, sources))
+        self.neighbors = targets[order]
+        self.offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=n), out=self.offsets[1:])
+
+        self._adjacency = None
+        self._digest = None
+
+    def degree(self, v):
+        """Returns the degree of vertex v."""
+        return int(self.offsets[v+1] - self.offsets[v])
+
+    def neighbors_of(self, v):
+        """Returns the neighbours of vertex v as a view on the CSR array."""
+        return self.neighbors[self.offsets[v]:self.offsets[v+1]]
+
+    def edge_list(self):
+        """Returns the edges as a list of (from_vertex, to_vertex) tuples."""
+        return [tuple(edge) for edge in self.edges.tolist()]
+
+    def digest(self):
+        """Returns (and caches) a hash of the graph, used as key for cached models and results."""
+        if self._digest is None:
+            h = hashlib.sha1(str(self.n).encode())
+            h.update(np.ascontiguousarray(self.edges).tobytes())
+            self._digest = h.hexdigest()
+        return self._digest
+
+    def adjacency(self):
+        """Returns (and caches) the adjacency sets used by the colouring heuristics."""
+        if self._adjacency is None:
+            neighbors = self.neighbors.tolist()
+            offsets = self.offsets.tolist()
+            self._adjacency = [set(neighbors[offsets[v]:offsets[v+1]]) for v in range(self.n)]
+        return self._adjacency
+
+def _from_tokens(tokens):
+    """
+    Builds a Graph from the flat integer array "n m v0 w0 v1 w1 ...".
+
+    Raises:
+        ValueError: If the number of integers does not match the number of edges m.
+    """
+    if len(tokens) < 2:
+        raise ValueError("Expected the number of vertices and edges, got %d integers" % len(tokens))
+    n, m = int(tokens[0]), int(tokens[1])
+    if len(tokens) != 2 + 2 * m:
+        raise ValueError("Expected %d integers for %d edges, got %d" % (2 + 2 * m, m, len(tokens)))
+    return Graph(n, tokens[2:])
+
+def parse_graph(graph):
+    """
+    Parses a graph in the "n m" edge-list format from a string.
+
+    Args:
+        graph (str): Number of vertices and edges followed by one edge per line.
+
+    Returns:
+        Graph: The parsed graph.
+    """
+    return _from_tokens(np.fromstring(graph, dtype=np.int64, sep=' '))
+
+def read_graph(path, mmap=False):
+    """
+    Reads a graph in the "n m" edge-list format from a file. The integers are
+    parsed in bulk by NumPy, without building a Python list of tokens.
+
+    With mmap=True the parsed integers are stored as <name>.npy in the cache
+    directory next to the file (see CACHE_DIRECTORY) and later reads memory-map
+    that array instead of parsing the text again, which pays off for edge lists
+    with millions of lines.
+
+    Args:
+        path (str): Path of the graph file.
+        mmap (bool): Whether to use (and create) the memory-mapped binary copy.
+
+    Returns:
+        Graph: The parsed graph.
+    """
+    if not mmap:
+        return _from_tokens(np.fromfile(path, dtype=np.int64, sep=' '))
+
+    directory, name = os.path.split(os.path.abspath(path))
+    cache = os.path.join(directory, CACHE_DIRECTORY, name + ".npy")
+    if not os.path.exists(cache) or os.path.getmtime(cache) < os.path.getmtime(path):
+        os.makedirs(os.path.dirname(cache), exist_ok=True)
+        # Written under a temporary name, so that parallel readers never see a partial file
+        temporary = "%s.%d.tmp.npy" % (cache[:-4], os.getpid())
+        np.save(temporary, np.fromfile(path, dtype=np.int64, sep=' '))
+        os.replace(temporary, cache)
+    return _from_tokens(np.load(cache, mmap_mode='r'))
+
+def as_graph(graph):
+    """Returns graph as a Graph, parsing it first if it is still the edge-list text."""
+    if isinstance(graph, Graph):
+        return graph
+    return parse_graph(graph)
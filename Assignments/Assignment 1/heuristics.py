@@ -0,0 +1,126 @@
+def dsatur_coloring(n, adjacency):
+    """
+    Colours the graph with the DSatur heuristic: repeatedly colour the vertex
+    with the most distinct colours among its neighbours (ties broken by degree)
+    with the smallest colour that is still free.
+
+    Args:
+        n (int): Number of vertices.
+        adjacency (list): Adjacency sets of the graph.
+
+    Returns:
+        tuple: (number of colours used, colours) where colours[v] is the colour of v.
+    """
+    colors = [-1] * n
+    saturation = [set() for _ in range(n)]
+    uncolored = set(range(n))
+
+    while uncolored:
+        # Most saturated vertex, ties broken by the degree
+        v = max(uncolored, key=lambda u: (len(saturation[u]), len(adjacency[u])))
+        uncolored.remove(v)
+
+        # Smallest colour not used by a neighbour
+        color = 0
+        while color in saturation[v]:
+            color += 1
+        colors[v] = color
+
+        for w in adjacency[v]:
+            saturation[w].add(color)
+
+    return (max(colors) + 1 if n > 0 else 0), colors
+
+def greedy_clique(n, adjacency):
+    """
+    Finds a large clique greedily. From every vertex a clique is grown by
+    repeatedly adding the candidate with the most neighbours among the
+    remaining candidates; the largest clique found is returned.
+
+    Args:
+        n (int): Number of vertices.
+        adjacency (list): Adjacency sets of the graph.
+
+    Returns:
+        list: Vertices of the clique, in the order they were added.
+    """
+    best = []
+    for start in sorted(range(n), key=lambda v: len(adjacency[v]), reverse=True):
+        # A clique through start can never be larger than deg(start) + 1
+        if len(adjacency[start]) + 1 <= len(best):
+            break
+
+        clique = [start]
+        candidates = set(adjacency[start])
+        while candidates:
+            v = max(candidates, key=lambda u: len(adjacency[u] & candidates))
+            clique.append(v)
+            candidates &= adjacency[v]
+
+        if len(clique) > len(best):
+            best = clique
+
+    return best
+
+def greedy_independent_set(n, adjacency, weights, start=()):
+    """
+    Grows a maximal independent set greedily, adding the vertices by
+    decreasing weight (ties broken by increasing degree).
+
+    Args:
+        n (int): Number of vertices.
+        adjacency (list): Adjacency sets of the graph.
+        weights (list): Weight of every vertex.
+        start (iterable): Independent vertices the set has to contain.
+
+    Returns:
+        list: Vertices of the independent set.
+    """
+    independent = list(start)
+    blocked = set(independent)
+    for v in independent:
+        blocked |= adjacency[v]
+
+    for v in sorted(range(n), key=lambda u: (-weights[u], len(adjacency[u]))):
+        if v not in blocked:
+            independent.append(v)
+            blocked.add(v)
+            blocked |= adjacency[v]
+
+    return independent
+
+def greedy_clique_cover(n, adjacency):
+    """
+    Covers every edge (and every isolated vertex) of the graph with cliques.
+    For each still uncovered edge a clique is grown greedily from its two
+    endpoints, preferring vertices that cover more uncovered edges.
+
+    Args:
+        n (int): Number of vertices.
+        adjacency (list): Adjacency sets of the graph.
+
+    Returns:
+        list: The cliques, as lists of vertices.
+    """
+    uncovered = [set(adjacency[v]) for v in range(n)]
+    cliques = []
+
+    for v in sorted(range(n), key=lambda u: len(adjacency[u]), reverse=True):
+        # An isolated vertex is a clique on its own
+        if not adjacency[v]:
+            cliques.append([v])
+
+        while uncovered[v]:
+            w = max(uncovered[v], key=lambda u: len(uncovered[u]))
+            clique = [v, w]
+            candidates = adjacency[v] & adjacency[w]
+            while candidates:
+                u = max(candidates, key=lambda u: (len(uncovered[u].intersection(clique)), len(adjacency[u] & candidates)))
+                clique.append(u)
+                candidates &= adjacency[u]
+
+            for u in clique:
+                uncovered[u].difference_update(clique)
+            cliques.append(clique)
+
+    return cliques
@@ -0,0 +1,179 @@
+from concurrent.futures import ProcessPoolExecutor
+from graph import as_graph, read_graph
+from dsatur import dsatur_branch_and_bound
+from heuristics import greedy_clique
+
+# Kernels smaller than this are coloured in the main process (not worth a worker)
+PARALLEL_MIN_VERTICES = 40
+
+def connected_components(adjacency, vertices):
+    """
+    Splits the subgraph induced by vertices into its connected components.
+
+    Args:
+        adjacency (list): Adjacency sets of the graph.
+        vertices (iterable): Vertices of the subgraph.
+
+    Returns:
+        list: One list of vertices per component.
+    """
+    remaining = set(vertices)
+    components = []
+    while remaining:
+        start = remaining.pop()
+        component, stack = [start], [start]
+        while stack:
+            v = stack.pop()
+            for w in adjacency[v]:
+                if w in remaining:
+                    remaining.remove(w)
+                    component.append(w)
+                    stack.append(w)
+        components.append(component)
+    return components
+
+def relabel(adjacency, vertices):
+    """Returns the adjacency sets of the subgraph induced by vertices, relabelled to 0..len(vertices)-1"""
+    index = {v: i for i, v in enumerate(vertices)}
+    return [{index[w] for w in adjacency[v] if w in index} for v in vertices]
+
+def reduce_component(adjacency, vertices, lower_bound):
+    """
+    Removes vertices that do not change the chromatic number, until none is left:
+    vertices of degree below lower_bound (they can always be coloured afterwards
+    with one of lower_bound colours) and vertices v dominated by a non-adjacent
+    vertex u with N(v) contained in N(u) (v can take the colour of u).
+
+    Args:
+        adjacency (list): Adjacency sets of the graph.
+        vertices (list): Vertices of the component.
+        lower_bound (int): Lower bound on the chromatic number of the graph.
+
+    Returns:
+        tuple: (kernel vertices, removed) where removed lists (v, u) in removal
+        order, u being the dominating vertex or None for a low degree vertex.
+    """
+    alive = set(vertices)
+    neighbours = {v: adjacency[v] & alive for v in alive}
+    removed = []
+
+    def remove(v, u):
+        alive.remove(v)
+        for w in neighbours.pop(v):
+            neighbours[w].discard(v)
+        removed.append((v, u))
+
+    changed = True
+    while changed:
+        changed = False
+
+        # Peel vertices of low degree
+        stack = [v for v in alive if len(neighbours[v]) < lower_bound]
+        while stack:
+            v = stack.pop()
+            if v in alive and len(neighbours[v]) < lower_bound:
+                touched = neighbours[v]
+                remove(v, None)
+                stack.extend(touched)
+                changed = True
+
+        # Drop dominated vertices
+        for v in sorted(alive, key=lambda v: len(neighbours[v])):
+            if v not in alive:
+                continue
+            candidates = set().union(*(neighbours[w] for w in neighbours[v])) - neighbours[v] - {v}
+            u = next((u for u in candidates if neighbours[v] <= neighbours[u]), None)
+            if u is not None:
+                remove(v, u)
+                changed = True
+
+    return list(alive), removed
+
+def color_kernel(kernel, adjacency, lower_bound):
+    """
+    Colours a kernel exactly with DSatur branch & bound (run in the worker processes).
+
+    Args:
+        kernel (list): Vertices of the kernel.
+        adjacency (list): Adjacency sets of the kernel, relabelled to 0..len(kernel)-1.
+        lower_bound (int): A colouring with this many colours is good enough.
+
+    Returns:
+        tuple: (kernel, colours of the kernel vertices, number of search nodes).
+    """
+    _, colors, nodes = dsatur_branch_and_bound(len(kernel), adjacency, lower_bound)
+    return kernel, colors, nodes
+
+def reduced_coloring(graph, processes=None):
+    """
+    Colours the graph by splitting it into connected components, reducing every
+    component (low degree and dominated vertices) and colouring the remaining
+    kernels independently on a process pool. The removed vertices are coloured
+    back afterwards, in reverse order of removal.
+
+    Args:
+        graph (Graph): Parsed graph, or its "n m" edge-list text.
+        processes (int): Number of worker processes (all cores if None).
+
+    Returns:
+        tuple: (chromatic number, colours, number of search nodes of all kernels) where colours[v] is the colour of vertex v.
+    """
+    graph = as_graph(graph)
+    n = graph.n
+    adjacency = graph.adjacency()
+    if n == 0:
+        return 0, [], 0
+
+    #####################################################
+    # Components, lower bound and reduction to kernels. #
+    #####################################################
+
+    components = connected_components(adjacency, range(n))
+
+    # The largest clique of any component bounds the whole graph
+    lower_bound = max(len(greedy_clique(len(c), relabel(adjacency, c))) for c in components)
+
+    kernels, removed = [], []
+    for component in components:
+        kernel, removed_component = reduce_component(adjacency, component, lower_bound)
+        kernels += connected_components(adjacency, kernel)
+        removed += removed_component
+
+    ##############################################
+    # Colour the kernels (large ones in parallel) #
+    ##############################################
+
+    colors = [-1] * n
+    small = [k for k in kernels if len(k) < PARALLEL_MIN_VERTICES]
+    large = [k for k in kernels if len(k) >= PARALLEL_MIN_VERTICES]
+
+    results = [color_kernel(k, relabel(adjacency, k), lower_bound) for k in small]
+    if large:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = [pool.submit(color_kernel, k, relabel(adjacency, k), lower_bound) for k in large]
+            results += [future.result() for future in futures]
+
+    for kernel, kernel_colors, _ in results:
+        for v, color in zip(kernel, kernel_colors):
+            colors[v] = color
+
+    ###############################
+    # Colour the removed vertices #
+    ###############################
+
+    for v, u in reversed(removed):
+        if u is not None:
+            colors[v] = colors[u]
+        else:
+            used = {colors[w] for w in adjacency[v]}
+            colors[v] = next(c for c in range(n) if c not in used)
+
+    return max(colors) + 1, colors, sum(nodes for _, _, nodes in results)
+
+if __name__ == '__main__':
+
+    archive_name = "n20.txt"
+    graph = read_graph(archive_name)
+
+    print("REDUCED PARALLEL COLOURING")
+    print(reduced_coloring(graph))
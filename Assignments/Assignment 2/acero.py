@@ -3,6 +3,8 @@ from enum import Enum, unique
 import numpy as np
 import math
 from typing import List, Tuple
+from nodes import Node, NodeBounds, NodeQueue, NodeSelectionStrategy
+from lp_arrays import integer_mask, lp_values, fractional_parts, fractional_mask, round_integers
 
 INFINITY = float('inf')
 EPSILON = 1e-6
@@ -17,40 +19,39 @@ class VariableSelectionStrategy(Enum):
 
 class Solution:
         
-    def __init__(self, problem_type: ProblemType, selection_strategy: VariableSelectionStrategy):
+    def __init__(self, problem_type: ProblemType, selection_strategy: VariableSelectionStrategy, node_strategy: NodeSelectionStrategy = NodeSelectionStrategy.DFS):
         """
-        Constructor of the class. It receives the problem type and the variable selection strategy.
+        Constructor of the class. It receives the problem type and the variable and node selection strategies.
         Args:
             problem_type: Type of the problem (minimization or maximization).
             selection_strategy: Variable selection strategy (lecture or self).
+            node_strategy: Node selection strategy (DFS, best bound or hybrid; best estimate falls back to best bound).
         Returns:
             None
         """
         self.problem_type = problem_type
         self.selection_strategy = selection_strategy
+        self.node_strategy = node_strategy
 
-    def is_ILP_solution(self, m):
+    def is_ILP_solution(self, values):
         """
         Checks if the solution of the LP relaxation is an integer solution.
         Args:
-            m: Model of the problem.
+            values: Value of every variable in the LP solution.
         Returns:
             True if the solution is integer, False otherwise.
         """
-        for var in m.vars:
-            if not self.is_integral(var.x):
-                return False
-        return True
+        return not self.is_fractional(values).any()
     
-    def is_integral(self, x):
+    def is_fractional(self, values):
         """
-        Checks if a number is integer.
+        Checks which integer variables have a fractional value.
         Args:
-            x: Number to check.
+            values: Value of every variable in the LP solution.
         Returns:
-            True if the number is integer, False otherwise.
+            Boolean array, True for the fractional integer variables.
         """
-        return (abs(x - round(x)) < EPSILON)
+        return fractional_mask(values, self.integer, EPSILON)
 
     def variable_selection_method_lecture(self, variables: List[mip.Var]) -> mip.Var:
         """
@@ -60,14 +61,9 @@ class Solution:
         Returns:
             The selected variable.
         """
-        score = 1
-        best = None
-        for x in variables:
-            result = abs((x.x % 1) - 0.5)
-            if result < score:
-                score = result
-                best = x
-        return best
+        candidates = np.flatnonzero(self.is_fractional(self.values))
+        scores = np.abs(fractional_parts(self.values[candidates]) - 0.5)
+        return variables[candidates[np.argmin(scores)]]
     
     def variable_selection_method_self(self, variables: List[mip.Var]) -> mip.Var:
         """
@@ -77,33 +73,31 @@ class Solution:
         Returns:
             The selected variable.
         """
-        for x in variables:
-            if not self.is_integral(x.x):
-                return x
-        return None
+        candidates = np.flatnonzero(self.is_fractional(self.values))
+        if len(candidates) == 0:
+            return None
+        return variables[candidates[0]]
 
-    def add_models_to_stack(self, models: List[Model], m: Model, x: mip.Var) -> List[Model]:
+    def add_nodes_to_stack(self, nodes: NodeQueue, node: Node, x: mip.Var) -> NodeQueue:
         """
-        Adds the two models created by branching on the given variable to the stack.
+        Adds the two nodes created by branching on the given variable to the queue.
+        The children only store the new bounds of x, not a copy of the model.
         Args:
-            models (List[Model]): The stack of models.
-            m (Model): The model to branch on.
+            nodes (NodeQueue): The queue of open nodes.
+            node (Node): The node to branch on (the active node of the working model).
             x (mip.Var): The variable to branch on.
         Returns:
-            List[Model]: The stack of models with the new models added.
+            NodeQueue: The queue of open nodes with the new nodes added.
         """
-        m_left = m.copy()
-        m_right = m.copy()
-        m_left += x <= math.floor(x.x)
-        m_right += x >= math.ceil(x.x)
-        m_left.verbose = 0
-        m_right.verbose = 0
-        models.append(m_left)
-        models.append(m_right)
-
-        return models
+        lb, ub = self.bounds.bounds(x.idx)
+        bound = self.model.objective_value
+        value = self.values[x.idx]
+        nodes.push(Node(node, [(x.idx, lb, math.floor(value))], bound))
+        nodes.push(Node(node, [(x.idx, math.ceil(value), ub)], bound))
+
+        return nodes
     
-    def branch_and_bound(self, m: Model) -> Tuple[List[int], int]:
+    def branch_and_bound(self, m: Model) -> Tuple[List[float], int]:
         """
         Executes the branch and bound algorithm to solve the (M)ILP given problem.
         Args:
@@ -111,9 +105,16 @@ class Solution:
         Returns:
             A tuple with the optimal solution and the optimal objective value.
         """
-        #1. Set the set of current problems to be problem_stack = [m]
+        #1. Set the set of current problems to be problem_stack = [root], all nodes share the working model m
+        #   (HYBRID dives depth first until the first incumbent, then continues best bound first)
         m.verbose = 0
-        problem_stack = [m]
+        m.lp_method = LP_Method.DUAL
+        self.model = m
+        self.bounds = NodeBounds(m)
+        self.integer = integer_mask(m)
+        sense = 1 if self.problem_type == ProblemType.MINIMIZATION else -1
+        problem_stack = NodeQueue(NodeSelectionStrategy.DFS if self.node_strategy == NodeSelectionStrategy.HYBRID else self.node_strategy, sense)
+        problem_stack.push(Node(None, [], -sense * INFINITY))
 
         #2. Set the upper bound to be infinity and the lower bound to be -infinity
         if self.problem_type == ProblemType.MINIMIZATION:
@@ -127,9 +128,11 @@ class Solution:
         #4. While the problem stack is not empty:
         while len(problem_stack) > 0:
             #4.1 Choose current problem from the stack
-            current_problem = problem_stack.pop()
+            current_node = problem_stack.pop()
+            current_problem = m
 
-            #4.2 Solve the LP relaxation of the current problem
+            #4.2 Move the working model to the current node and solve its LP relaxation
+            self.bounds.activate(current_node)
             status = current_problem.optimize(relax=True)
 
             #4.3 PRUNATION PHASE
@@ -137,20 +140,25 @@ class Solution:
             # 4.3.1 If the current problem has no feasible solution, PRUNE BY INFEASIBILITY:
             if status == OptimizationStatus.INFEASIBLE or status == OptimizationStatus.NO_SOLUTION_FOUND or current_problem.objective_value == None: continue  #objective value is None if the model was not optimized(i.e solution not found)
             else:
+                # The LP solution is read once into an array
+                self.values = lp_values(current_problem)
+
                 #4.3.2 Set the lower/upper bound of the current problem
                 if self.problem_type == ProblemType.MINIMIZATION: 
-                    subproblem_lower_bound = math.ceil(current_problem.objective_value)
-                else: subproblem_upper_bound = math.floor(current_problem.objective_value)
+                    subproblem_lower_bound = math.ceil(current_problem.objective_value - EPSILON)
+                else: subproblem_upper_bound = math.floor(current_problem.objective_value + EPSILON)
 
                 #4.3.3 If the current solution is integral and bound constraints are satisfied, PRUNE BY OPTIMALITY:
-                if (status == OptimizationStatus.OPTIMAL and self.is_ILP_solution(current_problem)):               
+                if (status == OptimizationStatus.OPTIMAL and self.is_ILP_solution(self.values)):               
                     if self.problem_type == ProblemType.MINIMIZATION and subproblem_lower_bound < upper_bound :
                         upper_bound = subproblem_lower_bound
-                        optimal_solution = current_problem.vars            
+                        optimal_solution = round_integers(self.values, self.integer)
+                        if self.node_strategy == NodeSelectionStrategy.HYBRID: problem_stack.set_strategy(NodeSelectionStrategy.BEST_BOUND)
                         continue
                     if  self.problem_type == ProblemType.MAXIMIZATION and subproblem_upper_bound > lower_bound :
                         lower_bound = subproblem_upper_bound
-                        optimal_solution = current_problem.vars             
+                        optimal_solution = round_integers(self.values, self.integer)
+                        if self.node_strategy == NodeSelectionStrategy.HYBRID: problem_stack.set_strategy(NodeSelectionStrategy.BEST_BOUND)
                         continue
                 
                 #4.3.4 PRUNE BY BOUND:
@@ -166,15 +174,15 @@ class Solution:
                 else: x = self.variable_selection_method_self(current_problem.vars)
 
                 #4.4.2 Branch on the variable
-                problem_stack = self.add_models_to_stack(problem_stack, current_problem, x)
+                problem_stack = self.add_nodes_to_stack(problem_stack, current_node, x)
 
         #5. Return the optimal solution and the optimal objective value
+        self.bounds.restore()
         if optimal_solution is None:
             if self.problem_type == ProblemType.MAXIMIZATION:
                 return [], -INFINITY
             return [], INFINITY
         
-        optimal_solution = [int(x.x) for x in optimal_solution]
         if self.problem_type == ProblemType.MAXIMIZATION:
             return (optimal_solution, lower_bound)
         return (optimal_solution, upper_bound)
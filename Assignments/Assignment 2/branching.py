@@ -0,0 +1,134 @@
+from mip import *
+import math
+import numpy as np
+from typing import List, Tuple
+from nodes import NodeBounds
+from node_cache import NodeCache, bound_key, lp_result
+
+INFINITY = float('inf')
+
+# Minimum gain used in the product score, so a zero gain in one direction does not hide the other one
+SCORE_EPSILON = 1e-6
+
+# Strong branching is only done on this many candidates (the most fractional ones)
+STRONG_CANDIDATES = 8
+
+# A variable is reliable once both of its pseudo-costs are the average of this many observations
+RELIABILITY_THRESHOLD = 4
+
+# Reliability branching stops strong branching after this many candidates without a better score
+RELIABILITY_LOOKAHEAD = 4
+
+def score(down, up):
+    """
+    Product score of branching candidates from the objective gains of their two children.
+    Works on single gains as well as on NumPy arrays of gains.
+    Args:
+        down (float or np.ndarray): Gain of the x <= floor child (in minimization form).
+        up (float or np.ndarray): Gain of the x >= ceil child (in minimization form).
+    Returns:
+        float or np.ndarray: The score (larger is better).
+    """
+    return np.maximum(down, SCORE_EPSILON) * np.maximum(up, SCORE_EPSILON)
+
+class PseudoCosts:
+    """
+    Average objective gain per unit of change of every variable, for the down (x <= floor)
+    and the up (x >= ceil) branch. The statistics are collected from every solved child
+    (and every strong branching LP) and are kept for the whole search.
+    """
+
+    def __init__(self, n: int):
+        """
+        Constructor of the pseudo-costs.
+        Args:
+            n (int): Number of variables.
+        """
+        # Row 0 is the down branch, row 1 the up branch
+        self.sums = np.zeros((2, n))
+        self.counts = np.zeros((2, n), dtype=np.int64)
+
+    def update(self, idx: int, direction: int, fraction: float, gain: float):
+        """
+        Records the objective gain of a branch.
+        Args:
+            idx (int): Index of the branching variable.
+            direction (int): 0 for the down branch, 1 for the up branch.
+            fraction (float): Fractional part of the variable at the parent.
+            gain (float): Objective gain of the child over the parent (in minimization form).
+        """
+        distance = fraction if direction == 0 else 1 - fraction
+        if distance <= 0 or math.isinf(gain):
+            return
+        self.sums[direction, idx] += max(gain, 0) / distance
+        self.counts[direction, idx] += 1
+
+    def costs(self, candidates: np.ndarray) -> np.ndarray:
+        """
+        Returns the pseudo-costs of the candidates. Variables without observations in a
+        direction take the average pseudo-cost of the initialized variables (1 if there is none).
+        Args:
+            candidates (np.ndarray): Indices of the variables.
+        Returns:
+            np.ndarray: Array of shape (2, len(candidates)) with the down and up pseudo-costs.
+        """
+        initialized = self.counts > 0
+        averages = np.ones(2)
+        for direction in range(2):
+            if initialized[direction].any():
+                averages[direction] = np.mean(self.sums[direction, initialized[direction]] / self.counts[direction, initialized[direction]])
+
+        counts = self.counts[:, candidates]
+        costs = self.sums[:, candidates] / np.maximum(counts, 1)
+        return np.where(counts > 0, costs, averages[:, None])
+
+    def scores(self, fractions: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+        """
+        Predicted product scores of branching on the candidates at their current LP values.
+        Args:
+            fractions (np.ndarray): Fractional parts of the candidates.
+            candidates (np.ndarray): Indices of the candidates.
+        Returns:
+            np.ndarray: The score of every candidate.
+        """
+        costs = self.costs(candidates)
+        return score(costs[0] * fractions, costs[1] * (1 - fractions))
+
+    def is_reliable(self, idx: int) -> bool:
+        """
+        Checks if both pseudo-costs of a variable are based on enough observations.
+        Args:
+            idx (int): Index of the variable.
+        Returns:
+            bool: True if the variable is reliable.
+        """
+        return self.counts[:, idx].min() >= RELIABILITY_THRESHOLD
+
+def strong_branching(m: Model, bounds: NodeBounds, x: mip.Var, value: float, sense: int, cache: NodeCache = None) -> Tuple[float, float]:
+    """
+    Solves the LP relaxations of both children of x on the working model and restores the bounds of x.
+    The child LPs start from the basis of the current node, so only a few dual simplex pivots are needed.
+    Args:
+        m (Model): The working model.
+        bounds (NodeBounds): Bounds of the active node.
+        x (mip.Var): The candidate.
+        value (float): Value of x in the LP solution of the node.
+        sense (int): 1 for minimization, -1 for maximization.
+        cache (NodeCache): Cache that keeps the child LPs under the canonical box of the child, so the children are not solved again (None to not keep them).
+    Returns:
+        Tuple[float, float]: The LP objective values of the down and up child in minimization form
+        (infinity for an infeasible child).
+    """
+    lb, ub = bounds.bounds(x.idx)
+    objectives = []
+    for child_lb, child_ub in ((lb, math.floor(value)), (math.ceil(value), ub)):
+        x.lb, x.ub = child_lb, child_ub
+        status = m.optimize(relax=True)
+        if status == OptimizationStatus.OPTIMAL or status == OptimizationStatus.FEASIBLE:
+            objectives.append(sense * m.objective_value)
+        else:
+            objectives.append(INFINITY)
+        if cache is not None and (status == OptimizationStatus.OPTIMAL or status == OptimizationStatus.INFEASIBLE):
+            cache.put(bound_key(*cache.box((x.idx, child_lb, child_ub))), lp_result(m, status, sense))
+    x.lb, x.ub = lb, ub
+    return objectives[0], objectives[1]
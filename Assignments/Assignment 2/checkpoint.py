@@ -0,0 +1,105 @@
+import json
+import os
+import numpy as np
+from typing import List, Tuple
+from nodes import BoundChange, Node
+
+# Seconds between two checkpoints of a running search
+CHECKPOINT_INTERVAL = 60.0
+
+def pack_changes(changes: List[List[BoundChange]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Packs lists of bound changes into flat arrays, like the rows of a CSR matrix.
+    Args:
+        changes (List[List[BoundChange]]): The bound changes of every node.
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: Offsets of the changes of every node,
+        and the variable index, lower bound and upper bound of every change.
+    """
+    offsets = np.zeros(len(changes) + 1, dtype=np.int64)
+    np.cumsum([len(node_changes) for node_changes in changes], out=offsets[1:])
+    flat = [change for node_changes in changes for change in node_changes]
+    idx = np.array([change[0] for change in flat], dtype=np.int64)
+    lb = np.array([change[1] for change in flat], dtype=np.float64)
+    ub = np.array([change[2] for change in flat], dtype=np.float64)
+    return offsets, idx, lb, ub
+
+def unpack_changes(offsets: np.ndarray, idx: np.ndarray, lb: np.ndarray, ub: np.ndarray) -> List[List[BoundChange]]:
+    """Unpacks the arrays of pack_changes into lists of bound changes."""
+    return [[(int(idx[k]), float(lb[k]), float(ub[k])) for k in range(offsets[i], offsets[i+1])] for i in range(len(offsets) - 1)]
+
+class Checkpoint:
+    """
+    State of a Branch & Bound search that a later run can resume from: the open nodes (every one
+    as its bound changes from the root, with its bound, estimate, depth and branching), the incumbent,
+    the root bounds tightened during the search, the pseudo-costs and the statistics. It is written
+    as an uncompressed .npz file, together with the digest of the problem it belongs to.
+    """
+
+    def __init__(self, digest: str, nodes: List[Node], optimal_solution: List[float], upper_bound: float,
+                 global_changes: List[BoundChange], sums: np.ndarray, counts: np.ndarray, statistics: dict):
+        """
+        Constructor of the checkpoint.
+        Args:
+            digest (str): Digest of the problem (see ProblemData.digest).
+            nodes (List[Node]): The open nodes, in the order they would be selected.
+            optimal_solution (List[float]): The incumbent (empty if there is none).
+            upper_bound (float): Objective value of the incumbent (minimization form).
+            global_changes (List[BoundChange]): Root bounds tightened during the search.
+            sums, counts (np.ndarray): Arrays of the pseudo-costs (see PseudoCosts).
+            statistics (dict): State of the statistics (see SearchStatistics.state).
+        """
+        self.digest = digest
+        self.nodes = nodes
+        self.optimal_solution = optimal_solution
+        self.upper_bound = upper_bound
+        self.global_changes = global_changes
+        self.sums = sums
+        self.counts = counts
+        self.statistics = statistics
+
+    def write(self, path: str):
+        """
+        Writes the checkpoint. The file is written under a temporary name and then renamed, so a
+        run killed while writing leaves the previous checkpoint intact.
+        Args:
+            path (str): Path of the checkpoint file.
+        """
+        offsets, idx, lb, ub = pack_changes([node.path_changes() for node in self.nodes])
+        branching = np.array([node.branching if node.branching is not None else (-1, 0, 0.0) for node in self.nodes],
+                             dtype=np.float64).reshape(len(self.nodes), 3)
+        global_offsets, global_idx, global_lb, global_ub = pack_changes([self.global_changes])
+        temporary = "%s.%d.tmp" % (path, os.getpid())
+        with open(temporary, "wb") as file:
+            np.savez(file, digest=np.array(self.digest), offsets=offsets, idx=idx, lb=lb, ub=ub,
+                     bound=np.array([node.bound for node in self.nodes], dtype=np.float64),
+                     estimate=np.array([node.estimate for node in self.nodes], dtype=np.float64),
+                     depth=np.array([node.depth for node in self.nodes], dtype=np.int64),
+                     branching=branching,
+                     optimal_solution=np.array(self.optimal_solution, dtype=np.float64),
+                     upper_bound=np.array(self.upper_bound),
+                     global_idx=global_idx, global_lb=global_lb, global_ub=global_ub,
+                     sums=self.sums, counts=self.counts, statistics=np.array(json.dumps(self.statistics)))
+        os.replace(temporary, path)
+
+    @classmethod
+    def read(cls, path: str) -> "Checkpoint":
+        """
+        Reads a checkpoint written by write.
+        Args:
+            path (str): Path of the checkpoint file.
+        Returns:
+            Checkpoint: The checkpoint, its nodes have no parent.
+        """
+        with np.load(path) as arrays:
+            changes = unpack_changes(arrays["offsets"], arrays["idx"], arrays["lb"], arrays["ub"])
+            nodes = []
+            for k, node_changes in enumerate(changes):
+                idx, direction, fraction = arrays["branching"][k]
+                branching = (int(idx), int(direction), float(fraction)) if idx >= 0 else None
+                nodes.append(Node(None, node_changes, float(arrays["bound"][k]), float(arrays["estimate"][k]),
+                                  branching, int(arrays["depth"][k])))
+            global_changes = unpack_changes(np.array([0, len(arrays["global_idx"])]), arrays["global_idx"],
+                                            arrays["global_lb"], arrays["global_ub"])[0]
+            return cls(str(arrays["digest"]), nodes, arrays["optimal_solution"].tolist(), float(arrays["upper_bound"]),
+                       global_changes, arrays["sums"], arrays["counts"], json.loads(str(arrays["statistics"])))
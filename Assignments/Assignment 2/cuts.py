@@ -0,0 +1,374 @@
+from mip import *
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from nodes import NodeBounds
+from problem import ProblemData
+from lp_arrays import lp_values, fractional_parts
+
+# Separation rounds at a node
+CUT_ROUNDS = 20
+
+# Knapsack cover cuts are separated down to this depth (Gomory cuts only at the root)
+CUT_MAX_DEPTH = 3
+
+# Gomory cuts added per round
+MAX_GOMORY_CUTS = 20
+
+# A cut must be violated by at least this much (relative to the norm of its coefficients)
+MIN_EFFICACY = 1e-4
+
+# Tailing off: stop when the bound improved by less than this (relative) over the last TAILING_ROUNDS rounds
+TAILING_OFF = 1e-3
+TAILING_ROUNDS = 3
+
+# A cut that has not been binding for this many rounds is removed from the model
+CUT_MAX_AGE = 10
+
+# Maximum number of cuts in the model
+MAX_POOL_SIZE = 500
+
+# Tolerances of the basis recovery and of the Gomory cuts
+BASIS_EPSILON = 1e-7
+MIN_FRACTION = 5e-3
+MAX_DYNAMISM = 1e6
+
+class CutPool:
+    """
+    Cuts added to the working model. Every cut a x <= b is kept with its age: the number of
+    consecutive rounds in which it was not binding. Old cuts are evicted from the model, so the
+    LP does not grow with cuts that no longer matter.
+    """
+
+    def __init__(self, m: Model):
+        """
+        Constructor of the pool.
+        Args:
+            m (Model): The working model.
+        """
+        self.model = m
+        # key -> [coefficients, rhs, constraint, age]
+        self.cuts: Dict[bytes, list] = {}
+
+    def key(self, coefficients: np.ndarray, rhs: float) -> bytes:
+        """Normalized representation of a cut, to detect duplicates."""
+        scale = np.abs(coefficients).max()
+        return np.round(np.append(coefficients, rhs) / scale, 9).tobytes()
+
+    def add(self, coefficients: np.ndarray, rhs: float) -> bool:
+        """
+        Adds the cut coefficients x <= rhs to the working model (unless it is already in the pool).
+        Args:
+            coefficients (np.ndarray): Coefficient of every variable.
+            rhs (float): Right hand side.
+        Returns:
+            bool: True if the cut was added.
+        """
+        key = self.key(coefficients, rhs)
+        if key in self.cuts:
+            return False
+        variables = self.model.vars
+        constr = self.model.add_constr(xsum(float(coefficients[j]) * variables[j] for j in np.flatnonzero(coefficients)) <= rhs)
+        self.cuts[key] = [coefficients, rhs, constr, 0]
+        return True
+
+    def age(self, values: np.ndarray) -> bool:
+        """
+        Ages the cuts that are not binding at the given LP solution and removes the ones that are too old.
+        When the pool is too large the oldest cuts are removed as well.
+        Args:
+            values (np.ndarray): The LP solution.
+        Returns:
+            bool: True if some cut was removed from the model.
+        """
+        for cut in self.cuts.values():
+            coefficients, rhs = cut[0], cut[1]
+            cut[3] = 0 if rhs - np.dot(coefficients, values) <= 1e-6 * max(1, abs(rhs)) else cut[3] + 1
+
+        evicted = [key for key, cut in self.cuts.items() if cut[3] > CUT_MAX_AGE]
+        if len(self.cuts) - len(evicted) > MAX_POOL_SIZE:
+            remaining = sorted((key for key in self.cuts if key not in evicted), key=lambda key: -self.cuts[key][3])
+            evicted += remaining[:len(self.cuts) - len(evicted) - MAX_POOL_SIZE]
+        if evicted:
+            self.model.remove([self.cuts[key][2] for key in evicted])
+            for key in evicted:
+                del self.cuts[key]
+        return len(evicted) > 0
+
+    def rows(self, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the cuts as dense rows.
+        Args:
+            n (int): Number of variables.
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The coefficient matrix and the right hand sides.
+        """
+        if not self.cuts:
+            return np.zeros((0, n)), np.zeros(0)
+        cuts = list(self.cuts.values())
+        return np.array([cut[0] for cut in cuts]), np.array([cut[1] for cut in cuts])
+
+    def __len__(self) -> int:
+        return len(self.cuts)
+
+class CutSeparator:
+    """
+    Cut separation of the branch-and-cut: Gomory mixed-integer cuts from the simplex tableau
+    (at the root, where they are globally valid) and lifted knapsack cover cuts from the rows
+    of the original problem that only have binary variables (valid everywhere in the tree).
+    """
+
+    def __init__(self, m: Model, bounds: NodeBounds, data: ProblemData):
+        """
+        Constructor of the separator.
+        Args:
+            m (Model): The working model.
+            bounds (NodeBounds): Bounds of the active node of the working model.
+            data (ProblemData): Arrays of the original problem.
+        """
+        self.model = m
+        self.bounds = bounds
+        self.data = data
+        self.pool = CutPool(m)
+        self.dense = np.zeros((data.m, data.n))
+        np.add.at(self.dense, (data.rows, data.indices), data.data)
+        self.knapsacks = self.knapsack_rows()
+
+    ####################
+    # Knapsack covers  #
+    ####################
+
+    def knapsack_rows(self) -> List[Tuple[np.ndarray, np.ndarray, float]]:
+        """
+        Finds the rows of the original problem that are knapsack constraints over binary variables,
+        written as sum a_j y_j <= b with a > 0 where y_j is x_j or its complement 1 - x_j.
+        Returns:
+            List[Tuple[np.ndarray, np.ndarray, float]]: For every knapsack the variable indices, the
+            coefficients (negative for complemented variables) and b.
+        """
+        data = self.data
+        binary = data.integer & (data.lb == 0) & (data.ub == 1)
+        knapsacks = []
+        for i in range(data.m):
+            columns = data.indices[data.indptr[i]:data.indptr[i+1]]
+            coefficients = data.data[data.indptr[i]:data.indptr[i+1]]
+            if len(columns) < 2 or not binary[columns].all():
+                continue
+            for side, sign in ((data.row_ub[i], 1), (data.row_lb[i], -1)):
+                if np.isfinite(side):
+                    a = sign * coefficients
+                    # Complementing the variables with negative coefficients moves them to the right hand side
+                    b = sign * side - a[a < 0].sum()
+                    if b >= 0 and np.abs(a).sum() > b:
+                        knapsacks.append((columns, a, b))
+        return knapsacks
+
+    def cover_cut(self, columns: np.ndarray, a: np.ndarray, b: float, values: np.ndarray) -> Optional[Tuple[np.ndarray, float]]:
+        """
+        Separates a lifted cover cut for the knapsack sum |a_j| y_j <= b. A minimal cover C is built
+        greedily from the LP solution, and the variables outside C are lifted sequentially (exactly,
+        with a table of the minimum weight needed to reach every left hand side value).
+        Args:
+            columns (np.ndarray): Variables of the knapsack.
+            a (np.ndarray): Coefficients (negative for complemented variables).
+            b (float): Capacity.
+            values (np.ndarray): The LP solution.
+        Returns:
+            Optional[Tuple[np.ndarray, float]]: The cut as (coefficients, rhs) of coefficients x <= rhs,
+            or None if no violated cover cut was found.
+        """
+        weights = np.abs(a)
+        complemented = a < 0
+        y = np.where(complemented, 1 - values[columns], values[columns])
+
+        # Greedy cover: items with y close to 1 per unit of weight first
+        order = np.argsort((1 - y) / weights, kind='stable')
+        total = np.cumsum(weights[order])
+        if total[-1] <= b:
+            return None
+        cover = list(order[:int(np.searchsorted(total, b, side='right')) + 1])
+
+        # Make the cover minimal, dropping the items with smallest y first
+        weight = weights[cover].sum()
+        for item in sorted(cover, key=lambda item: y[item]):
+            if weight - weights[item] > b:
+                cover.remove(item)
+                weight -= weights[item]
+        if y[cover].sum() <= len(cover) - 1 + MIN_EFFICACY:
+            return None
+
+        # Sequential up-lifting. min_weight[v] is the minimum weight of a subset with lifted value v
+        alpha = np.zeros(len(columns))
+        alpha[cover] = 1
+        min_weight = np.concatenate(([0], np.cumsum(np.sort(weights[cover]))))
+        rhs = len(cover) - 1
+        others = [item for item in np.argsort(-y, kind='stable') if item not in cover]
+        for item in others:
+            capacity = b - weights[item]
+            best = int(np.flatnonzero(min_weight <= capacity + 1e-9).max()) if capacity >= 0 else -1
+            lift = rhs - best if best >= 0 else rhs
+            if lift > 0:
+                alpha[item] = lift
+                extended = np.full(len(min_weight) + lift, np.inf)
+                extended[:len(min_weight)] = min_weight
+                extended[lift:] = np.minimum(extended[lift:], min_weight + weights[item])
+                min_weight = np.minimum.accumulate(extended[::-1])[::-1]
+
+        if np.dot(alpha, y) <= rhs + MIN_EFFICACY:
+            return None
+
+        # Back to the original variables: y_j = 1 - x_j for the complemented ones
+        coefficients = np.zeros(self.data.n)
+        np.add.at(coefficients, columns, np.where(complemented, -alpha, alpha))
+        return coefficients, rhs - alpha[complemented].sum()
+
+    def cover_cuts(self, values: np.ndarray) -> List[Tuple[np.ndarray, float]]:
+        """Separates a lifted cover cut for every knapsack row."""
+        cuts = []
+        for columns, a, b in self.knapsacks:
+            cut = self.cover_cut(columns, a, b, values)
+            if cut is not None:
+                cuts.append(cut)
+        return cuts
+
+    ####################
+    # Gomory cuts      #
+    ####################
+
+    def basis(self, A: np.ndarray, z: np.ndarray, lower: np.ndarray, upper: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Recovers a basis of the LP vertex z of the system [A -I] z = 0 (structural variables and
+        row activities): the variables strictly between their bounds are basic and the basis is
+        completed with variables at a bound (slacks first) while the columns stay independent.
+        Args:
+            A (np.ndarray): Constraint matrix of the LP (rows of the problem and cuts).
+            z (np.ndarray): Values of the structural variables followed by the row activities.
+            lower, upper (np.ndarray): Bounds of z.
+        Returns:
+            Optional[np.ndarray]: Indices of the basic variables, or None if z is not a vertex.
+        """
+        rows, n = A.shape
+        M = np.hstack((A, -np.eye(rows)))
+        with np.errstate(invalid='ignore'):
+            at_lower = np.isfinite(lower) & (np.abs(z - lower) <= BASIS_EPSILON * (1 + np.abs(lower)))
+            at_upper = np.isfinite(upper) & (np.abs(z - upper) <= BASIS_EPSILON * (1 + np.abs(upper)))
+        at_bound = at_lower | at_upper
+        basic = list(np.flatnonzero(~at_bound))
+        if len(basic) > rows or (basic and np.linalg.matrix_rank(M[:, basic]) < len(basic)):
+            return None
+
+        candidates = [j for j in np.flatnonzero(at_bound)[::-1]]
+        for j in candidates:
+            if len(basic) == rows:
+                break
+            if np.linalg.matrix_rank(M[:, basic + [j]]) == len(basic) + 1:
+                basic.append(j)
+        return np.array(basic) if len(basic) == rows else None
+
+    def gomory_cuts(self, values: np.ndarray) -> List[Tuple[np.ndarray, float]]:
+        """
+        Separates Gomory mixed-integer cuts from the tableau rows of the fractional basic integer variables.
+        Args:
+            values (np.ndarray): The LP solution (a vertex).
+        Returns:
+            List[Tuple[np.ndarray, float]]: The most efficacious cuts as (coefficients, rhs) of coefficients x <= rhs.
+        """
+        data = self.data
+        n = data.n
+        cut_rows, cut_rhs = self.pool.rows(n)
+        A = np.vstack((self.dense, cut_rows))
+        rows = A.shape[0]
+        lb, ub = self.bounds.arrays()
+        lb[lb <= -1e20], ub[ub >= 1e20] = -np.inf, np.inf
+        lower = np.concatenate((lb, data.row_lb, np.full(len(cut_rhs), -np.inf)))
+        upper = np.concatenate((ub, data.row_ub, cut_rhs))
+        z = np.concatenate((values, A @ values))
+
+        basic = self.basis(A, z, lower, upper)
+        if basic is None:
+            return []
+        M = np.hstack((A, -np.eye(rows)))
+        nonbasic = np.setdiff1d(np.arange(n + rows), basic)
+        at_upper = np.abs(z[nonbasic] - upper[nonbasic]) < np.abs(z[nonbasic] - lower[nonbasic])
+        bound = np.where(at_upper, upper[nonbasic], lower[nonbasic])
+        sign = np.where(at_upper, -1.0, 1.0)
+        integer = np.zeros(n + rows, dtype=bool)
+        integer[:n] = data.integer & (lb == np.floor(lb)) & (ub == np.floor(ub))
+
+        try:
+            tableau = np.linalg.solve(M[:, basic], M[:, nonbasic])
+        except np.linalg.LinAlgError:
+            return []
+
+        cuts = []
+        for k, i in enumerate(basic):
+            if i >= n or not data.integer[i]:
+                continue
+            f0 = fractional_parts(z[i])
+            if f0 < MIN_FRACTION or f0 > 1 - MIN_FRACTION:
+                continue
+
+            # z_i + sum abar_j t_j = z_i*, with t_j >= 0 the distance of nonbasic j to its bound
+            abar = tableau[k] * sign
+            f = fractional_parts(abar)
+            g = np.where(abar >= 0, abar / f0, -abar / (1 - f0))
+            g[integer[nonbasic]] = np.where(f <= f0, f / f0, (1 - f) / (1 - f0))[integer[nonbasic]]
+
+            # sum g_j t_j >= 1, with t_j = sign_j (z_j - bound_j), in the structural variables
+            pi = np.zeros(n + rows)
+            pi[nonbasic] = g * sign
+            rhs = 1 + np.dot(g * sign, bound)
+            coefficients = pi[:n] + pi[n:] @ A
+            coefficients[np.abs(coefficients) < 1e-11] = 0
+            nonzero = np.abs(coefficients[coefficients != 0])
+            if len(nonzero) == 0 or nonzero.max() / nonzero.min() > MAX_DYNAMISM:
+                continue
+
+            # As coefficients x <= rhs
+            efficacy = (rhs - np.dot(coefficients, values)) / np.linalg.norm(coefficients)
+            if efficacy > MIN_EFFICACY:
+                cuts.append((efficacy, -coefficients, -rhs))
+
+        cuts.sort(key=lambda cut: -cut[0])
+        return [(coefficients, rhs) for _, coefficients, rhs in cuts[:MAX_GOMORY_CUTS]]
+
+    ####################
+    # Separation loop  #
+    ####################
+
+    def separate(self, gomory: bool, sense: int) -> OptimizationStatus:
+        """
+        Separation loop at the active node, whose LP has just been solved: adds violated cuts and
+        re-solves until no cut is found, the maximum number of rounds is reached or the bound tails off.
+        Afterwards the pool is aged (and the LP re-solved if cuts were removed).
+        Args:
+            gomory (bool): Whether to separate Gomory cuts (only when the node has the root bounds,
+                otherwise they would only be valid in its subtree).
+            sense (int): 1 for minimization, -1 for maximization.
+        Returns:
+            OptimizationStatus: Status of the last LP solved.
+        """
+        m = self.model
+        status = OptimizationStatus.OPTIMAL
+        values = lp_values(m)
+        history = [sense * m.objective_value]
+        for _ in range(CUT_ROUNDS):
+            cuts = self.cover_cuts(values)
+            if gomory:
+                cuts += self.gomory_cuts(values)
+            added = sum(self.pool.add(coefficients, rhs) for coefficients, rhs in cuts)
+            if added == 0:
+                break
+
+            status = m.optimize(relax=True)
+            if status != OptimizationStatus.OPTIMAL:
+                return status
+            values = lp_values(m)
+            history.append(sense * m.objective_value)
+
+            # Tailing off
+            if len(history) > TAILING_ROUNDS and history[-1] - history[-1 - TAILING_ROUNDS] < TAILING_OFF * max(1, abs(history[-1])):
+                break
+
+        if self.pool.age(values):
+            status = m.optimize(relax=True)
+        return status
@@ -2,11 +2,29 @@ from mip import *
 from enum import Enum, unique
 import numpy as np
 import math
-from typing import List, Tuple
+import os
+import time
+from typing import Callable, List, Optional, Tuple
+from nodes import BoundChange, Node, NodeBounds, NodeQueue, NodeSelectionStrategy, NODE_MEMORY
+from branching import PseudoCosts, STRONG_CANDIDATES, RELIABILITY_LOOKAHEAD, score, strong_branching
+from lp_arrays import lp_values, fractional_parts, fractional_mask, round_integers
+from heuristics import PrimalHeuristics
+from cuts import CutSeparator, CUT_MAX_DEPTH
+from problem import ProblemData
+from presolve import Postsolve, postsolve_solution, presolve
+from simplex import RelaxationBackend, SimplexModel
+from knapsack import knapsack_problem
+from mps import load_model
+from instrumentation import PruneReason, SearchStatistics, TRACE_FREQUENCY, relative_gap
+from checkpoint import Checkpoint, CHECKPOINT_INTERVAL
+from node_cache import LPResult, NodeCache, bound_key, lp_result
 
 INFINITY = float('inf')
 EPSILON = 10e-8
 
+# Default absolute gap tolerance: nodes whose bound is this close to the incumbent are not explored
+ABSOLUTE_GAP = 1e-6
+
 class ProblemType(Enum):
     MAXIMIZATION = 1
     MINIMIZATION = 2
@@ -14,31 +32,120 @@ class ProblemType(Enum):
 class VariableSelectionStrategy(Enum):
     LECTURE = 1
     SELF = 2
+    PSEUDOCOST = 3
+    STRONG = 4
+    RELIABILITY = 5
 
 class Solution:
 
-    def __init__(self, problem_type: ProblemType, selection_strategy: VariableSelectionStrategy):
+    def __init__(self,
+                 problem_type: ProblemType,
+                 selection_strategy: VariableSelectionStrategy,
+                 node_strategy: NodeSelectionStrategy = NodeSelectionStrategy.BEST_BOUND,
+                 primal_heuristics: bool = True,
+                 branch_and_cut: bool = False,
+                 presolve: bool = True,
+                 relaxation: RelaxationBackend = RelaxationBackend.SOLVER,
+                 knapsack: bool = True,
+                 time_limit: float = INFINITY,
+                 node_limit: int = None,
+                 absolute_gap: float = ABSOLUTE_GAP,
+                 relative_gap: float = 0.0,
+                 checkpoint: str = None,
+                 checkpoint_interval: float = CHECKPOINT_INTERVAL,
+                 node_cache: bool = True,
+                 node_memory: int = NODE_MEMORY):
         """
         Constructor for the for solutions to (M)ILP problems using Branch & Bound.
         Args:
             problem_type (ProblemType): The type of the problem (maximization or minimization)
-            selection_strategy (VariableSelectionStrategy): The strategy to use for selecting the next variable to branch on (lecture or self)
+            selection_strategy (VariableSelectionStrategy): The strategy to use for selecting the next variable to branch on (lecture, self, pseudo-cost, strong or reliability)
+            node_strategy (NodeSelectionStrategy): The strategy to use for selecting the next node to solve (DFS, best bound, best estimate or hybrid)
+            primal_heuristics (bool): Whether to search for incumbents with rounding, diving and the feasibility pump
+            branch_and_cut (bool): Whether to strengthen the LP relaxations of the root and shallow nodes with cuts
+            presolve (bool): Whether to reduce the model (bound tightening, row and column removal) before the search
+            relaxation (RelaxationBackend): What solves the node LPs (the solver of the model or the in-process dual simplex)
+            knapsack (bool): Whether to solve 0/1 knapsack problems with the knapsack algorithm instead of the Branch & Bound
+            time_limit (float): Seconds after which the search stops with the best solution found
+            node_limit (int): Number of nodes after which the search stops with the best solution found (None for no limit)
+            absolute_gap (float): Nodes whose bound is within this distance of the incumbent are pruned
+            relative_gap (float): Nodes whose bound is within this fraction of the incumbent are pruned
+            checkpoint (str): Path of a checkpoint file (see Checkpoint): the search writes its state there every checkpoint_interval
+                seconds and when a limit stops it, resumes from it if it exists and removes it when it completes
+            checkpoint_interval (float): Seconds between two checkpoints
+            node_cache (bool): Whether to memoize the node LPs by the box of the node (including the child LPs solved by
+                strong branching) and prune the nodes inside the box of a pruned node (see NodeCache)
+            node_memory (int): Memory budget of the open nodes in bytes, near it the search selects nodes depth first (see NodeQueue)
         """
         self.problem_type = problem_type
         self.selection_strategy = selection_strategy
+        self.node_strategy = node_strategy
+        self.primal_heuristics = primal_heuristics
+        self.branch_and_cut = branch_and_cut
+        self.presolve = presolve
+        self.relaxation = relaxation
+        self.knapsack = knapsack
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.absolute_gap = absolute_gap
+        self.relative_gap = relative_gap
+        self.checkpoint = checkpoint
+        self.checkpoint_interval = checkpoint_interval
+        self.node_cache = node_cache
+        self.node_memory = node_memory
+        # Time (time.time()) of the next checkpoint of the running search
+        self.next_checkpoint = INFINITY
+        # Limits of the running search: the time (time.time()) and the number of nodes at which it stops
+        self.deadline = INFINITY
+        self.node_budget = node_limit
+        # Result of the last search: dual bound and gap (see conclude) and status
+        self.bound = None
+        self.gap = None
+        self.status = None
+        # Functions called with every sample of the trace of the search (see SearchStatistics)
+        self.callbacks: List[Callable] = []
+        self.statistics = None
+
+    def add_callback(self, callback: Callable):
+        """
+        Adds a function that follows the progress of the search. It is called as callback(statistics, sample)
+        for every sample of the trace: at every new incumbent, every TRACE_FREQUENCY nodes and at the end.
+        Args:
+            callback (Callable): The function, it gets the SearchStatistics and the sample (see TRACE_FIELDS).
+        """
+        self.callbacks.append(callback)
 
-    def is_ILP_solution(self, vars: [mip.Var]) -> bool:
+    def start_statistics(self, sense: int) -> SearchStatistics:
+        """
+        Starts new statistics for a search (see SearchStatistics), available as self.statistics.
+        Args:
+            sense (int): 1 for minimization, -1 for maximization.
+        Returns:
+            SearchStatistics: The statistics.
+        """
+        self.statistics = SearchStatistics(sense, self.callbacks)
+        return self.statistics
+
+    def sample(self, event: str, C: NodeQueue, incumbent: float, node_bound: float = INFINITY):
+        """
+        Adds a sample to the trace of the search.
+        Args:
+            event (str): What took the sample.
+            C (NodeQueue): The open nodes.
+            incumbent (float): Objective value of the best known solution (minimization form).
+            node_bound (float): LP bound of the node being processed, which is not in the queue (minimization form).
+        """
+        self.statistics.sample(event, len(C), incumbent, min(C.best_bound(), node_bound))
+
+    def is_ILP_solution(self, values: np.ndarray) -> bool:
         """
         Checks if the given solution is an integer solution.
         Args:
-            vars ([mip.Var]): The variables to check.
+            values (np.ndarray): The LP solution (value of every variable).
         Returns:
             bool: True if the solution is an integer solution, False otherwise.
         """
-        for x in vars:
-            if abs(x.x - math.floor(x.x)) > EPSILON and abs(math.ceil(x.x) - x.x) > EPSILON:
-                return False
-        return True
+        return not fractional_mask(values, self.integer, EPSILON).any()
 
     def selection_of_variable(self, vars: [mip.Var]) -> mip.Var:
         """
@@ -51,137 +158,66 @@ class Solution:
         # LECTURE
         if self.selection_strategy == VariableSelectionStrategy.LECTURE:
             return self.variable_selection_method_lecture(vars)
+        # PSEUDOCOST
+        if self.selection_strategy == VariableSelectionStrategy.PSEUDOCOST:
+            return self.variable_selection_method_pseudocost(vars)
+        # STRONG
+        if self.selection_strategy == VariableSelectionStrategy.STRONG:
+            return self.variable_selection_method_strong(vars)
+        # RELIABILITY
+        if self.selection_strategy == VariableSelectionStrategy.RELIABILITY:
+            return self.variable_selection_method_reliability(vars)
         # SELF
         return self.variable_selection_method_self(vars)
     
-    def add_models_to_stack(self, models: List[Model], m: Model, x: mip.Var) -> List[Model]:
+    def add_nodes_to_stack(self, nodes: NodeQueue, node: Node, x: mip.Var, fixings: List[BoundChange] = None) -> NodeQueue:
         """
-        Adds the two models created by branching on the given variable to the stack.
+        Adds the two nodes created by branching on the given variable to the queue.
+        The children only store the new bounds of x, not a copy of the model.
         Args:
-            models (List[Model]): The stack of models.
-            m (Model): The model to branch on.
+            nodes (NodeQueue): The queue of open nodes.
+            node (Node): The node to branch on (the active node of the working model).
             x (mip.Var): The variable to branch on.
+            fixings (List[BoundChange]): Bounds tightened at the node, inherited by both children (none if None).
         Returns:
-            List[Model]: The stack of models with the new models added.
+            NodeQueue: The queue of open nodes with the new nodes added.
         """
+        if fixings is None:
+            fixings = []
 
         # Branch on the variable
-        m_left = m.copy()
-        m_right = m.copy()
-        m_left += x <= math.floor(x.x)
-        m_right += x >= math.ceil(x.x)
-        m_left.verbose = 0
-        m_right.verbose = 0
-        m_left.optimize(relax=True)
-        m_right.optimize(relax=True)
-
-        # Append the new models if not infeasible
-        # if m_left.num_solutions > 0: models.append(m_left)
-        # if m_right.num_solutions > 0: models.append(m_right)
-
-        models.append(m_left)
-        models.append(m_right)
-
-        return models
-    
-    def best_node_first(self, models: List[Model]) -> int:  
-        """
-        Returns the index of the best model in the stack.
-        Args:
-            models (List[Model]): The stack of models.
-        Returns:
-            Int: The index of the best model in the stack.
-        """
+        lb, ub = self.bounds.bounds(x.idx)
+        bound = self.sense * self.node_lp.objective_value
+        value = self.values[x.idx]
+        fraction = value - math.floor(value)
+        left_estimate, right_estimate = self.estimates(x)
+        nodes.push(Node(node, fixings + [(x.idx, lb, math.floor(value))], bound, left_estimate, (x.idx, 0, fraction)))
+        nodes.push(Node(node, fixings + [(x.idx, math.ceil(value), ub)], bound, right_estimate, (x.idx, 1, fraction)))
 
-        best = 0
-        for i in range(1, len(models)):
-            if models[i].objective_value > models[best].objective_value:
-                best = i
-        return best
+        return nodes
 
-    def branch_and_bound1(self, m: Model) -> Tuple[List[int], int]:
+    def estimates(self, x: mip.Var) -> Tuple[float, float]:
         """
-        Solves the given Maximixation (M)ILP problem using Branch & Bound with lecture variable selection.
+        Estimates the objective value of the best solution below the two children of the active node.
+        Every fractional variable is expected to degrade the objective by its cost times the distance
+        to the closest integer; in each child the branching variable is moved to its new bound.
         Args:
-            m (Model): The (M)ILP problem to solve.
+            x (mip.Var): The branching variable.
         Returns:
-            Tuple[List[int], int]: A tuple containing the optimal solution and the optimal objective value.
+            Tuple[float, float]: The estimates of the left (x <= floor) and right (x >= ceil) child.
         """
-        m.verbose = 0
+        bound = self.sense * self.node_lp.objective_value
+        if self.node_strategy != NodeSelectionStrategy.BEST_ESTIMATE:
+            return bound, bound
 
-        # Solve the model
-        m.optimize(relax=True)
+        fractions = fractional_parts(self.values)
+        degradation = float(np.dot(self.costs, np.minimum(fractions, 1 - fractions)))
 
-        # Return if the problem is infeasible
-        if m.num_solutions == 0:
-            if self.problem_type == ProblemType.MAXIMIZATION:
-                return [], -INFINITY
-            return [], INFINITY
-
-        # Get the optimal solution
-        optimal_solution = []
-
-        # print("INITIAL SOLUTION: ", optimal_solution)
-        # print("INITIAL OBJECTIVE VALUE: ", m.objective_value)   
-
-        # Finish if the solution is already integer
-        if self.is_ILP_solution(m.vars):
-            return [int(x.x) for x in m.vars], m.objective_value
-        
-        # Bound objective value
-        if self.problem_type == ProblemType.MAXIMIZATION:
-            upper_bound = math.floor(m.objective_value)
-            lower_bound = -INFINITY
-        else: 
-            upper_bound = INFINITY
-            lower_bound = math.ceil(m.objective_value)
-
-        # Select variable to branch on
-        x = self.selection_of_variable(m.vars)
-
-        models = []
-        models = self.add_models_to_stack(models, m, x)
-
-        while len(models) > 0:
-            # Get next node (Best-node-first)
-            # models.sort(key=lambda x: x.objective_value, reverse=True)
-            # actual = models.pop(0)
-            index = self.best_node_first(models)
-            actual = models.pop(index)    
-                  
-            ####################
-            # PRUNATION PHASE: #
-            ####################
-
-            # Prunation by Infeasibility (not necessary since nodes are not in stack if infeasible)
-            if actual.num_solutions == 0: continue
-
-            # Prunation by Bound
-            if actual.objective_value <= lower_bound and self.problem_type == ProblemType.MAXIMIZATION: continue
-            if actual.objective_value >= upper_bound and self.problem_type == ProblemType.MINIMIZATION: continue
-
-            # Prunation by Optimality
-            if self.is_ILP_solution(actual.vars):
-                if self.problem_type == ProblemType.MAXIMIZATION and actual.objective_value > lower_bound:
-                    lower_bound = actual.objective_value
-                    optimal_solution = [int(x.x) for x in actual.vars]
-                    continue
-                if self.problem_type == ProblemType.MINIMIZATION and actual.objective_value < upper_bound:
-                    upper_bound = actual.objective_value
-                    optimal_solution = [int(x.x) for x in actual.vars]
-                    continue
-
-            # Select variable to branch on
-            x = self.selection_of_variable(actual.vars)
-
-            # Add new models to stack
-            models = self.add_models_to_stack(models, actual, x)
-
-        # MAXIMIZATION
-        if self.problem_type == ProblemType.MAXIMIZATION:
-            return optimal_solution, lower_bound
-        # MINIMIZATION
-        return optimal_solution, upper_bound
+        fraction = fractions[x.idx]
+        others = degradation - self.costs[x.idx] * min(fraction, 1 - fraction)
+        left = others + self.costs[x.idx] * fraction
+        right = others + self.costs[x.idx] * (1 - fraction)
+        return bound + self.sense * left, bound + self.sense * right
 
     def variable_selection_method_lecture(self, variables: List[mip.Var]) -> mip.Var:
         """
@@ -191,15 +227,9 @@ class Solution:
         Returns:
             mip.Var: The variable to branch on.
         """    
-        score = 1
-        best = None
-        for x in variables:
-            result = abs((x.x % 1) - 0.5)
-            if result < score:
-                score = result
-                best = x
-
-        return best
+        candidates = self.fractional_indices()
+        scores = np.abs(fractional_parts(self.values[candidates]) - 0.5)
+        return variables[candidates[np.argmin(scores)]]
 
     def variable_selection_method_self(self, variables: List[mip.Var]) -> mip.Var:
         """
@@ -212,129 +242,572 @@ class Solution:
         
         # Select a random variable
         return np.random.choice(variables)
-    
-    def minimization_branch_and_bound(self, m: Model) -> Tuple[List[int], int]:
+
+    def fractional_indices(self) -> np.ndarray:
         """
-        Solves the given Maximixation (M)ILP problem using Branch & Bound.
+        Returns the indices of the integer variables with a fractional value in the current LP solution.
+        Returns:
+            np.ndarray: The indices, in increasing order.
+        """
+        return np.flatnonzero(fractional_mask(self.values, self.integer, EPSILON))
+
+    def variable_selection_method_pseudocost(self, variables: List[mip.Var]) -> mip.Var:
+        """
+        Selects the fractional variable with the best predicted product score, using the
+        pseudo-costs learnt so far (uninitialized ones take the average pseudo-cost).
         Args:
-            m (Model): The (M)ILP problem to solve.
+            variables (List[mip.Var]): The variables to choose from.
         Returns:
-            Tuple[List[int], int]: A tuple containing the optimal solution and the optimal objective value.
+            mip.Var: The variable to branch on.
         """
-        
-        optimal_solution = []
-        C = [m]
-        upper_bound = INFINITY
+        candidates = self.fractional_indices()
+        scores = self.pseudo_costs.scores(fractional_parts(self.values[candidates]), candidates)
+        return variables[candidates[np.argmax(scores)]]
 
-        while len(C) > 0:
-            # print("STACK SIZE: ", len(C))
+    def variable_selection_method_strong(self, variables: List[mip.Var]) -> mip.Var:
+        """
+        Selects the variable with the best product score among the most fractional candidates,
+        solving the LP relaxations of both children of every candidate (strong branching).
+        Args:
+            variables (List[mip.Var]): The variables to choose from.
+        Returns:
+            mip.Var: The variable to branch on.
+        """
+        candidates = self.fractional_indices()
+        order = np.argsort(np.abs(fractional_parts(self.values[candidates]) - 0.5), kind='stable')
+        return self.strong_branching_selection(variables, candidates[order[:STRONG_CANDIDATES]], None)
 
-            # Get next node 
-            current_problem = C[0]
+    def variable_selection_method_reliability(self, variables: List[mip.Var]) -> mip.Var:
+        """
+        Selects the variable with the best product score, ranking the candidates by their pseudo-costs
+        and strong branching on the best unreliable ones (too few observations) to get their real score.
+        Strong branching stops after a few candidates without improvement.
+        Args:
+            variables (List[mip.Var]): The variables to choose from.
+        Returns:
+            mip.Var: The variable to branch on.
+        """
+        candidates = self.fractional_indices()
+        scores = self.pseudo_costs.scores(fractional_parts(self.values[candidates]), candidates)
+        order = np.argsort(-scores, kind='stable')[:STRONG_CANDIDATES]
+        return self.strong_branching_selection(variables, candidates[order], scores[order])
 
-            # Solve the model
-            current_problem.verbose = 0
-            status = current_problem.optimize(relax=True)
+    def strong_branching_selection(self, variables: List[mip.Var], candidates: np.ndarray, scores: np.ndarray) -> mip.Var:
+        """
+        Scores the candidates by strong branching and returns the best one. With scores given,
+        only unreliable candidates are strong branched (the others keep their pseudo-cost score)
+        and the loop stops after RELIABILITY_LOOKAHEAD candidates without improvement.
+        The strong branching LPs also update the pseudo-costs and are kept in the node cache for the children.
+        Args:
+            variables (List[mip.Var]): The variables of the model.
+            candidates (np.ndarray): Indices of the candidates, best first.
+            scores (np.ndarray): Pseudo-cost score of every candidate (None for pure strong branching).
+        Returns:
+            mip.Var: The variable to branch on.
+        """
+        m = self.model
+        objective = self.node_lp.objective_value
+        values = self.values
+
+        best, best_score, without_improvement = None, -INFINITY, 0
+        for position, idx in enumerate(candidates):
+            x = variables[idx]
+            if scores is not None and self.pseudo_costs.is_reliable(idx):
+                candidate_score = scores[position]
+            else:
+                fraction = values[idx] - math.floor(values[idx])
+                down, up = strong_branching(m, self.bounds, x, values[idx], self.sense, self.cache)
+                self.pseudo_costs.update(x.idx, 0, fraction, down - objective)
+                self.pseudo_costs.update(x.idx, 1, fraction, up - objective)
+                candidate_score = score(down - objective, up - objective)
+
+            if candidate_score > best_score:
+                best, best_score, without_improvement = x, candidate_score, 0
+            else:
+                without_improvement += 1
+                if scores is not None and without_improvement >= RELIABILITY_LOOKAHEAD:
+                    break
+        return best
 
-            # Prunation by Infeasibility
-            if status == OptimizationStatus.INFEASIBLE or status == OptimizationStatus.NO_SOLUTION_FOUND or current_problem.objective_value == None: 
-                # print("Prunation by Infeasibility")
-                pass
-            else: 
-
-                current_objective_value = current_problem.objective_value
-                current_lower_bound = math.ceil(current_objective_value)
-
-                # Prunation by Optimality
-                if status == OptimizationStatus.OPTIMAL and self.is_ILP_solution(current_problem.vars) and current_objective_value < upper_bound:
-                    upper_bound = current_objective_value
-                    optimal_solution = [int(x.x) for x in current_problem.vars]
-                    # print("Prunation by Optimality")
-                    # print("UPPER BOUND: ", current_objective_value)
-                    
-                # Prunation by bound
-                elif current_lower_bound >= upper_bound: 
-                    # print("Prunation by Bound")
-                    pass
-
-                # Branch current problem
-                else:
-                    # print("Branching")
-                    x = self.selection_of_variable(current_problem.vars)
-                    C = self.add_models_to_stack(C, current_problem, x)
-
-            # Remove current problem from stack
-            C.remove(current_problem)
-            
-        return optimal_solution, upper_bound
+    def reduced_cost_fixing(self, objective_value: float, cutoff: float) -> List[BoundChange]:
+        """
+        Reduced cost fixing: moving a nonbasic integer variable away from its bound by t makes the LP
+        bound worse by at least t times its reduced cost, so in the subtree of the node it cannot move
+        further than (cutoff - objective value) / |reduced cost| and still beat the incumbent.
+        Args:
+            objective_value (float): Objective value of the LP relaxation of the node (minimization form).
+            cutoff (float): Objective value of the best known solution (minimization form).
+        Returns:
+            List[BoundChange]: The tightened bounds, the current LP solution satisfies them.
+        """
+        gap = cutoff - objective_value
+        d = self.sense * self.node_lp.reduced_costs
+        lb, ub = self.bounds.arrays()
+        values = self.values
+
+        at_lb = self.integer & (d > EPSILON) & (np.abs(values - lb) <= EPSILON)
+        at_ub = self.integer & (d < -EPSILON) & (np.abs(values - ub) <= EPSILON)
+        with np.errstate(divide='ignore'):
+            steps = np.floor(gap / np.abs(d) + EPSILON)
+        tighter_ub = at_lb & (lb + steps < ub)
+        tighter_lb = at_ub & (ub - steps > lb)
+        new_lb, new_ub = np.where(tighter_lb, ub - steps, lb), np.where(tighter_ub, lb + steps, ub)
+        return [(int(idx), float(new_lb[idx]), float(new_ub[idx])) for idx in np.flatnonzero(tighter_lb | tighter_ub)]
+
+    def round_bound(self, value: float) -> float:
+        """
+        Rounds a bound in minimization form up to the next objective value an integer solution can have, when
+        these are the objective constant plus an integer (integral costs of the integer variables and no cost
+        on the continuous ones, see setup).
+        Args:
+            value (float): The bound.
+        Returns:
+            float: The rounded bound (infinite bounds and bounds of other objectives are returned as they are).
+        """
+        if math.isinf(value) or not self.integral_objective:
+            return value
+        return math.ceil(value - self.objective_offset - EPSILON) + self.objective_offset
 
-    def maximization_branch_and_bound(self, m: Model) -> Tuple[List[int], int]:
+    def prune_reason(self, bound: float, cutoff: float) -> Optional[PruneReason]:
         """
-        Solves the given Maximixation (M)ILP problem using Branch & Bound.
+        Decides whether a node with the given bound can be pruned.
+        Args:
+            bound (float): Bound of the node (minimization form, not rounded).
+            cutoff (float): Objective value of the best known solution (minimization form).
+        Returns:
+            Optional[PruneReason]: BOUND if the node cannot beat the cutoff, GAP if it can only beat it by less
+            than the gap tolerance, None if it has to be explored.
+        """
+        bound = self.round_bound(bound)
+        if bound >= cutoff:
+            return PruneReason.BOUND
+        if cutoff < INFINITY and cutoff - bound <= max(self.absolute_gap, self.relative_gap * abs(cutoff)):
+            return PruneReason.GAP
+        return None
+
+    def limit_reached(self) -> bool:
+        """Returns True if the running search has to stop (time or node limit)."""
+        if self.node_budget is not None and self.statistics.nodes >= self.node_budget:
+            return True
+        return time.time() >= self.deadline
+
+    def start_limits(self):
+        """Starts the time and node limits of a search."""
+        self.deadline = time.time() + self.time_limit
+        self.node_budget = self.node_limit
+
+    def start_tree(self, C: NodeQueue) -> Tuple[List[float], float]:
+        """
+        Fills the empty queue with the root node, or with the open nodes of the checkpoint if there is one
+        (which also restores the incumbent, the tightened root bounds, the pseudo-costs and the statistics).
+        Args:
+            C (NodeQueue): The empty queue.
+        Returns:
+            Tuple[List[float], float]: The incumbent and its objective value (minimization form).
+        Raises:
+            ValueError: If the checkpoint belongs to another problem.
+        """
+        if self.checkpoint is None or not os.path.exists(self.checkpoint):
+            C.push(Node(None, [], -self.sense * INFINITY))
+            return [], INFINITY
+
+        checkpoint = Checkpoint.read(self.checkpoint)
+        if checkpoint.digest != self.data.digest():
+            raise ValueError("The checkpoint %s belongs to another problem" % self.checkpoint)
+        # Pushed in reverse, so that the nodes that were selected first come first again
+        for node in reversed(checkpoint.nodes):
+            C.push(node)
+        self.bounds.tighten_root(checkpoint.global_changes)
+        self.pseudo_costs.sums, self.pseudo_costs.counts = checkpoint.sums, checkpoint.counts
+        self.statistics.load_state(checkpoint.statistics)
+        self.node_count = self.statistics.nodes
+        if self.node_limit is not None:
+            self.node_budget = self.statistics.nodes + self.node_limit
+        if checkpoint.upper_bound < INFINITY and self.node_strategy == NodeSelectionStrategy.HYBRID:
+            C.set_strategy(NodeSelectionStrategy.BEST_BOUND)
+        optimal_solution = round_integers(np.array(checkpoint.optimal_solution), self.integer) if checkpoint.optimal_solution else []
+        return optimal_solution, checkpoint.upper_bound
+
+    def save_checkpoint(self, C: NodeQueue, optimal_solution: List[float], upper_bound: float):
+        """
+        Writes the state of the search to the checkpoint file (see Checkpoint).
+        Args:
+            C (NodeQueue): The open nodes.
+            optimal_solution (List[float]): The incumbent.
+            upper_bound (float): Objective value of the incumbent (minimization form).
+        """
+        Checkpoint(self.data.digest(), C.nodes(), optimal_solution, upper_bound, self.bounds.global_changes,
+                   self.pseudo_costs.sums, self.pseudo_costs.counts, self.statistics.state()).write(self.checkpoint)
+        self.next_checkpoint = time.time() + self.checkpoint_interval
+
+    def conclude(self, upper_bound: float, open_bound: float, open_nodes: int = 0):
+        """
+        Stores the result of a search: the dual bound (in the sense of the problem), which no solution can beat,
+        the relative gap of the incumbent to it, and the status: OPTIMAL when the gap is within the tolerance,
+        FEASIBLE when a limit stopped the search before, INFEASIBLE or NO_SOLUTION_FOUND without a solution.
+        Args:
+            upper_bound (float): Objective value of the incumbent (minimization form).
+            open_bound (float): Best bound of the nodes left open (minimization form, infinity if there are none).
+            open_nodes (int): Number of nodes left open.
+        """
+        bound = min(self.round_bound(open_bound), self.statistics.gap_bound, upper_bound)
+        self.bound = self.sense * bound
+        self.gap = relative_gap(upper_bound, bound)
+        if upper_bound == INFINITY:
+            self.status = OptimizationStatus.INFEASIBLE if bound == INFINITY else OptimizationStatus.NO_SOLUTION_FOUND
+        elif upper_bound - bound <= max(self.absolute_gap, self.relative_gap * abs(upper_bound)):
+            self.status = OptimizationStatus.OPTIMAL
+        else:
+            self.status = OptimizationStatus.FEASIBLE
+        self.statistics.finish(upper_bound, bound, open_nodes)
+
+    def conclude_solved(self, sense: int, objective_value: float):
+        """
+        Stores the result of a problem solved without a search (see conclude): by presolve or the knapsack algorithm.
+        Args:
+            sense (int): 1 for minimization, -1 for maximization.
+            objective_value (float): The optimal objective value (minimization form, infinity if the problem is infeasible).
+        """
+        self.sense = sense
+        self.integral_objective = False
+        self.conclude(objective_value, objective_value)
+
+    def prepare(self, m: Model, sense: int, data: ProblemData = None) -> Optional[Tuple[Model, ProblemData, Optional[Postsolve]]]:
+        """
+        Presolves the model, if enabled.
         Args:
             m (Model): The (M)ILP problem to solve.
+            sense (int): 1 for minimization, -1 for maximization.
+            data (ProblemData): Arrays of m (read from m if None).
+        Returns:
+            Optional[Tuple[Model, ProblemData, Optional[Postsolve]]]: The model to search, its arrays and the postsolve
+            that maps its solutions back to m (None without presolve), or None if presolve found the problem infeasible.
+        """
+        if not self.presolve:
+            return m, data if data is not None else ProblemData(m), None
+        return presolve(m, sense, data)
+
+    def knapsack_solution(self, data: ProblemData, sense: int) -> Optional[Tuple[List[float], float]]:
+        """
+        Solves the problem with the knapsack algorithm if it is a 0/1 knapsack (and that is enabled).
+        Args:
+            data (ProblemData): Arrays of the (M)ILP problem to solve.
+            sense (int): 1 for minimization, -1 for maximization.
+        Returns:
+            Optional[Tuple[List[float], float]]: The optimal solution and its objective value, or None
+            if the model is not a knapsack.
+        """
+        if not self.knapsack:
+            return None
+        knapsack = knapsack_problem(data, sense)
+        if knapsack is None:
+            return None
+        x = knapsack.solve()
+        return np.rint(x).astype(int).tolist(), data.objective(x)
+
+    def setup(self, m: Model, sense: int, data: ProblemData = None):
+        """
+        Prepares the given model as the working model of the search.
+        Args:
+            m (Model): The (M)ILP problem to solve.
+            sense (int): 1 for minimization, -1 for maximization.
+            data (ProblemData): Arrays of m (read from m if None).
+        """
+        if data is None:
+            data = ProblemData(m)
+        m.verbose = 0
+        m.lp_method = LP_Method.DUAL
+        if self.relaxation == RelaxationBackend.SIMPLEX:
+            m = SimplexModel(m, data)
+        self.model = m
+        self.sense = sense
+        self.bounds = NodeBounds(m)
+        self.pseudo_costs = PseudoCosts(m.num_cols)
+        self.integer = data.integer
+        self.values = None
+        self.node_lp: LPResult = None
+        self.cache = NodeCache(self.bounds, data.integer) if self.node_cache else None
+        self.node_count = 0
+        self.data = data
+        self.heuristics = PrimalHeuristics(m, self.bounds, sense, self.data) if self.primal_heuristics else None
+        self.separator = CutSeparator(m, self.bounds, self.data) if self.branch_and_cut else None
+
+        # Absolute objective coefficients of the integer variables, used by the best estimate node selection
+        self.costs = np.abs(data.c)
+        self.costs[~self.integer] = 0
+
+        # Objective values of integer solutions are the constant plus an integer when only integer variables have
+        # costs and these are integral (then bounds can be rounded, see round_bound)
+        self.integral_objective = bool(np.all(data.c[~self.integer] == 0) and np.all(data.c == np.round(data.c)))
+        self.objective_offset = sense * data.const
+
+    def cached_lp(self, node: Node, box: Tuple[np.ndarray, np.ndarray]) -> Optional[LPResult]:
+        """
+        Looks up the LP result of the active node in the node cache. Nodes where cuts are separated need
+        their LP on the working model and are not looked up.
+        Args:
+            node (Node): The active node.
+            box (Tuple[np.ndarray, np.ndarray]): Canonical box of the node (see NodeCache.box), None without a cache.
+        Returns:
+            Optional[LPResult]: The result, or None if the LP has to be solved.
+        """
+        if box is None or (self.separator is not None and node.depth <= CUT_MAX_DEPTH):
+            return None
+        return self.cache.get(bound_key(*box), *box)
+
+    def prune_node(self, box: Tuple[np.ndarray, np.ndarray], reason: PruneReason, bound: float = INFINITY):
+        """
+        Counts a node pruned after its LP (see SearchStatistics.prune) and keeps its box in the node cache,
+        so that the nodes inside it are pruned without their LP.
+        Args:
+            box (Tuple[np.ndarray, np.ndarray]): Canonical box of the node (see NodeCache.box), None without a cache.
+            reason (PruneReason): Why the node was pruned.
+            bound (float): Bound of the node (minimization form).
+        """
+        self.statistics.prune(reason, bound)
+        if box is not None:
+            self.cache.prune(*box)
+
+    def new_incumbent(self, values: np.ndarray, C: NodeQueue, incumbent) -> Tuple[List[float], float]:
+        """
+        Makes the given integer solution the incumbent. Only the integer variables are rounded, continuous
+        variables keep their LP value, and the objective value is evaluated at the returned solution.
+        Args:
+            values (np.ndarray): The solution (value of every variable).
+            C (NodeQueue): The open nodes (HYBRID switches to best bound with the first incumbent).
+            incumbent (multiprocessing.Value): Objective value shared by the workers of the parallel search (or None).
         Returns:
-            Tuple[List[int], int]: A tuple containing the optimal solution and the optimal objective value.
+            Tuple[List[float], float]: The solution (ints for the integer variables) and its objective value (minimization form).
         """
+        optimal_solution = round_integers(values, self.integer)
+        upper_bound = self.sense * self.data.objective(np.array(optimal_solution, dtype=np.float64))
+        if incumbent is not None:
+            with incumbent.get_lock():
+                incumbent.value = min(incumbent.value, upper_bound)
+        if self.node_strategy == NodeSelectionStrategy.HYBRID:
+            C.set_strategy(NodeSelectionStrategy.BEST_BOUND)
+        return optimal_solution, upper_bound
 
-        optimal_solution = []
-        C = [m]
-        lower_bound = -INFINITY
+    def node_queue(self) -> NodeQueue:
+        """
+        Creates an empty queue of open nodes for the node selection strategy.
+        HYBRID dives depth first until the first incumbent, then continues best bound first.
+        Any strategy selects depth first while the open nodes are near the memory budget.
+        Returns:
+            NodeQueue: The queue.
+        """
+        return NodeQueue(NodeSelectionStrategy.DFS if self.node_strategy == NodeSelectionStrategy.HYBRID else self.node_strategy, self.sense, self.node_memory)
+
+    def explore(self, C: NodeQueue, optimal_solution: List[float], upper_bound: float, frontier: int = None, incumbent=None, donate=None) -> Tuple[List[float], float]:
+        """
+        Processes open nodes of the queue on the working model (see setup) until it is empty or
+        the time or node limit is reached (see limit_reached).
+        Objective values are handled in minimization form (sense * objective).
+        Args:
+            C (NodeQueue): The open nodes, the nodes left unexplored stay in the queue.
+            optimal_solution (List[float]): The best solution known so far.
+            upper_bound (float): Objective value of optimal_solution (infinity if there is none).
+            frontier (int): Stop as soon as the queue holds this many open nodes (ramp-up of the parallel search).
+            incumbent (multiprocessing.Value): Objective value of the best solution of all workers, read to
+                prune and updated on improvement (parallel search).
+            donate (multiprocessing.Value): Flag set when other workers are idle; the first worker to see it
+                clears it and stops, handing its open nodes back (parallel search).
+        Returns:
+            Tuple[List[float], float]: The best solution found and its objective value (minimization form).
+        """
+        m = self.model
+        sense = self.sense
+        statistics = self.statistics
 
         while len(C) > 0:
             # print("STACK SIZE: ", len(C))
+            if frontier is not None and len(C) >= frontier:
+                break
+            if donate is not None and donate.value and len(C) > 1:
+                with donate.get_lock():
+                    if donate.value:
+                        donate.value = 0
+                        break
+            if self.limit_reached():
+                break
+            if time.time() >= self.next_checkpoint:
+                self.save_checkpoint(C, optimal_solution, upper_bound)
+
+            # Best objective value known (by this or any other worker)
+            cutoff = upper_bound if incumbent is None else min(upper_bound, incumbent.value)
 
             # Get next node 
-            current_problem = C[0]
-
-            # Solve the model
-            current_problem.verbose = 0
-            status = current_problem.optimize(relax=True)
+            current_node = C.pop()
+
+            # Prunation by the bound of the parent, without solving the LP
+            reason = self.prune_reason(sense * current_node.bound, cutoff)
+            if reason is not None:
+                statistics.prune(reason, self.round_bound(sense * current_node.bound))
+                continue
+
+            # Solve the LP relaxation of the node on the working model, unless the node cache holds it
+            with statistics.timer("lp"):
+                self.bounds.activate(current_node)
+                box = self.cache.box() if self.cache is not None else None
+                # Prunation by a pruned node whose box contains the node
+                if box is not None and self.cache.dominated(*box):
+                    statistics.prune(PruneReason.DOMINATED)
+                    continue
+                self.node_lp = self.cached_lp(current_node, box)
+                cached = self.node_lp is not None
+                if not cached:
+                    status = m.optimize(relax=True)
+            self.node_count += 1
+            statistics.node(len(C), cached, C.nbytes())
+            if statistics.nodes % TRACE_FREQUENCY == 0:
+                self.sample("progress", C, cutoff, sense * current_node.bound)
+
+            if not cached:
+                # Branch-and-cut: strengthen the relaxation of the root and the shallow nodes
+                if self.separator is not None and status == OptimizationStatus.OPTIMAL and current_node.depth <= CUT_MAX_DEPTH and not self.is_ILP_solution(lp_values(m)):
+                    with statistics.timer("cuts"):
+                        status = self.separator.separate(not self.bounds.active, sense)
+                self.node_lp = lp_result(m, status, sense)
+                if box is not None:
+                    self.cache.put(bound_key(*box), self.node_lp)
+            status = self.node_lp.status
 
             # Prunation by Infeasibility
-            if status == OptimizationStatus.INFEASIBLE or status == OptimizationStatus.NO_SOLUTION_FOUND or current_problem.objective_value == None: 
-                # print("Prunation by Infeasibility")
-                pass
-            else: 
-
-                current_objective_value = current_problem.objective_value
-                current_upper_bound = math.floor(current_objective_value)
-
-                # Prunation by Optimality
-                if status == OptimizationStatus.OPTIMAL and self.is_ILP_solution(current_problem.vars) and current_objective_value > lower_bound:
-                    lower_bound = current_objective_value
-                    optimal_solution = [int(x.x) for x in current_problem.vars]
-                    # print("Prunation by Optimality")
-                    # print("LOWER BOUND: ", current_objective_value)
-                    
-                # Prunation by bound
-                elif current_upper_bound <= lower_bound: 
-                    # print("Prunation by Bound")
-                    pass
-
-                # Branch current problem
-                else:
-                    # print("Branching")
-                    x = self.selection_of_variable(current_problem.vars)
-                    C = self.add_models_to_stack(C, current_problem, x)
-
-            # Remove current problem from stack
-            C.remove(current_problem)
-
-        else: return optimal_solution, lower_bound
-
-    def branch_and_bound(self, m: Model) -> Tuple[List[int], int]:
+            if status == OptimizationStatus.INFEASIBLE:
+                self.prune_node(box, PruneReason.INFEASIBLE)
+                continue
+
+            current_objective_value = self.node_lp.objective_value
+
+            # All checks and scores work on the LP solution of the node, the working model may hold another one
+            self.values = self.node_lp.values
+
+            # Learn the pseudo-cost of the branching that created the node
+            if current_node.branching is not None:
+                idx, direction, fraction = current_node.branching
+                self.pseudo_costs.update(idx, direction, fraction, current_objective_value - sense * current_node.bound)
+
+            # Primal heuristics: look for a better incumbent around the LP solution before branching
+            if self.heuristics is not None and status == OptimizationStatus.OPTIMAL and self.prune_reason(current_objective_value, cutoff) is None and not self.is_ILP_solution(self.values):
+                with statistics.timer("heuristics"):
+                    x, _ = self.heuristics.run(self.values, self.node_count, cutoff, optimal_solution)
+                if x is not None:
+                    optimal_solution, upper_bound = self.new_incumbent(x, C, incumbent)
+                    cutoff = min(cutoff, upper_bound)
+                    self.sample("incumbent", C, cutoff, current_objective_value)
+
+            reason = self.prune_reason(current_objective_value, cutoff)
+
+            # Prunation by Optimality
+            if status == OptimizationStatus.OPTIMAL and self.is_ILP_solution(self.values) and current_objective_value < cutoff:
+                optimal_solution, upper_bound = self.new_incumbent(self.values, C, incumbent)
+                self.prune_node(box, PruneReason.OPTIMALITY)
+                self.sample("incumbent", C, min(cutoff, upper_bound))
+                
+            # Prunation by bound
+            elif reason is not None:
+                self.prune_node(box, reason, self.round_bound(current_objective_value))
+
+            # Branch current node
+            else:
+                with statistics.timer("branching"):
+                    # Reduced cost fixing against the incumbent: for the whole tree at the root, else for the subtree
+                    fixings = []
+                    if status == OptimizationStatus.OPTIMAL and cutoff < INFINITY:
+                        fixings = self.reduced_cost_fixing(current_objective_value, cutoff)
+                        if not self.bounds.active:
+                            self.bounds.tighten_root(fixings)
+                            fixings = []
+                        else:
+                            # Also on the working model, so strong branching solves the LPs of the children as they are created
+                            self.bounds.tighten(fixings)
+                    x = self.selection_of_variable(m.vars)
+                    C = self.add_nodes_to_stack(C, current_node, x, fixings)
+
+        return optimal_solution, upper_bound
+
+    def search(self, m: Model, sense: int, data: ProblemData = None) -> Tuple[List[float], float]:
+        """
+        Branch & Bound on a single working model. Every node only stores its bound
+        changes; the working LP is moved to the node and re-solved with the dual simplex.
+        When a time or node limit stops the search, the best solution found is returned; the dual
+        bound, the gap and the status are then in self.bound, self.gap and self.status (see conclude).
+        With a checkpoint file, the search is resumed from it (see start_tree).
+        Args:
+            m (Model): The (M)ILP problem to solve.
+            sense (int): 1 for minimization, -1 for maximization.
+            data (ProblemData): Arrays of m, e.g. from mps.load_model (read from m if None).
+        Returns:
+            Tuple[List[float], float]: A tuple containing the optimal solution and the optimal objective value.
+        """
+        statistics = self.start_statistics(sense)
+        self.start_limits()
+        with statistics.timer("presolve"):
+            prepared = self.prepare(m, sense, data)
+        if prepared is None:
+            self.conclude_solved(sense, INFINITY)
+            return [], sense * INFINITY
+        model, data, postsolve = prepared
+
+        solved = self.knapsack_solution(data, sense)
+        if solved is not None:
+            optimal_solution, optimal_objective_value = solved
+            self.conclude_solved(sense, sense * optimal_objective_value)
+            return postsolve_solution(postsolve, optimal_solution), optimal_objective_value
+
+        self.setup(model, sense, data)
+        C = self.node_queue()
+        optimal_solution, upper_bound = self.start_tree(C)
+        if self.checkpoint is not None:
+            self.next_checkpoint = time.time() + self.checkpoint_interval
+        optimal_solution, upper_bound = self.explore(C, optimal_solution, upper_bound)
+        self.next_checkpoint = INFINITY
+
+        # A search stopped by a limit can be resumed from its checkpoint, a complete one has nothing left to resume
+        if self.checkpoint is not None:
+            if len(C) > 0:
+                self.save_checkpoint(C, optimal_solution, upper_bound)
+            elif os.path.exists(self.checkpoint):
+                os.remove(self.checkpoint)
+        self.bounds.restore()
+        self.conclude(upper_bound, C.best_bound(), len(C))
+        return postsolve_solution(postsolve, optimal_solution), sense * upper_bound
+
+    def minimization_branch_and_bound(self, m: Model, data: ProblemData = None) -> Tuple[List[float], float]:
+        """
+        Solves the given Minimization (M)ILP problem using Branch & Bound.
+        Args:
+            m (Model): The (M)ILP problem to solve.
+            data (ProblemData): Arrays of m (read from m if None).
+        Returns:
+            Tuple[List[float], float]: A tuple containing the optimal solution and the optimal objective value.
+        """
+        return self.search(m, 1, data)
+
+    def maximization_branch_and_bound(self, m: Model, data: ProblemData = None) -> Tuple[List[float], float]:
+        """
+        Solves the given Maximixation (M)ILP problem using Branch & Bound.
+        Args:
+            m (Model): The (M)ILP problem to solve.
+            data (ProblemData): Arrays of m (read from m if None).
+        Returns:
+            Tuple[List[float], float]: A tuple containing the optimal solution and the optimal objective value.
+        """
+        return self.search(m, -1, data)
+
+    def branch_and_bound(self, m: Model, data: ProblemData = None) -> Tuple[List[float], float]:
         """
         Solves the given (M)ILP problem using Branch & Bound.
         Args:
             m (Model): The (M)ILP problem to solve.
+            data (ProblemData): Arrays of m, e.g. from mps.load_model (read from m if None).
         Returns:
-            Tuple[List[int], int]: A tuple containing the optimal solution and the optimal objective value.
+            Tuple[List[float], float]: A tuple containing the optimal solution and the optimal objective value.
         """
 
         if self.problem_type == ProblemType.MAXIMIZATION:
-            return self.maximization_branch_and_bound(m)
-        return self.minimization_branch_and_bound(m)
+            return self.maximization_branch_and_bound(m, data)
+        return self.minimization_branch_and_bound(m, data)
 
 if __name__ == '__main__':
     
@@ -343,31 +816,35 @@ if __name__ == '__main__':
     start_time = time.time()
 
     # for i in range(10):
-    # Example 1
-    m = Model(sense=MAXIMIZE)
-    m.read("random.mps")
+    # Example 1 (node selection: NodeSelectionStrategy.DFS, BEST_BOUND, BEST_ESTIMATE or HYBRID;
+    #            variable selection: VariableSelectionStrategy.LECTURE, SELF, PSEUDOCOST, STRONG or RELIABILITY;
+    #            node LPs: relaxation=RelaxationBackend.SOLVER or SIMPLEX, node_cache=False to solve every node LP;
+    #            anytime: time_limit=..., node_limit=..., relative_gap=0.001, then sol.bound, sol.gap and sol.status;
+    #            checkpoint="random.ckpt" to resume a stopped or killed search;
+    #            node_memory=... bytes for the open nodes, near it the search goes depth first)
+    m, data = load_model("random.mps", MAXIMIZE)
     sol = Solution(ProblemType.MAXIMIZATION, VariableSelectionStrategy.LECTURE)
-    optimal_solution, optimal_objective_value = sol.branch_and_bound(m)
+    optimal_solution, optimal_objective_value = sol.branch_and_bound(m, data)
 
     print("Optimal solution: ", optimal_solution)
     print("Optimal objective value: ", optimal_objective_value)
+    # Statistics of the search (sol.add_callback follows the progress, write_json / write_csv export the trace)
+    print("Statistics: ", sol.statistics.summary())
     print('-'*50)
 
     # Example 2
-    m = Model(sense=MAXIMIZE)
-    m.read("knapsack_students.mps")
+    m, data = load_model("knapsack_students.mps", MAXIMIZE)
     sol = Solution(ProblemType.MAXIMIZATION, VariableSelectionStrategy.LECTURE)
-    optimal_solution, optimal_objective_value = sol.branch_and_bound(m)
+    optimal_solution, optimal_objective_value = sol.branch_and_bound(m, data)
 
     print("Optimal solution: ", optimal_solution) 
     print("Optimal objective value: ", optimal_objective_value)
     print('-'*50)
 
     # Example 3
-    m = Model(sense=MINIMIZE)
-    m.read("g503inf.mps")
+    m, data = load_model("g503inf.mps", MINIMIZE)
     sol = Solution(ProblemType.MINIMIZATION, VariableSelectionStrategy.LECTURE)
-    optimal_solution, optimal_objective_value = sol.branch_and_bound(m)
+    optimal_solution, optimal_objective_value = sol.branch_and_bound(m, data)
 
     print("Optimal solution: ", optimal_solution)
     print("Optimal objective value: ", optimal_objective_value)
@@ -0,0 +1,267 @@
+from mip import *
+import math
+import numpy as np
+from typing import List, Optional, Tuple
+from nodes import NodeBounds
+from problem import ProblemData
+from lp_arrays import lp_values, fractional_parts, fractional_mask
+
+INFINITY = float('inf')
+EPSILON = 1e-6
+
+# Diving is done at the root and then every DIVING_FREQUENCY nodes
+DIVING_FREQUENCY = 50
+
+# Periodic dives may solve at most this share of the LPs solved for the nodes
+DIVING_LP_SHARE = 0.1
+
+# Maximum number of LPs solved by one dive
+MAX_DIVE_DEPTH = 100
+
+# Maximum number of rounds of the feasibility pump
+PUMP_ITERATIONS = 30
+
+# Number of variables flipped by the feasibility pump when it cycles
+PUMP_FLIPS = 10
+
+class PrimalHeuristics:
+    """
+    Primal heuristics of the Branch & Bound: they look for feasible integer solutions
+    around the LP solution of a node, so an incumbent is known (and nodes are pruned
+    by bound) before a node LP happens to be integral.
+
+    Rounding (simple and slack-aware) is cheap and runs at every node. Fractional and
+    guided diving solve a sequence of LPs on the working model and run at the root and
+    periodically. The feasibility pump runs at the root when nothing else found a solution.
+    """
+
+    def __init__(self, m: Model, bounds: NodeBounds, sense: int, data: ProblemData):
+        """
+        Constructor of the heuristics.
+        Args:
+            m (Model): The working model.
+            bounds (NodeBounds): Bounds of the active node of the working model.
+            sense (int): 1 for minimization, -1 for maximization.
+            data (ProblemData): Arrays of the original problem.
+        """
+        self.model = m
+        self.bounds = bounds
+        self.sense = sense
+        self.data = data
+        self.down_locks, self.up_locks = self.data.locks()
+        self.colptr, self.col_rows, self.col_data = self.data.column_rows()
+        # Number of LPs solved by the dives
+        self.lps = 0
+
+    def value(self, x: np.ndarray) -> float:
+        """Returns the objective value of x in minimization form."""
+        return self.sense * self.data.objective(x)
+
+    def feasible(self, x: np.ndarray) -> Optional[np.ndarray]:
+        """Returns x if it is integral and feasible for the original problem, None otherwise."""
+        if fractional_mask(x, self.data.integer, EPSILON).any():
+            return None
+        return x if self.data.is_feasible(x, self.data.lb, self.data.ub, EPSILON) else None
+
+    def snap(self, values: np.ndarray) -> np.ndarray:
+        """Returns a copy of values with the (almost) integral integer variables set to the integer."""
+        x = values.copy()
+        integral = self.data.integer & ~fractional_mask(values, self.data.integer, EPSILON)
+        x[integral] = np.rint(x[integral])
+        return x
+
+    def simple_rounding(self, values: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Rounds every fractional variable in a direction without locks, which keeps every constraint satisfied.
+        Args:
+            values (np.ndarray): The LP solution.
+        Returns:
+            Optional[np.ndarray]: The rounded solution, or None if some variable is locked in both directions.
+        """
+        fractional = fractional_mask(values, self.data.integer, EPSILON)
+        down = fractional & (self.down_locks == 0)
+        up = fractional & ~down & (self.up_locks == 0)
+        if np.any(fractional & ~down & ~up):
+            return None
+        x = self.snap(values)
+        x[down] = np.floor(x[down])
+        x[up] = np.ceil(x[up])
+        return self.feasible(x)
+
+    def slack_rounding(self, values: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Rounds the fractional variables one by one (least fractional first), each in the direction
+        that is better for the objective if the slacks of its constraints allow it, otherwise in the
+        other direction.
+        Args:
+            values (np.ndarray): The LP solution.
+        Returns:
+            Optional[np.ndarray]: The rounded solution, or None if some variable fits in neither direction.
+        """
+        x = self.snap(values)
+        activity = self.data.activity(x)
+        fractions = fractional_parts(x)
+        candidates = np.flatnonzero(fractional_mask(values, self.data.integer, EPSILON))
+        candidates = candidates[np.argsort(np.minimum(fractions[candidates], 1 - fractions[candidates]), kind='stable')]
+
+        for j in candidates:
+            rows = self.col_rows[self.colptr[j]:self.colptr[j+1]]
+            coefficients = self.col_data[self.colptr[j]:self.colptr[j+1]]
+            deltas = (-fractions[j], 1 - fractions[j])
+            if self.sense * self.data.c[j] < 0:
+                deltas = deltas[::-1]
+            for delta in deltas:
+                new_activity = activity[rows] + coefficients * delta
+                if np.all(new_activity >= self.data.row_lb[rows] - EPSILON) and np.all(new_activity <= self.data.row_ub[rows] + EPSILON):
+                    activity[rows] = new_activity
+                    x[j] = round(x[j] + delta)
+                    break
+            else:
+                return None
+        return self.feasible(x)
+
+    def rounding(self, values: np.ndarray) -> Optional[np.ndarray]:
+        """Runs the rounding heuristics on an LP solution and returns the first solution found."""
+        x = self.simple_rounding(values)
+        if x is None:
+            x = self.slack_rounding(values)
+        return x
+
+    def dive(self, values: np.ndarray, cutoff: float, guide: np.ndarray = None) -> Optional[np.ndarray]:
+        """
+        Dives from the active node: repeatedly bounds one fractional variable and re-solves the LP,
+        trying the rounding heuristics on every LP solution. Fractional diving bounds the least fractional
+        variable towards its closest integer; guided diving bounds the variable closest to the incumbent
+        (guide) towards it. When a bound makes the LP infeasible the other direction is tried once.
+        The bounds of the node are restored afterwards (the working LP has to be re-solved).
+        Args:
+            values (np.ndarray): The LP solution of the node.
+            cutoff (float): Objective value (minimization form) a solution must improve.
+            guide (np.ndarray): The incumbent, for guided diving (None for fractional diving).
+        Returns:
+            Optional[np.ndarray]: The best solution found.
+        """
+        m = self.model
+        changed = set()
+        best, best_value = None, cutoff
+        for _ in range(MAX_DIVE_DEPTH):
+            x = self.rounding(values)
+            if x is not None and self.value(x) < best_value:
+                best, best_value = x, self.value(x)
+
+            candidates = np.flatnonzero(fractional_mask(values, self.data.integer, EPSILON))
+            if len(candidates) == 0:
+                break
+
+            fractions = fractional_parts(values[candidates])
+            if guide is None:
+                distances = np.minimum(fractions, 1 - fractions)
+                up = fractions > 0.5
+            else:
+                distances = np.abs(values[candidates] - guide[candidates])
+                up = guide[candidates] > values[candidates]
+            position = int(np.argmin(distances))
+            j = int(candidates[position])
+
+            lb, ub = m.vars[j].lb, m.vars[j].ub
+            changed.add(j)
+            directions = (True, False) if up[position] else (False, True)
+            for direction in directions:
+                if direction:
+                    m.vars[j].lb = math.ceil(values[j])
+                else:
+                    m.vars[j].ub = math.floor(values[j])
+                status = m.optimize(relax=True)
+                self.lps += 1
+                if status == OptimizationStatus.OPTIMAL and self.sense * m.objective_value < best_value:
+                    break
+                m.vars[j].lb, m.vars[j].ub = lb, ub
+            else:
+                break
+            values = lp_values(m)
+
+        for j in changed:
+            m.vars[j].lb, m.vars[j].ub = self.bounds.bounds(j)
+        return best
+
+    def feasibility_pump(self, values: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Feasibility pump: alternates between rounding the LP solution and solving the LP that minimizes
+        the distance to the rounded point, until the rounded point is feasible. The distance is the L1
+        distance over the integer variables rounded to one of their bounds (binaries in the usual case).
+        When the rounded point repeats, the variables furthest from it are flipped.
+        The objective of the working model is restored afterwards (the working LP has to be re-solved).
+        Args:
+            values (np.ndarray): The LP solution of the node.
+        Returns:
+            Optional[np.ndarray]: A feasible solution, or None if none was found.
+        """
+        m = self.model
+        objective = m.objective
+        lb, ub = self.bounds.arrays()
+        # The distance is minimized, whatever the sense of the model
+        direction = 1 if m.sense == MINIMIZE else -1
+
+        found, previous = None, None
+        integer = self.data.integer
+        for _ in range(PUMP_ITERATIONS):
+            rounded = self.snap(values)
+            rounded[integer] = np.rint(rounded[integer])
+            if previous is not None and np.array_equal(rounded[integer], previous[integer]):
+                candidates = np.flatnonzero(integer)
+                furthest = candidates[np.argsort(-np.abs(values[candidates] - rounded[candidates]))[:PUMP_FLIPS]]
+                rounded[furthest] = np.where(values[furthest] > rounded[furthest], rounded[furthest] + 1, rounded[furthest] - 1)
+                rounded = np.clip(rounded, lb, ub)
+            previous = rounded
+
+            found = self.feasible(rounded)
+            if found is not None:
+                break
+
+            at_lb = integer & (rounded <= lb + EPSILON)
+            at_ub = integer & ~at_lb & (rounded >= ub - EPSILON)
+            m.objective = xsum(direction * m.vars[j] for j in np.flatnonzero(at_lb)) - xsum(direction * m.vars[j] for j in np.flatnonzero(at_ub))
+            if m.optimize(relax=True) != OptimizationStatus.OPTIMAL:
+                break
+            values = lp_values(m)
+
+            found = self.rounding(values)
+            if found is not None:
+                break
+
+        m.objective = objective
+        return found
+
+    def run(self, values: np.ndarray, node_count: int, cutoff: float, incumbent: List[int]) -> Tuple[Optional[np.ndarray], bool]:
+        """
+        Runs the heuristics due at a node.
+        Args:
+            values (np.ndarray): The LP solution of the node.
+            node_count (int): Number of nodes solved so far (1 at the root).
+            cutoff (float): Objective value (minimization form) a solution must improve.
+            incumbent (List[int]): The incumbent (empty if there is none).
+        Returns:
+            Tuple[Optional[np.ndarray], bool]: The best solution found that improves the cutoff, and
+            whether the working LP was changed (and has to be re-solved for the node).
+        """
+        best, best_value = None, cutoff
+        x = self.rounding(values)
+        if x is not None and self.value(x) < best_value:
+            best, best_value = x, self.value(x)
+
+        resolve = False
+        if node_count == 1 or (node_count % DIVING_FREQUENCY == 0 and self.lps < DIVING_LP_SHARE * node_count):
+            resolve = True
+            guides = [None] if len(incumbent) == 0 else [None, np.array(incumbent, dtype=np.float64)]
+            for guide in guides:
+                x = self.dive(values, best_value, guide)
+                if x is not None and self.value(x) < best_value:
+                    best, best_value = x, self.value(x)
+
+        if node_count == 1 and best is None and len(incumbent) == 0:
+            resolve = True
+            x = self.feasibility_pump(values)
+            if x is not None and self.value(x) < best_value:
+                best, best_value = x, self.value(x)
+
+        return best, resolve
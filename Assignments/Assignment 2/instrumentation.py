@@ -0,0 +1,221 @@
+import csv
+import json
+import math
+import time
+from contextlib import contextmanager
+from enum import Enum, unique
+from typing import Callable, Dict, List, Tuple
+
+# The trace gets a sample every this many nodes (and at every new incumbent)
+TRACE_FREQUENCY = 100
+
+# Columns of the trace: seconds since the start, nodes processed, open nodes, incumbent and dual bound
+# (in the sense of the problem) and the event that took the sample
+TRACE_FIELDS = ("time", "nodes", "open_nodes", "incumbent", "bound", "event")
+
+# Phases of the search whose time is measured; the time outside all of them is overhead
+PHASES = ("presolve", "lp", "cuts", "heuristics", "branching")
+
+# A sample of the trace (see TRACE_FIELDS)
+TraceSample = Tuple[float, int, int, float, float, str]
+
+@unique
+class PruneReason(Enum):
+    # The LP relaxation of the node is infeasible
+    INFEASIBLE = 1
+    # The bound of the node (or of its parent) cannot beat the incumbent
+    BOUND = 2
+    # The LP solution of the node is integral
+    OPTIMALITY = 3
+    # The bound of the node is within the gap tolerance of the incumbent
+    GAP = 4
+    # The box of the node lies inside the box of a pruned node (see NodeCache)
+    DOMINATED = 5
+
+def relative_gap(incumbent: float, bound: float) -> float:
+    """
+    Returns the relative gap between the incumbent and the dual bound, (incumbent - bound) / |incumbent|.
+    Args:
+        incumbent (float): Objective value of the incumbent (minimization form, infinity if there is none).
+        bound (float): Dual bound (minimization form).
+    Returns:
+        float: The gap (0 when they meet, infinity without an incumbent or a bound).
+    """
+    if incumbent <= bound:
+        return 0.0
+    if math.isinf(incumbent) or math.isinf(bound):
+        return math.inf
+    return (incumbent - bound) / max(abs(incumbent), 1e-10)
+
+class SearchStatistics:
+    """
+    Statistics of a Branch & Bound search: nodes processed, the most open nodes at once, the time
+    of every phase (see PHASES), prunes by reason, and a trace of the incumbent and the dual bound
+    over time. Objective values are kept in minimization form and reported in the sense of the problem.
+    Every sample of the trace is also passed to the callbacks, as callback(statistics, sample),
+    so that a caller can follow the search while it runs.
+    """
+
+    def __init__(self, sense: int, callbacks: List[Callable[["SearchStatistics", TraceSample], None]] = ()):
+        """
+        Constructor of the statistics, the clock starts now.
+        Args:
+            sense (int): 1 for minimization, -1 for maximization.
+            callbacks (List[Callable]): Functions called with every sample of the trace.
+        """
+        self.sense = sense
+        self.callbacks = list(callbacks)
+        self.start = time.perf_counter()
+        self.end = None
+        self.nodes = 0
+        # Nodes whose LP relaxation was taken from the node cache instead of solved
+        self.cached_nodes = 0
+        self.max_open_nodes = 0
+        # Most memory (bytes) the open nodes took at once (see NodeQueue.nbytes)
+        self.max_node_memory = 0
+        self.times: Dict[str, float] = {phase: 0.0 for phase in PHASES}
+        self.prunes: Dict[PruneReason, int] = {reason: 0 for reason in PruneReason}
+        self.incumbent = math.inf
+        self.bound = -math.inf
+        # Best bound of the nodes pruned by the gap tolerance, which the dual bound cannot exceed
+        self.gap_bound = math.inf
+        self.trace: List[TraceSample] = []
+
+    def elapsed(self) -> float:
+        """Returns the seconds since the start (until finish, if it was called)."""
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    @contextmanager
+    def timer(self, phase: str):
+        """Adds the time spent in the block to the given phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.times[phase] += time.perf_counter() - start
+
+    def node(self, open_nodes: int, cached: bool = False, memory: int = 0):
+        """
+        Counts a processed node.
+        Args:
+            open_nodes (int): Number of open nodes left in the queue.
+            cached (bool): Whether its LP relaxation was taken from the node cache.
+            memory (int): Memory of the open nodes in bytes.
+        """
+        self.nodes += 1
+        self.cached_nodes += cached
+        self.max_open_nodes = max(self.max_open_nodes, open_nodes)
+        self.max_node_memory = max(self.max_node_memory, memory)
+
+    def prune(self, reason: PruneReason, bound: float = math.inf):
+        """
+        Counts a pruned node.
+        Args:
+            reason (PruneReason): Why the node was pruned.
+            bound (float): Bound of the node (minimization form), kept for the nodes pruned by the gap tolerance.
+        """
+        self.prunes[reason] += 1
+        if reason == PruneReason.GAP:
+            self.gap_bound = min(self.gap_bound, bound)
+
+    def sample(self, event: str, open_nodes: int, incumbent: float, bound: float):
+        """
+        Adds a sample to the trace and passes it to the callbacks.
+        Args:
+            event (str): What took the sample ("incumbent", "progress" or "end").
+            open_nodes (int): Number of open nodes.
+            incumbent (float): Objective value of the incumbent (minimization form, infinity if there is none).
+            bound (float): Best bound of the open nodes (minimization form).
+        """
+        self.incumbent = incumbent
+        self.bound = min(bound, self.gap_bound, incumbent)
+        sample = (round(self.elapsed(), 6), self.nodes, open_nodes, self.sense * self.incumbent, self.sense * self.bound, event)
+        self.trace.append(sample)
+        for callback in self.callbacks:
+            callback(self, sample)
+
+    def finish(self, incumbent: float, bound: float, open_nodes: int = 0):
+        """Stops the clock and takes the last sample (see sample); nodes stay open when a limit stopped the search."""
+        self.sample("end", open_nodes, incumbent, bound)
+        self.end = time.perf_counter()
+
+    def merge(self, other: "SearchStatistics"):
+        """
+        Adds the counters and phase times of another search (a subtree solved by a worker process).
+        The times of parallel workers add up, so they can exceed the elapsed time.
+        """
+        self.nodes += other.nodes
+        self.cached_nodes += other.cached_nodes
+        self.gap_bound = min(self.gap_bound, other.gap_bound)
+        self.max_open_nodes = max(self.max_open_nodes, other.max_open_nodes)
+        self.max_node_memory = max(self.max_node_memory, other.max_node_memory)
+        for phase, seconds in other.times.items():
+            self.times[phase] += seconds
+        for reason, count in other.prunes.items():
+            self.prunes[reason] += count
+
+    def state(self) -> dict:
+        """
+        Returns the counters, times and trace of the statistics, to continue them in a resumed search (see load_state).
+        Returns:
+            dict: The state (JSON serializable).
+        """
+        return {"elapsed": self.elapsed(), "nodes": self.nodes, "cached_nodes": self.cached_nodes, "max_open_nodes": self.max_open_nodes,
+                "max_node_memory": self.max_node_memory, "times": self.times, "prunes": {reason.name: count for reason, count in self.prunes.items()},
+                "gap_bound": self.gap_bound, "trace": self.trace}
+
+    def load_state(self, state: dict):
+        """
+        Continues the statistics of an earlier search: the clock goes on from its elapsed time and the
+        counters and times add up.
+        Args:
+            state (dict): The state (see state).
+        """
+        self.start = time.perf_counter() - state["elapsed"]
+        self.nodes = state["nodes"]
+        self.cached_nodes = state.get("cached_nodes", 0)
+        self.max_open_nodes = state["max_open_nodes"]
+        self.max_node_memory = state.get("max_node_memory", 0)
+        for phase, seconds in state["times"].items():
+            self.times[phase] += seconds
+        self.prunes.update({PruneReason[name]: count for name, count in state["prunes"].items()})
+        self.gap_bound = state["gap_bound"]
+        self.trace = [tuple(sample) for sample in state["trace"]] + self.trace
+
+    def summary(self) -> dict:
+        """
+        Returns the statistics of the search.
+        Returns:
+            dict: Nodes, nodes per second, nodes taken from the node cache, the most open nodes and their memory, the time of every phase and the overhead,
+            prunes by reason, the final incumbent and dual bound (in the sense of the problem) and their relative gap.
+        """
+        elapsed = self.elapsed()
+        return {
+            "time": elapsed,
+            "nodes": self.nodes,
+            "nodes_per_second": self.nodes / elapsed if elapsed > 0 else 0.0,
+            "cached_nodes": self.cached_nodes,
+            "max_open_nodes": self.max_open_nodes,
+            "max_node_memory": self.max_node_memory,
+            "times": dict(self.times),
+            "overhead_time": max(0.0, elapsed - sum(self.times.values())),
+            "prunes": {reason.name.lower(): count for reason, count in self.prunes.items()},
+            "incumbent": self.sense * self.incumbent,
+            "bound": self.sense * self.bound,
+            "gap": relative_gap(self.incumbent, self.bound),
+        }
+
+    def write_json(self, path: str):
+        """Writes the summary and the trace to a JSON file (infinite values are written as null)."""
+        finite = lambda value: value if not isinstance(value, float) or math.isfinite(value) else None
+        summary = {key: finite(value) for key, value in self.summary().items()}
+        trace = [{field: finite(value) for field, value in zip(TRACE_FIELDS, sample)} for sample in self.trace]
+        with open(path, "w") as file:
+            json.dump({"summary": summary, "trace": trace}, file, indent=2)
+
+    def write_csv(self, path: str):
+        """Writes the trace to a CSV file, one row per sample (see TRACE_FIELDS)."""
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(TRACE_FIELDS)
+            writer.writerows(self.trace)
@@ -0,0 +1,191 @@
+from mip import *
+import numpy as np
+from typing import Optional
+from problem import ProblemData
+
+# Tolerance of the bound comparisons
+EPSILON = 1e-9
+
+class Knapsack:
+    """
+    Combinatorial solver of 0/1 knapsack problems: max p x s.t. w x <= C, x binary.
+    The items are sorted once by profit/weight ratio, which gives the Dantzig bound (the
+    LP relaxation: the items before the break item, plus the fraction of the break item that
+    fits) and a greedy solution. Items whose LP reduced cost proves that the other value
+    cannot beat the greedy solution are fixed; the others are solved exactly by dynamic
+    programming over a core of items around the break item that only expands while the
+    bounds of its states leave room for a better solution (see expanding_core).
+    """
+
+    def __init__(self, profits: np.ndarray, weights: np.ndarray, capacity: float):
+        """
+        Constructor of the knapsack.
+        Args:
+            profits (np.ndarray): Profit of every item.
+            weights (np.ndarray): Weight of every item (non-negative).
+            capacity (float): Capacity of the knapsack.
+        """
+        self.profits = np.asarray(profits, dtype=np.float64)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.capacity = float(capacity)
+        # Integral profits allow rounding the bounds down
+        self.integral = bool(np.all(self.profits == np.floor(self.profits)))
+        # Number of items left to the dynamic programming
+        self.core_size = 0
+
+    def round(self, bound: float) -> float:
+        """Rounds an upper bound down to the next integer if the profits are integral."""
+        return np.floor(bound + EPSILON) if self.integral else bound
+
+    def solve(self) -> np.ndarray:
+        """
+        Solves the knapsack.
+        Returns:
+            np.ndarray: The optimal value (0 or 1) of every item.
+        """
+        p, w, capacity = self.profits, self.weights, self.capacity
+        x = np.zeros(len(p))
+
+        # Items with no weight are free, items that do not pay or do not fit are never taken
+        x[(w <= 0) & (p > 0)] = 1
+        items = np.flatnonzero((w > 0) & (p > 0) & (w <= capacity))
+        items = items[np.argsort(-p[items] / w[items], kind='stable')]
+
+        # Break item: the first one of the ratio order that does not fit any more
+        filled = np.cumsum(w[items])
+        b = int(np.searchsorted(filled, capacity, side='right'))
+        if b == len(items):
+            x[items] = 1
+            return x
+        used = filled[b - 1] if b > 0 else 0.0
+        prefix = float(p[items[:b]].sum())
+        ratio = p[items[b]] / w[items[b]]
+        dantzig = prefix + (capacity - used) * ratio
+
+        # Greedy solution: the items before the break item, then every later item that still fits
+        greedy = np.zeros(len(items), dtype=bool)
+        greedy[:b] = True
+        residual = capacity - used
+        for k in range(b + 1, len(items)):
+            if w[items[k]] <= residual:
+                greedy[k] = True
+                residual -= w[items[k]]
+        lower = float(p[items[greedy]].sum())
+
+        # Reduction: moving an item away from its LP value costs at least its reduced cost
+        reduced = np.abs(p[items] - ratio * w[items])
+        free = self.round(dantzig - reduced) > lower + EPSILON
+        free[b] = True
+        self.core_size = int(free.sum())
+
+        chosen = self.expanding_core(items, b, free, used, prefix, lower)
+        x[items[greedy if chosen is None else chosen]] = 1
+        return x
+
+    def expanding_core(self, items: np.ndarray, b: int, free: np.ndarray, used: float, prefix: float, lower: float) -> Optional[np.ndarray]:
+        """
+        Dynamic programming over a core that expands around the break item (Pisinger). It starts
+        from the single state of the items before the break item and, alternately, lets the next
+        item after the core be added and the next item before the core be removed. The states are
+        the Pareto-optimal (weight, profit) pairs; a state is dropped when it is dominated (another
+        state weighs at most as much and earns at least as much) or when its bound cannot beat the
+        best solution: an underfull state can only be filled at the ratio of the next item after
+        the core, an overfull one has to give back its excess at the ratio of the next item before it.
+        Fixed items are skipped, they keep the value of the initial state.
+        Args:
+            items (np.ndarray): The items in decreasing ratio order.
+            b (int): Position of the break item.
+            free (np.ndarray): Mask of the items that are not fixed.
+            used (float): Weight of the items before the break item.
+            prefix (float): Profit of the items before the break item.
+            lower (float): Profit of the best known solution.
+        Returns:
+            Optional[np.ndarray]: Mask of the items of the best solution found (in the order of items),
+            or None if nothing beats lower.
+        """
+        p, w, capacity = self.profits[items], self.weights[items], self.capacity
+        before = [k for k in range(b - 1, -1, -1) if free[k]]
+        after = [k for k in range(b, len(items)) if free[k]]
+
+        weights, profits = np.array([used]), np.array([prefix])
+        # Item of every step, and for every state its parent state and whether it changed the item
+        steps, parents, decisions = [], [], []
+        best = None
+        while before or after:
+            # Alternate between the two sides, as long as both have items
+            if after and (not before or len(after) >= len(before)):
+                k, sign = after.pop(0), 1
+            else:
+                k, sign = before.pop(0), -1
+
+            count = len(weights)
+            weights = np.concatenate((weights, weights + sign * w[k]))
+            profits = np.concatenate((profits, profits + sign * p[k]))
+            parent = np.concatenate((np.arange(count), np.arange(count)))
+            changed = np.arange(2 * count) >= count
+
+            # Pareto filter: by increasing weight, keep the states that earn more than every lighter one
+            order = np.lexsort((-profits, weights))
+            weights, profits, parent, changed = weights[order], profits[order], parent[order], changed[order]
+            dominant = np.ones(len(profits), dtype=bool)
+            dominant[1:] = profits[1:] > np.maximum.accumulate(profits)[:-1] + EPSILON
+            weights, profits, parent, changed = weights[dominant], profits[dominant], parent[dominant], changed[dominant]
+
+            # Improvement of the best solution
+            feasible = np.flatnonzero(weights <= capacity + EPSILON)
+            if len(feasible) > 0:
+                state = int(feasible[np.argmax(profits[feasible])])
+                if profits[state] > lower + EPSILON:
+                    lower, best = profits[state], (len(steps), state)
+
+            # Bounds with the next items of both sides
+            fill = p[after[0]] / w[after[0]] if after else 0.0
+            excess = p[before[0]] / w[before[0]] if before else np.inf
+            with np.errstate(invalid='ignore'):
+                bound = np.where(weights <= capacity, profits + (capacity - weights) * fill, profits - (weights - capacity) * excess)
+            keep = self.round(bound) > lower + EPSILON
+            if best is not None and best[0] == len(steps):
+                keep[best[1]] = True
+
+            steps.append(k)
+            parents.append(parent)
+            decisions.append(changed)
+            # Index of the kept states, the following step refers to the states by their new position
+            kept = np.flatnonzero(keep)
+            if best is not None and best[0] == len(steps) - 1:
+                best = (best[0], int(np.searchsorted(kept, best[1])))
+            parents[-1], decisions[-1] = parent[kept], changed[kept]
+            weights, profits = weights[kept], profits[kept]
+            if len(weights) == 0:
+                break
+
+        if best is None:
+            return None
+        chosen = np.zeros(len(items), dtype=bool)
+        chosen[:b] = True
+        step, state = best
+        for s in range(step, -1, -1):
+            if decisions[s][state]:
+                chosen[steps[s]] = not chosen[steps[s]]
+            state = int(parents[s][state])
+        return chosen
+
+def knapsack_problem(data: ProblemData, sense: int) -> Optional[Knapsack]:
+    """
+    Detects a 0/1 knapsack problem: a single <= row with non-negative coefficients over
+    integer variables with bounds 0 and 1.
+    Args:
+        data (ProblemData): Arrays of the problem.
+        sense (int): 1 for minimization, -1 for maximization.
+    Returns:
+        Optional[Knapsack]: The knapsack (item j is variable j), or None if the problem is not a knapsack.
+    """
+    if data.m != 1 or data.n == 0 or not data.integer.all():
+        return None
+    if np.any(data.lb != 0) or np.any(data.ub != 1):
+        return None
+    if np.isfinite(data.row_lb[0]) or not np.isfinite(data.row_ub[0]) or np.any(data.data < 0):
+        return None
+    weights = np.zeros(data.n)
+    np.add.at(weights, data.indices, data.data)
+    return Knapsack(-sense * data.c, weights, data.row_ub[0])
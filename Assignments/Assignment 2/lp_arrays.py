@@ -0,0 +1,101 @@
+from mip import *
+import numpy as np
+from typing import List
+
+try:
+    from mip.cbc import cbclib, ffi
+except ImportError:
+    cbclib = ffi = None
+
+def integer_mask(m: Model) -> np.ndarray:
+    """
+    Mask of the variables that must be integral, computed once per model.
+    The MPS files of the assignment declare every variable as continuous and
+    are solved as pure integer programs, so then every variable is integer.
+    Args:
+        m (Model): The model.
+    Returns:
+        np.ndarray: Boolean array with one entry per variable.
+    """
+    return integer_mask_of(np.array([x.var_type != CONTINUOUS for x in m.vars], dtype=bool))
+
+def integer_mask_of(declared: np.ndarray) -> np.ndarray:
+    """
+    Mask of the variables that must be integral, from the variables declared integer (see integer_mask).
+    Args:
+        declared (np.ndarray): Boolean array of the variables declared integer.
+    Returns:
+        np.ndarray: Boolean array with one entry per variable.
+    """
+    return declared.copy() if declared.any() else np.ones(len(declared), dtype=bool)
+
+def lp_values(m: Model) -> np.ndarray:
+    """
+    Reads the values of all variables in the last LP solution at once. With CBC the
+    solution array of the solver is copied directly, a SimplexModel already holds the
+    array, otherwise every variable is read.
+    Args:
+        m (Model): The model, just optimized.
+    Returns:
+        np.ndarray: Value of every variable.
+    """
+    if hasattr(m, "simplex"):
+        return m.values.copy()
+    if cbclib is not None and hasattr(m.solver, "_model"):
+        pointer = cbclib.Cbc_getColSolution(m.solver._model)
+        if pointer != ffi.NULL:
+            return np.frombuffer(ffi.buffer(pointer, m.num_cols * 8), dtype=np.float64).copy()
+    return np.fromiter((x.x for x in m.vars), dtype=np.float64, count=m.num_cols)
+
+def lp_reduced_costs(m: Model) -> np.ndarray:
+    """
+    Reads the reduced costs of all variables in the last LP solution at once (see lp_values).
+    They are signed for the sense of the model: a variable at its lower bound of a
+    minimization has a non-negative reduced cost, of a maximization a non-positive one.
+    Args:
+        m (Model): The model, just optimized.
+    Returns:
+        np.ndarray: Reduced cost of every variable.
+    """
+    if hasattr(m, "simplex"):
+        return m.reduced_costs.copy()
+    if cbclib is not None and hasattr(m.solver, "_model"):
+        pointer = cbclib.Cbc_getReducedCost(m.solver._model)
+        if pointer != ffi.NULL:
+            return np.frombuffer(ffi.buffer(pointer, m.num_cols * 8), dtype=np.float64).copy()
+    return np.fromiter((x.rc for x in m.vars), dtype=np.float64, count=m.num_cols)
+
+def fractional_parts(values: np.ndarray) -> np.ndarray:
+    """
+    Fractional parts of the values (distance to the floor).
+    Args:
+        values (np.ndarray): Values of the variables.
+    Returns:
+        np.ndarray: values - floor(values).
+    """
+    return values - np.floor(values)
+
+def fractional_mask(values: np.ndarray, integer: np.ndarray, epsilon: float) -> np.ndarray:
+    """
+    Mask of the integer variables whose value is further than epsilon from an integer.
+    Args:
+        values (np.ndarray): Values of the variables.
+        integer (np.ndarray): Integer variable mask (see integer_mask).
+        epsilon (float): Integrality tolerance.
+    Returns:
+        np.ndarray: Boolean array with one entry per variable.
+    """
+    fractions = fractional_parts(values)
+    return integer & (fractions > epsilon) & (fractions < 1 - epsilon)
+
+def round_integers(values: np.ndarray, integer: np.ndarray) -> List[float]:
+    """
+    Turns an (almost) integral solution into the solution returned to the caller: the integer
+    variables are rounded to ints, the continuous ones keep their value.
+    Args:
+        values (np.ndarray): Value of every variable.
+        integer (np.ndarray): Integer variable mask (see integer_mask).
+    Returns:
+        List[float]: Value of every variable (an int for the integer ones).
+    """
+    return [int(round(value)) if is_integer else value for value, is_integer in zip(values.tolist(), integer.tolist())]
@@ -0,0 +1,220 @@
+from mip import *
+import os
+import re
+import shutil
+import numpy as np
+from typing import Dict, List, Tuple
+from problem import ProblemData
+
+# Directory (next to the MPS file) of the binary cache of the parsed instances
+CACHE_DIRECTORY = "__mpscache__"
+
+# Arrays of a ProblemData stored in the cache
+CACHED_ARRAYS = ("c", "const", "lb", "ub", "declared", "indptr", "indices", "data", "row_lb", "row_ub", "names", "row_names")
+
+def parse_mps(path: str) -> ProblemData:
+    """
+    Parses a (fixed or free format) MPS file into CSR arrays: sections ROWS, COLUMNS (with
+    integer markers), RHS, RANGES and BOUNDS. Variables are continuous in [0, inf) unless
+    bounded otherwise; integer variables have the same default bounds. The right hand side of
+    the objective row is the negated objective constant.
+    Args:
+        path (str): Path of the MPS file.
+    Returns:
+        ProblemData: The problem.
+    """
+    objective = None
+    row_index: Dict[str, int] = {}
+    row_names: List[str] = []
+    row_types: List[str] = []
+    column_index: Dict[str, int] = {}
+    names: List[str] = []
+    declared: List[bool] = []
+    c: Dict[int, float] = {}
+    entries: List[Tuple[int, int, float]] = []
+    rhs: Dict[int, float] = {}
+    ranges: Dict[int, float] = {}
+    bounds: List[Tuple[str, int, float]] = []
+    const = 0.0
+    integer = False
+
+    section = None
+    with open(path) as file:
+        for line in file:
+            if not line.strip() or line.startswith("*"):
+                continue
+            fields = line.split()
+            if not line[0].isspace():
+                section = fields[0].upper()
+                if section == "ENDATA":
+                    break
+                continue
+
+            if section == "ROWS":
+                kind, name = fields[0].upper(), fields[1]
+                if kind == "N":
+                    if objective is None:
+                        objective = name
+                    continue
+                row_index[name] = len(row_names)
+                row_names.append(name)
+                row_types.append(kind)
+
+            elif section == "COLUMNS":
+                if len(fields) >= 3 and fields[1].strip("'").upper() == "MARKER":
+                    integer = fields[2].strip("'").upper() == "INTORG"
+                    continue
+                name = fields[0]
+                if name not in column_index:
+                    column_index[name] = len(names)
+                    names.append(name)
+                    declared.append(integer)
+                j = column_index[name]
+                for row, value in zip(fields[1::2], fields[2::2]):
+                    if row == objective:
+                        c[j] = c.get(j, 0.0) + float(value)
+                    elif row in row_index and float(value) != 0:
+                        entries.append((row_index[row], j, float(value)))
+
+            elif section in ("RHS", "RANGES"):
+                # The name of the vector is optional
+                pairs = fields[1:] if len(fields) % 2 == 1 else fields
+                for row, value in zip(pairs[0::2], pairs[1::2]):
+                    if section == "RHS" and row == objective:
+                        const = -float(value)
+                    elif row in row_index:
+                        (rhs if section == "RHS" else ranges)[row_index[row]] = float(value)
+
+            elif section == "BOUNDS":
+                kind = fields[0].upper()
+                # The name of the bound vector is optional, and so is the value of FR, MI, PL and BV
+                has_value = kind not in ("FR", "MI", "PL", "BV") or len(fields) == 4
+                column = fields[-2] if has_value else fields[-1]
+                value = float(fields[-1]) if has_value else 0.0
+                if column in column_index:
+                    bounds.append((kind, column_index[column], value))
+
+    n, m = len(names), len(row_names)
+    lb, ub = np.zeros(n), np.full(n, np.inf)
+    declared = np.array(declared, dtype=bool)
+    for kind, j, value in bounds:
+        if kind == "UP":
+            ub[j] = value
+            if value < 0 and lb[j] == 0:
+                lb[j] = -np.inf
+        elif kind == "LO":
+            lb[j] = value
+        elif kind == "FX":
+            lb[j] = ub[j] = value
+        elif kind == "FR":
+            lb[j], ub[j] = -np.inf, np.inf
+        elif kind == "MI":
+            lb[j] = -np.inf
+        elif kind == "PL":
+            ub[j] = np.inf
+        elif kind == "BV":
+            lb[j], ub[j], declared[j] = 0, 1, True
+        elif kind == "LI":
+            lb[j], declared[j] = value, True
+        elif kind == "UI":
+            ub[j], declared[j] = value, True
+
+    row_lb, row_ub = np.full(m, -np.inf), np.full(m, np.inf)
+    for i, kind in enumerate(row_types):
+        b = rhs.get(i, 0.0)
+        r = ranges.get(i)
+        if kind == "E":
+            row_lb[i] = row_ub[i] = b
+            if r is not None:
+                row_lb[i], row_ub[i] = (b, b + r) if r > 0 else (b + r, b)
+        elif kind == "L":
+            row_ub[i] = b
+            if r is not None:
+                row_lb[i] = b - abs(r)
+        elif kind == "G":
+            row_lb[i] = b
+            if r is not None:
+                row_ub[i] = b + abs(r)
+
+    # Entries sorted by row into CSR arrays (in the order of the file within a row)
+    entries.sort(key=lambda entry: entry[0])
+    rows = np.array([entry[0] for entry in entries], dtype=np.int64)
+    indptr = np.zeros(m + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=m), out=indptr[1:])
+    indices = np.array([entry[1] for entry in entries], dtype=np.int64)
+    data = np.array([entry[2] for entry in entries], dtype=np.float64)
+    objective_coefficients = np.zeros(n)
+    for j, value in c.items():
+        objective_coefficients[j] = value
+
+    return ProblemData.from_arrays(objective_coefficients, const, lb, ub, declared, indptr, indices, data,
+                                   row_lb, row_ub, names, row_names)
+
+def cache_path(path: str) -> str:
+    """
+    Returns the cache directory of an MPS file, keyed on its size and modification time, so that
+    checking the cache does not read the file.
+    Args:
+        path (str): Path of the MPS file.
+    Returns:
+        str: Path of the directory with one .npy file per array.
+    """
+    status = os.stat(path)
+    directory, name = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, CACHE_DIRECTORY, "%s-%d-%d" % (name, status.st_size, status.st_mtime_ns))
+
+def read_mps(path: str, cache: bool = True) -> ProblemData:
+    """
+    Reads an MPS file into arrays. The parsed arrays are kept as .npy files in a cache directory
+    next to the MPS file; later reads of the unchanged file memory-map them instead of parsing it.
+    Args:
+        path (str): Path of the MPS file.
+        cache (bool): Whether to use (and write) the cache.
+    Returns:
+        ProblemData: The problem.
+    """
+    if not cache:
+        return parse_mps(path)
+
+    cached = cache_path(path)
+    if os.path.isdir(cached):
+        return ProblemData.from_arrays(*(np.load(os.path.join(cached, name + ".npy"), mmap_mode='r') for name in CACHED_ARRAYS))
+
+    problem = parse_mps(path)
+    # Written into a temporary directory, so that parallel readers never see a partial cache
+    temporary = "%s.%d.tmp" % (cached, os.getpid())
+    os.makedirs(temporary, exist_ok=True)
+    for name in CACHED_ARRAYS:
+        np.save(os.path.join(temporary, name + ".npy"), np.asarray(getattr(problem, name)))
+    try:
+        os.replace(temporary, cached)
+    except OSError:
+        # Another process wrote the cache first
+        shutil.rmtree(temporary, ignore_errors=True)
+        return problem
+
+    # The caches of earlier versions of the file (and the .npz caches of older versions of this module) are stale
+    stale = re.compile(re.escape(os.path.basename(path)) + r"-(\d+-\d+|[0-9a-f]{16}\.npz)")
+    directory = os.path.dirname(cached)
+    for entry in os.listdir(directory):
+        entry_path = os.path.join(directory, entry)
+        if entry_path == cached or not stale.fullmatch(entry):
+            continue
+        if os.path.isdir(entry_path):
+            shutil.rmtree(entry_path, ignore_errors=True)
+        else:
+            os.remove(entry_path)
+    return problem
+
+def load_model(path: str, sense: str = MINIMIZE, cache: bool = True) -> Tuple[Model, ProblemData]:
+    """
+    Reads an MPS file (see read_mps) and builds its mip model from the arrays.
+    Args:
+        path (str): Path of the MPS file.
+        sense (str): Sense of the model (MINIMIZE or MAXIMIZE).
+        cache (bool): Whether to use the cache.
+    Returns:
+        Tuple[Model, ProblemData]: The model and its arrays.
+    """
+    problem = read_mps(path, cache)
+    return problem.model(sense), problem
@@ -0,0 +1,247 @@
+import hashlib
+import numpy as np
+from collections import OrderedDict, deque
+from mip import Model, OptimizationStatus
+from nodes import BoundChange, NodeBounds
+from lp_arrays import lp_values, lp_reduced_costs
+from typing import Optional, Tuple
+
+# Memory (bytes) the cached LP results may take, the least recently used ones are evicted beyond it
+NODE_CACHE_MEMORY = 64 * 2**20
+
+# Approximate memory (bytes) of an entry besides its arrays: key, result object and dictionary slot
+ENTRY_OVERHEAD = 256
+
+# Number of pruned boxes kept to recognize dominated nodes, the oldest ones are forgotten beyond it
+PRUNED_BOXES = 1024
+
+# Tolerance of the rounding of the bounds of integer variables and of the check of a cached solution against the bounds
+EPSILON = 1e-6
+
+class LPResult:
+    """
+    Result of the LP relaxation of a node: status, objective value (minimization form, infinity if
+    infeasible), the solution and the reduced costs (in the sense of the model, see lp_reduced_costs).
+    """
+
+    __slots__ = ("status", "objective_value", "values", "reduced_costs")
+
+    def __init__(self, status: OptimizationStatus, objective_value: float, values: np.ndarray = None, reduced_costs: np.ndarray = None):
+        """
+        Constructor of the result.
+        Args:
+            status (OptimizationStatus): Status of the LP (OPTIMAL or INFEASIBLE).
+            objective_value (float): Objective value in minimization form.
+            values (np.ndarray): Value of every variable (None if infeasible).
+            reduced_costs (np.ndarray): Reduced cost of every variable (None if infeasible).
+        """
+        self.status = status
+        self.objective_value = objective_value
+        self.values = values
+        self.reduced_costs = reduced_costs
+
+    def nbytes(self) -> int:
+        """Returns the approximate memory of the result in bytes."""
+        arrays = (self.values, self.reduced_costs)
+        return ENTRY_OVERHEAD + sum(array.nbytes for array in arrays if array is not None)
+
+def lp_result(m: Model, status: OptimizationStatus, sense: int) -> LPResult:
+    """
+    Reads the result of the LP just solved on a model.
+    Args:
+        m (Model): The model, just optimized.
+        status (OptimizationStatus): Status returned by the optimization.
+        sense (int): 1 for minimization, -1 for maximization.
+    Returns:
+        LPResult: The result, infeasible (without solution) if the LP has no solution.
+    """
+    if status == OptimizationStatus.INFEASIBLE or status == OptimizationStatus.NO_SOLUTION_FOUND or m.objective_value is None:
+        return LPResult(OptimizationStatus.INFEASIBLE, float('inf'))
+    return LPResult(status, sense * m.objective_value, lp_values(m), lp_reduced_costs(m))
+
+def bound_key(lb: np.ndarray, ub: np.ndarray) -> bytes:
+    """
+    Returns the key of a node: a hash of its canonical box (see NodeCache.box), so it does not depend
+    on the order or repetition of the changes that lead to the same box.
+    Args:
+        lb (np.ndarray): Lower bound of every variable.
+        ub (np.ndarray): Upper bound of every variable.
+    Returns:
+        bytes: The key.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    # Adding 0.0 turns -0.0 into 0.0, which would hash differently
+    digest.update((lb + 0.0).tobytes())
+    digest.update((ub + 0.0).tobytes())
+    return digest.digest()
+
+class PrunedBoxes:
+    """
+    Boxes of the nodes pruned so far (infeasible, by bound or by optimality). A node whose box lies inside one
+    of them holds no solution better than the incumbent and is pruned without solving its LP. A box is stored
+    sparsely, as the bounds that differ from the root bounds when it is stored: on the other variables it
+    contains every node, since the root bounds only get tighter. The oldest boxes are forgotten beyond a cap.
+    """
+
+    def __init__(self, capacity: int = PRUNED_BOXES):
+        """
+        Constructor of the store.
+        Args:
+            capacity (int): Number of boxes kept.
+        """
+        self.capacity = capacity
+        # Number of bounds of every box, oldest first, and the number of the oldest box
+        self.sizes = deque()
+        self.first = 0
+        # Bounds of all boxes concatenated: box number, variable index, lower and upper bound
+        self.box = np.empty(0, dtype=np.int64)
+        self.idx = np.empty(0, dtype=np.int64)
+        self.lb = np.empty(0, dtype=np.float64)
+        self.ub = np.empty(0, dtype=np.float64)
+
+    def add(self, lb: np.ndarray, ub: np.ndarray, root_lb: np.ndarray, root_ub: np.ndarray):
+        """
+        Stores the box of a pruned node.
+        Args:
+            lb, ub (np.ndarray): The canonical box of the node (see NodeCache.box).
+            root_lb, root_ub (np.ndarray): The current root bounds.
+        """
+        idx = np.flatnonzero((lb > root_lb) | (ub < root_ub))
+        start = 0
+        if len(self.sizes) == self.capacity:
+            start = self.sizes.popleft()
+            self.first += 1
+        self.box = np.concatenate((self.box[start:], np.full(len(idx), self.first + len(self.sizes))))
+        self.idx = np.concatenate((self.idx[start:], idx))
+        self.lb = np.concatenate((self.lb[start:], lb[idx]))
+        self.ub = np.concatenate((self.ub[start:], ub[idx]))
+        self.sizes.append(len(idx))
+
+    def contains(self, lb: np.ndarray, ub: np.ndarray) -> bool:
+        """
+        Checks, for all stored boxes at once, whether one of them contains the given box.
+        Args:
+            lb, ub (np.ndarray): The canonical box of a node.
+        Returns:
+            bool: True if the box lies inside a pruned box.
+        """
+        if not self.sizes:
+            return False
+        outside = (lb[self.idx] < self.lb) | (ub[self.idx] > self.ub)
+        return bool(np.count_nonzero(np.bincount(self.box[outside] - self.first, minlength=len(self.sizes))) < len(self.sizes))
+
+    def clear(self):
+        """Removes all boxes."""
+        self.__init__(self.capacity)
+
+    def __len__(self) -> int:
+        return len(self.sizes)
+
+class NodeCache:
+    """
+    Memoizes the LP relaxations of the nodes by their canonical box (see box and bound_key), with least recently
+    used eviction under a memory cap. Different branching paths can lead to the same box, e.g. with general
+    integer variables, and strong branching solves the LPs of the children of a node before they are created;
+    such a node is processed from the stored result without solving its LP again. A stored result stays
+    a valid bound when cuts are added or removed later, since the cuts are valid for the whole tree.
+    The cache also keeps the boxes of the pruned nodes (see PrunedBoxes), so that nodes inside them are skipped.
+    """
+
+    def __init__(self, bounds: NodeBounds, integer: np.ndarray, memory: int = NODE_CACHE_MEMORY, pruned_boxes: int = PRUNED_BOXES):
+        """
+        Constructor of the cache.
+        Args:
+            bounds (NodeBounds): Bounds of the working model.
+            integer (np.ndarray): Integer variable mask (see integer_mask).
+            memory (int): Memory cap of the stored results in bytes.
+            pruned_boxes (int): Number of pruned boxes kept.
+        """
+        self.bounds = bounds
+        self.integer = integer
+        self.memory = memory
+        self.used = 0
+        self.entries: "OrderedDict[bytes, LPResult]" = OrderedDict()
+        self.pruned = PrunedBoxes(pruned_boxes)
+        self.hits = 0
+        self.misses = 0
+
+    def box(self, change: BoundChange = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the canonical box of the active node: its bounds clipped to the root bounds (which may have been
+        tightened after the node was created), with the bounds of the integer variables rounded inwards.
+        Nodes with the same canonical box have the same solutions.
+        Args:
+            change (BoundChange): New bounds of one variable, for a child of the active node (None for the node itself).
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The lower and upper bounds.
+        """
+        lb, ub = self.bounds.arrays()
+        if change is not None:
+            idx, lower, upper = change
+            lb[idx], ub[idx] = lower, upper
+        lb, ub = np.maximum(lb, self.bounds.root_lb), np.minimum(ub, self.bounds.root_ub)
+        lb = np.where(self.integer, np.ceil(lb - EPSILON), lb)
+        ub = np.where(self.integer, np.floor(ub + EPSILON), ub)
+        return lb, ub
+
+    def put(self, key: bytes, result: LPResult):
+        """
+        Stores the LP result of a node, evicting the least recently used results beyond the memory cap.
+        Args:
+            key (bytes): Key of the node (see bound_key).
+            result (LPResult): The result.
+        """
+        if key in self.entries:
+            self.used -= self.entries.pop(key).nbytes()
+        self.entries[key] = result
+        self.used += result.nbytes()
+        while self.used > self.memory and self.entries:
+            _, evicted = self.entries.popitem(last=False)
+            self.used -= evicted.nbytes()
+
+    def get(self, key: bytes, lb: np.ndarray, ub: np.ndarray) -> Optional[LPResult]:
+        """
+        Returns the LP result of a node, which becomes the most recently used one. A result solved on other bounds
+        with the same canonical box is only returned if its solution lies within the box, since the node is branched on it.
+        Args:
+            key (bytes): Key of the node (see bound_key).
+            lb, ub (np.ndarray): The canonical box of the node.
+        Returns:
+            Optional[LPResult]: The result, or None if it is not stored.
+        """
+        result = self.entries.get(key)
+        if result is not None and result.values is not None and (np.any(result.values < lb - EPSILON) or np.any(result.values > ub + EPSILON)):
+            result = None
+        if result is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def prune(self, lb: np.ndarray, ub: np.ndarray):
+        """
+        Remembers the canonical box of a pruned node (see PrunedBoxes).
+        Args:
+            lb, ub (np.ndarray): The box.
+        """
+        self.pruned.add(lb, ub, self.bounds.root_lb, self.bounds.root_ub)
+
+    def dominated(self, lb: np.ndarray, ub: np.ndarray) -> bool:
+        """
+        Checks whether a canonical box lies inside the box of a pruned node.
+        Args:
+            lb, ub (np.ndarray): The box.
+        Returns:
+            bool: True if a node with this box can be pruned.
+        """
+        return self.pruned.contains(lb, ub)
+
+    def clear(self):
+        """Removes all results and pruned boxes."""
+        self.entries.clear()
+        self.used = 0
+        self.pruned.clear()
+
+    def __len__(self) -> int:
+        return len(self.entries)
@@ -0,0 +1,375 @@
+from mip import *
+from enum import Enum
+import heapq
+import numpy as np
+from typing import Iterable, List, Tuple, Dict
+
+# A bound change: (variable index, new lower bound, new upper bound)
+BoundChange = Tuple[int, float, float]
+
+# Initial number of bound changes the arena of a queue has room for
+ARENA_CAPACITY = 1024
+
+# Memory (bytes) of a bound change in the arena: index, lower and upper bound
+CHANGE_BYTES = 4 + 8 + 8
+
+# Approximate memory (bytes) of an open node besides its bound changes: the node, its heap entry and key and its branching
+NODE_BYTES = 512
+
+# Default memory budget (bytes) of the open nodes of a queue
+NODE_MEMORY = 2**30
+
+# A queue selects depth first when its open nodes take this share of the budget, and its own strategy again below the second one
+MEMORY_SWITCH = 0.9
+MEMORY_RESUME = 0.5
+
+class NodeSelectionStrategy(Enum):
+    DFS = 1
+    BEST_BOUND = 2
+    BEST_ESTIMATE = 3
+    HYBRID = 4
+
+class Node:
+    """
+    Open node of the Branch & Bound tree. Instead of a copy of the model, a node
+    only stores the bound changes made by branching on top of its parent. Once the
+    node is pushed to a queue, its changes move to the arena of the queue (see BoundArena)
+    and the node only keeps their position there.
+    """
+
+    __slots__ = ("parent", "changes", "arena", "start", "count", "bound", "depth", "estimate", "branching")
+
+    def __init__(self, parent: "Node", changes: List[BoundChange], bound: float, estimate: float = None, branching: Tuple[int, int, float] = None, depth: int = None):
+        """
+        Constructor of the node.
+        Args:
+            parent (Node): The parent node (None for the root).
+            changes (List[BoundChange]): Bound changes relative to the parent.
+            bound (float): Objective value of the parent LP relaxation.
+            estimate (float): Estimated objective value of the best solution in the subtree (defaults to bound).
+            branching (Tuple[int, int, float]): Branching variable index, direction (0 down, 1 up) and its
+                fractional part at the parent, used to update the pseudo-costs.
+            depth (int): Depth in the tree (defaults to the depth of the parent plus one), given for nodes
+                restored without their parent.
+        """
+        self.parent = parent
+        self.changes = changes
+        self.arena = None
+        self.start = 0
+        self.count = len(changes)
+        self.bound = bound
+        if depth is None:
+            depth = 0 if parent is None else parent.depth + 1
+        self.depth = depth
+        self.estimate = bound if estimate is None else estimate
+        self.branching = branching
+
+    def bound_changes(self) -> List[BoundChange]:
+        """Returns the bound changes of the node relative to its parent."""
+        return self.changes if self.arena is None else self.arena.changes(self.start, self.count)
+
+    def path_changes(self) -> List[BoundChange]:
+        """
+        Collects the bound changes from the root down to this node.
+        Returns:
+            List[BoundChange]: The bound changes, root first (later changes override earlier ones).
+        """
+        path = []
+        node = self
+        while node is not None:
+            path.append(node.bound_changes())
+            node = node.parent
+        return [change for changes in reversed(path) for change in changes]
+
+class BoundArena:
+    """
+    Stores the bound changes of the nodes of a queue in three shared arrays (variable index, lower and
+    upper bound); a node keeps the position and number of its changes. When the arrays are full, the changes
+    of the nodes that are still reachable (open nodes and their ancestors) are compacted into new arrays
+    twice their size, so the arena shrinks again when the tree does.
+    """
+
+    def __init__(self, capacity: int = ARENA_CAPACITY):
+        """
+        Constructor of the arena.
+        Args:
+            capacity (int): Initial number of bound changes.
+        """
+        self.idx = np.empty(capacity, dtype=np.int32)
+        self.lb = np.empty(capacity, dtype=np.float64)
+        self.ub = np.empty(capacity, dtype=np.float64)
+        self.size = 0
+
+    def store(self, node: Node, nodes: Iterable[Node]):
+        """
+        Moves the bound changes of a node into the arena.
+        Args:
+            node (Node): The node.
+            nodes (Iterable[Node]): The open nodes, whose changes (and their ancestors') are kept on compaction.
+        """
+        changes = node.bound_changes()
+        if self.size + len(changes) > len(self.idx):
+            self.compact(list(nodes) + [node], len(changes))
+        start = self.size
+        for k, (idx, lb, ub) in enumerate(changes, start):
+            self.idx[k], self.lb[k], self.ub[k] = idx, lb, ub
+        self.size += len(changes)
+        node.arena, node.start, node.count, node.changes = self, start, len(changes), None
+
+    def compact(self, nodes: Iterable[Node], needed: int):
+        """
+        Copies the changes of the given nodes and their ancestors into new arrays with room for twice them.
+        Args:
+            nodes (Iterable[Node]): The nodes whose changes are kept.
+            needed (int): Number of changes about to be stored.
+        """
+        live = {}
+        for node in nodes:
+            while node is not None and id(node) not in live:
+                if node.arena is self:
+                    live[id(node)] = node
+                node = node.parent
+        capacity = max(ARENA_CAPACITY, 2 * (sum(node.count for node in live.values()) + needed))
+        idx, lb, ub = np.empty(capacity, dtype=np.int32), np.empty(capacity, dtype=np.float64), np.empty(capacity, dtype=np.float64)
+        size = 0
+        for node in live.values():
+            end = size + node.count
+            idx[size:end] = self.idx[node.start:node.start + node.count]
+            lb[size:end] = self.lb[node.start:node.start + node.count]
+            ub[size:end] = self.ub[node.start:node.start + node.count]
+            node.start, size = size, end
+        self.idx, self.lb, self.ub, self.size = idx, lb, ub, size
+
+    def changes(self, start: int, count: int) -> List[BoundChange]:
+        """Returns the count bound changes stored from position start."""
+        return [(int(self.idx[k]), float(self.lb[k]), float(self.ub[k])) for k in range(start, start + count)]
+
+    def nbytes(self) -> int:
+        """Returns the memory of the arrays in bytes."""
+        return len(self.idx) * CHANGE_BYTES
+
+class NodeQueue:
+    """
+    Priority queue (binary heap) of open nodes. The order depends on the node selection strategy:
+    DFS takes the deepest (most recent) node, BEST_BOUND the node with the best parent LP bound and
+    BEST_ESTIMATE the node with the best estimate. HYBRID dives (DFS) until switched to BEST_BOUND.
+    The bound changes of the nodes are kept in a shared arena (see BoundArena). When the open nodes
+    approach the memory budget (MEMORY_SWITCH), the queue selects depth first, which only adds a few
+    nodes per level of the dive, until the memory falls below MEMORY_RESUME of the budget again.
+    """
+
+    def __init__(self, strategy: NodeSelectionStrategy, sense: int, memory: int = NODE_MEMORY):
+        """
+        Constructor of the queue.
+        Args:
+            strategy (NodeSelectionStrategy): The node selection strategy.
+            sense (int): 1 for minimization, -1 for maximization.
+            memory (int): Memory budget of the open nodes in bytes (None for no budget).
+        """
+        self.strategy = strategy
+        self.sense = sense
+        self.memory = memory
+        # Whether the queue selects depth first because of the memory budget
+        self.memory_limited = False
+        # Strategy the heap is ordered by (DFS while memory limited)
+        self.order = strategy
+        self.arena = BoundArena()
+        self.heap = []
+        self.counter = 0
+
+    def key(self, node: Node) -> tuple:
+        """
+        Returns the heap key of a node under the current strategy (smaller is selected first).
+        Args:
+            node (Node): The node.
+        Returns:
+            tuple: The key.
+        """
+        if self.order == NodeSelectionStrategy.BEST_BOUND:
+            return (self.sense * node.bound, -node.depth)
+        if self.order == NodeSelectionStrategy.BEST_ESTIMATE:
+            return (self.sense * node.estimate, -node.depth)
+        # DFS (and the diving phase of HYBRID)
+        return (-node.depth,)
+
+    def push(self, node: Node):
+        """
+        Adds a node to the queue in O(log n).
+        Args:
+            node (Node): The node.
+        """
+        if node.arena is not self.arena:
+            self.arena.store(node, (entry[-1] for entry in self.heap))
+        self.counter += 1
+        heapq.heappush(self.heap, (self.key(node), -self.counter, node))
+        if self.memory is not None and not self.memory_limited and self.nbytes() >= MEMORY_SWITCH * self.memory:
+            self.memory_limited = True
+            self.reorder()
+
+    def pop(self) -> Node:
+        """
+        Removes and returns the next node in O(log n).
+        Returns:
+            Node: The selected node.
+        """
+        node = heapq.heappop(self.heap)[-1]
+        if self.memory_limited and self.nbytes() < MEMORY_RESUME * self.memory:
+            self.memory_limited = False
+            self.reorder()
+        return node
+
+    def nbytes(self) -> int:
+        """Returns the approximate memory of the open nodes in bytes (see NODE_BYTES), with the arena."""
+        return len(self.heap) * NODE_BYTES + self.arena.nbytes()
+
+    def nodes(self) -> List[Node]:
+        """
+        Returns the open nodes without removing them, in the order they would be selected.
+        Returns:
+            List[Node]: The nodes.
+        """
+        return [entry[-1] for entry in sorted(self.heap, key=lambda entry: entry[:2])]
+
+    def set_strategy(self, strategy: NodeSelectionStrategy):
+        """
+        Changes the node selection strategy, re-ordering the open nodes in O(n) (while the queue is
+        memory limited it keeps selecting depth first, and the strategy applies once it is not).
+        Args:
+            strategy (NodeSelectionStrategy): The new strategy.
+        """
+        self.strategy = strategy
+        self.reorder()
+
+    def reorder(self):
+        """Re-orders the open nodes in O(n) if the order of the queue changed (by set_strategy or the memory budget)."""
+        order = NodeSelectionStrategy.DFS if self.memory_limited else self.strategy
+        if order != self.order:
+            self.order = order
+            self.heap = [(self.key(node), counter, node) for _, counter, node in self.heap]
+            heapq.heapify(self.heap)
+
+    def best_bound(self) -> float:
+        """
+        Returns the best parent LP bound among the open nodes (in minimization form).
+        Returns:
+            float: The bound (infinity if the queue is empty).
+        """
+        if self.order == NodeSelectionStrategy.BEST_BOUND and self.heap:
+            return self.heap[0][0][0]
+        return min((self.sense * node.bound for _, _, node in self.heap), default=float('inf'))
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+class NodeBounds:
+    """
+    Keeps a single working model and moves it between nodes by applying and
+    undoing bound changes, so the LP solver can re-solve warm from its last basis.
+    """
+
+    def __init__(self, m: Model):
+        """
+        Constructor of the working model.
+        Args:
+            m (Model): The model, its current bounds are the root bounds.
+        """
+        self.model = m
+        self.root_bounds = [(x.lb, x.ub) for x in m.vars]
+        self.root_lb = np.array([lb for lb, _ in self.root_bounds], dtype=np.float64)
+        self.root_ub = np.array([ub for _, ub in self.root_bounds], dtype=np.float64)
+        # Variables whose bounds currently differ from the root: index -> (lb, ub)
+        self.active: Dict[int, Tuple[float, float]] = {}
+        # Root bounds tightened during the search (valid for the whole tree) and the bounds they replaced
+        self.global_changes: List[BoundChange] = []
+        self.initial_bounds: Dict[int, Tuple[float, float]] = {}
+
+    def activate(self, node: Node):
+        """
+        Sets the bounds of the working model to the bounds of the given node.
+        Only variables whose bounds differ between the active node and the new one are touched.
+        Args:
+            node (Node): The node to move to.
+        """
+        target = {}
+        for idx, lb, ub in node.path_changes():
+            target[idx] = (lb, ub)
+
+        # Undo the changes that the new node does not have
+        for idx in self.active:
+            if idx not in target:
+                self.set_bounds(idx, *self.root_bounds[idx])
+
+        # Apply the changes of the new node
+        for idx, bounds in target.items():
+            if self.active.get(idx) != bounds:
+                self.set_bounds(idx, *bounds)
+
+        self.active = target
+
+    def set_bounds(self, idx: int, lb: float, ub: float):
+        """
+        Sets the bounds of a variable of the working model.
+        Args:
+            idx (int): Index of the variable.
+            lb (float): New lower bound.
+            ub (float): New upper bound.
+        """
+        x = self.model.vars[idx]
+        x.lb = lb
+        x.ub = ub
+
+    def bounds(self, idx: int) -> Tuple[float, float]:
+        """
+        Returns the bounds of a variable at the active node.
+        Args:
+            idx (int): Index of the variable.
+        Returns:
+            Tuple[float, float]: The lower and upper bound.
+        """
+        return self.active.get(idx, self.root_bounds[idx])
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the bounds of all variables at the active node.
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The lower and upper bounds.
+        """
+        lb, ub = self.root_lb.copy(), self.root_ub.copy()
+        for idx, (lower, upper) in self.active.items():
+            lb[idx], ub[idx] = lower, upper
+        return lb, ub
+
+    def tighten(self, changes: List[BoundChange]):
+        """
+        Tightens bounds of the active node on the working model (until another node is activated).
+        Args:
+            changes (List[BoundChange]): The new bounds.
+        """
+        for idx, lb, ub in changes:
+            self.set_bounds(idx, lb, ub)
+            self.active[idx] = (lb, ub)
+
+    def tighten_root(self, changes: List[BoundChange]):
+        """
+        Tightens the root bounds, for the whole tree. The working model only changes for the
+        variables the active node does not override.
+        Args:
+            changes (List[BoundChange]): The new root bounds.
+        """
+        for idx, lb, ub in changes:
+            self.initial_bounds.setdefault(idx, self.root_bounds[idx])
+            self.root_bounds[idx] = (lb, ub)
+            self.root_lb[idx], self.root_ub[idx] = lb, ub
+            if idx not in self.active:
+                self.set_bounds(idx, lb, ub)
+        self.global_changes += changes
+
+    def restore(self):
+        """
+        Restores the bounds the working model had before the search (undoing tighten_root as well).
+        """
+        for idx in self.active:
+            self.set_bounds(idx, *self.root_bounds[idx])
+        self.active = {}
+        for idx, bounds in self.initial_bounds.items():
+            self.set_bounds(idx, *bounds)
@@ -0,0 +1,195 @@
+from mip import *
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Tuple
+from nodes import Node, NodeQueue
+from ex1 import Solution, ProblemType, VariableSelectionStrategy, INFINITY
+from presolve import postsolve_solution
+from problem import ProblemData
+from mps import load_model
+from instrumentation import SearchStatistics
+
+# The ramp-up stops when there are this many open nodes per worker
+RAMP_UP_NODES = 4
+
+# An open node sent between processes: (bound changes from the root, parent bound, estimate)
+Subtree = Tuple[List[Tuple[int, float, float]], float, float]
+
+# Working model of every worker process, read once in _init_worker
+_worker = None
+
+def read_model(path: str, problem_type: ProblemType) -> Tuple[Model, ProblemData]:
+    """
+    Reads an MPS file (through the binary cache of mps.read_mps) into a new model with the sense of the problem.
+    Args:
+        path (str): Path of the MPS file.
+        problem_type (ProblemType): Type of the problem (maximization or minimization).
+    Returns:
+        Tuple[Model, ProblemData]: The model and its arrays.
+    """
+    return load_model(path, MAXIMIZE if problem_type == ProblemType.MAXIMIZATION else MINIMIZE)
+
+def sense_of(problem_type: ProblemType) -> int:
+    """Returns 1 for minimization and -1 for maximization problems."""
+    return -1 if problem_type == ProblemType.MAXIMIZATION else 1
+
+def drain(C: NodeQueue, global_changes: List[Tuple[int, float, float]] = None) -> List[Subtree]:
+    """
+    Empties the queue, returning its nodes as subtrees that can be sent to another process.
+    Args:
+        C (NodeQueue): The open nodes.
+        global_changes (List[Tuple[int, float, float]]): Root bounds tightened during the search, which the
+            other process does not know and that are sent with every subtree (none if None).
+    Returns:
+        List[Subtree]: The subtrees, in the order of the queue.
+    """
+    if global_changes is None:
+        global_changes = []
+    subtrees = []
+    while len(C) > 0:
+        node = C.pop()
+        subtrees.append((global_changes + node.path_changes(), node.bound, node.estimate))
+    return subtrees
+
+def solution_options(solution: Solution) -> dict:
+    """Returns the constructor arguments of a Solution, to build the same search in the workers."""
+    return dict(problem_type=solution.problem_type, selection_strategy=solution.selection_strategy,
+                node_strategy=solution.node_strategy, primal_heuristics=solution.primal_heuristics,
+                branch_and_cut=solution.branch_and_cut, presolve=solution.presolve, relaxation=solution.relaxation,
+                knapsack=solution.knapsack, node_cache=solution.node_cache,
+                node_memory=solution.node_memory)
+
+def _init_worker(path: str, options: dict, incumbent, donate):
+    """
+    Initializes a worker process: reads (and presolves) the model once and keeps the shared incumbent and
+    donation flag. Presolve is deterministic, so the variable indices of all workers agree with the master.
+    """
+    global _worker
+    solution = Solution(**options)
+    sense = sense_of(solution.problem_type)
+    m, data = read_model(path, solution.problem_type)
+    model, data, _ = solution.prepare(m, sense, data)
+    solution.setup(model, sense, data)
+    _worker = (solution, incumbent, donate)
+
+def _explore_subtree(subtree: Subtree, deadline: float, node_budget: int) -> Tuple[List[float], float, List[Subtree], SearchStatistics]:
+    """
+    Explores a subtree in a worker process. The working model is moved to the root of the
+    subtree by its bound changes, the pseudo-costs are kept between subtrees.
+    Args:
+        subtree (Subtree): The subtree.
+        deadline (float): Time (time.time()) at which the search stops.
+        node_budget (int): Number of nodes the worker may process (None for no limit).
+    Returns:
+        Tuple[List[float], float, List[Subtree], SearchStatistics]: The best solution found, its objective value
+        (minimization form), the open nodes handed back to be shared with idle workers and the statistics
+        of the exploration.
+    """
+    solution, incumbent, donate = _worker
+    changes, bound, estimate = subtree
+    solution.start_statistics(solution.sense)
+    solution.deadline, solution.node_budget = deadline, node_budget
+    C = solution.node_queue()
+    C.push(Node(None, changes, bound, estimate))
+    optimal_solution, upper_bound = solution.explore(C, [], INFINITY, incumbent=incumbent, donate=donate)
+    return optimal_solution, upper_bound, drain(C, solution.bounds.global_changes), solution.statistics
+
+def parallel_branch_and_bound(solution: Solution, path: str, processes: int = None) -> Tuple[List[float], float]:
+    """
+    Solves the (M)ILP problem of an MPS file with Branch & Bound on a pool of worker processes.
+    The tree is first explored serially until there are RAMP_UP_NODES open nodes per worker; then
+    every open node is a subtree explored by one worker. Each worker reads the model once and only
+    receives bound changes. The best objective value is shared by all workers to prune, and when a
+    worker is idle and there is no subtree left, a busy worker hands its open nodes back to be shared.
+    The time and node limits of the solution hold for the whole search (the node limit approximately:
+    every worker gets the nodes left when it receives a subtree); the dual bound, the gap and the
+    status are stored in the solution as by Solution.search.
+    Args:
+        solution (Solution): Problem type and variable and node selection strategies of the search.
+        path (str): Path of the MPS file.
+        processes (int): Number of worker processes (all cores if None).
+    Returns:
+        Tuple[List[float], float]: A tuple containing the optimal solution and the optimal objective value.
+    """
+    processes = processes or os.cpu_count()
+    sense = sense_of(solution.problem_type)
+    statistics = solution.start_statistics(sense)
+    solution.start_limits()
+
+    with statistics.timer("presolve"):
+        m, data = read_model(path, solution.problem_type)
+        prepared = solution.prepare(m, sense, data)
+    if prepared is None:
+        solution.conclude_solved(sense, INFINITY)
+        return [], sense * INFINITY
+    model, data, postsolve = prepared
+
+    solved = solution.knapsack_solution(data, sense)
+    if solved is not None:
+        optimal_solution, optimal_objective_value = solved
+        solution.conclude_solved(sense, sense * optimal_objective_value)
+        return postsolve_solution(postsolve, optimal_solution), optimal_objective_value
+
+    # Ramp-up: serial search until the frontier is large enough
+    solution.setup(model, sense, data)
+    C = solution.node_queue()
+    C.push(Node(None, [], -sense * INFINITY))
+    optimal_solution, upper_bound = solution.explore(C, [], INFINITY, frontier=RAMP_UP_NODES * processes)
+    pending = drain(C, solution.bounds.global_changes)
+    if not pending or solution.limit_reached():
+        solution.conclude(upper_bound, min((sense * subtree[1] for subtree in pending), default=INFINITY), len(pending))
+        return postsolve_solution(postsolve, optimal_solution), sense * upper_bound
+
+    incumbent = multiprocessing.Value('d', upper_bound)
+    donate = multiprocessing.Value('i', 0)
+    # Running subtrees and their bound (minimization form), which bounds everything still unexplored with the pending ones
+    running = {}
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(path, solution_options(solution), incumbent, donate)) as pool:
+        while pending or running:
+            # Hand the subtrees to the idle workers (without the ones pruned by the incumbent), until a limit is reached
+            kept = []
+            for subtree in pending:
+                reason = solution.prune_reason(sense * subtree[1], incumbent.value)
+                if reason is None:
+                    kept.append(subtree)
+                else:
+                    statistics.prune(reason, solution.round_bound(sense * subtree[1]))
+            pending = kept
+            while pending and len(running) < processes and not solution.limit_reached():
+                subtree = pending.pop(0)
+                budget = None if solution.node_budget is None else solution.node_budget - statistics.nodes
+                running[pool.submit(_explore_subtree, subtree, solution.deadline, budget)] = sense * subtree[1]
+
+            # Ask a busy worker to share its open nodes if some worker is idle
+            donate.value = 1 if not pending and 0 < len(running) < processes else 0
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                del running[future]
+                worker_solution, worker_bound, open_nodes, worker_statistics = future.result()
+                statistics.merge(worker_statistics)
+                pending += open_nodes
+                if worker_bound < upper_bound:
+                    optimal_solution, upper_bound = worker_solution, worker_bound
+                    bound = min([sense * subtree[1] for subtree in pending] + list(running.values()), default=upper_bound)
+                    statistics.sample("incumbent", len(pending) + len(running), upper_bound, bound)
+
+    solution.conclude(upper_bound, min((sense * subtree[1] for subtree in pending), default=INFINITY), len(pending))
+    return postsolve_solution(postsolve, optimal_solution), sense * upper_bound
+
+if __name__ == '__main__':
+
+    # Measure time
+    import time
+    start_time = time.time()
+
+    sol = Solution(ProblemType.MAXIMIZATION, VariableSelectionStrategy.LECTURE)
+    optimal_solution, optimal_objective_value = parallel_branch_and_bound(sol, "knapsack_students.mps")
+
+    print("Optimal solution: ", optimal_solution)
+    print("Optimal objective value: ", optimal_objective_value)
+    print("--- %s seconds ---" % (time.time() - start_time))
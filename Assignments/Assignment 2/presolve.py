@@ -0,0 +1,266 @@
+from mip import *
+import math
+import numpy as np
+from typing import List, Optional, Tuple
+from problem import ProblemData
+from lp_arrays import round_integers
+
+# Maximum number of presolve rounds
+PRESOLVE_ROUNDS = 20
+
+# Feasibility tolerance
+EPSILON = 1e-6
+
+# Bounds of continuous variables are only tightened by at least this much (relative)
+MIN_TIGHTENING = 1e-3
+
+class Postsolve:
+    """
+    Maps solutions of the presolved model back to the variables of the original model:
+    the kept variables are copied in their original position, the removed ones take
+    the value they were fixed to.
+    """
+
+    def __init__(self, n: int, kept: np.ndarray, fixed: np.ndarray, integer: np.ndarray):
+        """
+        Constructor of the postsolve.
+        Args:
+            n (int): Number of variables of the original model.
+            kept (np.ndarray): Original index of every variable of the presolved model.
+            fixed (np.ndarray): Value of every original variable (used for the removed ones).
+            integer (np.ndarray): Integer variable mask of the original model.
+        """
+        self.n = n
+        self.kept = kept
+        self.fixed = fixed
+        self.integer = integer
+
+    def solution(self, solution: List[float]) -> List[float]:
+        """
+        Maps a solution of the presolved model to the original model.
+        Args:
+            solution (List[float]): Value of every variable of the presolved model (empty if there is none).
+        Returns:
+            List[float]: Value of every variable of the original model, ints for the integer ones (empty if there is none).
+        """
+        if len(solution) == 0:
+            return []
+        values = self.fixed.copy()
+        values[self.kept] = solution
+        return round_integers(values, self.integer)
+
+    def index(self, idx: int) -> int:
+        """Returns the original index of a variable of the presolved model."""
+        return int(self.kept[idx])
+
+class Presolve:
+    """
+    Presolve of an (M)ILP before the Branch & Bound. Every round:
+      - computes the minimum and maximum activity of every row from the bounds, detects
+        infeasible rows and removes redundant ones,
+      - turns rows with a single free variable into bounds of that variable,
+      - tightens the bounds of the variables of every row from the activity of the others,
+      - rounds the bounds of the integer variables,
+      - fixes variables by dual arguments: a variable whose objective prefers its lower (upper)
+        bound and that no row stops from decreasing (increasing) is fixed to that bound.
+    Fixed variables are removed from the presolved model and restored by the Postsolve.
+    """
+
+    def __init__(self, m: Model, sense: int, data: ProblemData = None):
+        """
+        Reads the arrays of the model.
+        Args:
+            m (Model): The model.
+            sense (int): 1 for minimization, -1 for maximization.
+            data (ProblemData): Arrays of the model (read from the model if None).
+        """
+        self.model = m
+        self.sense = sense
+        self.data = data if data is not None else ProblemData(m)
+        self.lb = self.data.lb.copy()
+        self.ub = self.data.ub.copy()
+        self.rows_alive = np.ones(self.data.m, dtype=bool)
+        self.infeasible = False
+
+    def row(self, i: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the columns and coefficients of row i."""
+        data = self.data
+        return data.indices[data.indptr[i]:data.indptr[i+1]], data.data[data.indptr[i]:data.indptr[i+1]]
+
+    def set_lb(self, j: int, value: float) -> bool:
+        """Raises the lower bound of variable j (rounded for integer variables). Returns True if it changed."""
+        if self.data.integer[j]:
+            value = math.ceil(value - EPSILON)
+        elif value - self.lb[j] <= MIN_TIGHTENING * max(1, abs(value)):
+            return False
+        if value <= self.lb[j]:
+            return False
+        self.lb[j] = value
+        if self.lb[j] > self.ub[j] + EPSILON:
+            self.infeasible = True
+        return True
+
+    def set_ub(self, j: int, value: float) -> bool:
+        """Lowers the upper bound of variable j (rounded for integer variables). Returns True if it changed."""
+        if self.data.integer[j]:
+            value = math.floor(value + EPSILON)
+        elif self.ub[j] - value <= MIN_TIGHTENING * max(1, abs(value)):
+            return False
+        if value >= self.ub[j]:
+            return False
+        self.ub[j] = value
+        if self.lb[j] > self.ub[j] + EPSILON:
+            self.infeasible = True
+        return True
+
+    def row_round(self, i: int) -> bool:
+        """
+        Presolves row i: infeasibility, redundancy, singleton and bound tightening.
+        Returns:
+            bool: True if some bound changed or the row was removed.
+        """
+        data = self.data
+        columns, a = self.row(i)
+        lo = np.where(a > 0, a * self.lb[columns], a * self.ub[columns])
+        hi = np.where(a > 0, a * self.ub[columns], a * self.lb[columns])
+        min_activity, max_activity = lo.sum(), hi.sum()
+        row_lb, row_ub = data.row_lb[i], data.row_ub[i]
+
+        if min_activity > row_ub + EPSILON or max_activity < row_lb - EPSILON:
+            self.infeasible = True
+            return False
+        if min_activity >= row_lb - EPSILON and max_activity <= row_ub + EPSILON:
+            self.rows_alive[i] = False
+            return True
+
+        free = self.lb[columns] < self.ub[columns]
+        if free.sum() == 1:
+            # Singleton: a_k x_k + fixed part within the sides
+            k = int(np.flatnonzero(free)[0])
+            j, coefficient = columns[k], a[k]
+            rest = lo[~free].sum()
+            lower, upper = (row_lb - rest) / coefficient, (row_ub - rest) / coefficient
+            if coefficient < 0:
+                lower, upper = upper, lower
+            if np.isfinite(lower):
+                self.set_lb(j, lower)
+            if np.isfinite(upper):
+                self.set_ub(j, upper)
+            self.rows_alive[i] = False
+            return True
+
+        # Bound tightening from the activity of the other variables (at most one infinite contribution)
+        changed = False
+        infinite_lo, infinite_hi = np.isinf(lo), np.isinf(hi)
+        finite_lo, finite_hi = lo[~infinite_lo].sum(), hi[~infinite_hi].sum()
+        for k, (j, coefficient) in enumerate(zip(columns, a)):
+            if np.isfinite(row_ub) and infinite_lo.sum() - infinite_lo[k] == 0:
+                residual = finite_lo - (0 if infinite_lo[k] else lo[k])
+                bound = (row_ub - residual) / coefficient
+                changed |= self.set_ub(j, bound) if coefficient > 0 else self.set_lb(j, bound)
+            if np.isfinite(row_lb) and infinite_hi.sum() - infinite_hi[k] == 0:
+                residual = finite_hi - (0 if infinite_hi[k] else hi[k])
+                bound = (row_lb - residual) / coefficient
+                changed |= self.set_lb(j, bound) if coefficient > 0 else self.set_ub(j, bound)
+        return changed
+
+    def dual_fixing(self) -> bool:
+        """
+        Fixes the free variables that can move towards their better bound without violating any row.
+        Returns:
+            bool: True if some variable was fixed.
+        """
+        data = self.data
+        alive = self.rows_alive[data.rows]
+        positive, negative = data.data > 0, data.data < 0
+        has_lb = np.isfinite(data.row_lb)[data.rows] & alive
+        has_ub = np.isfinite(data.row_ub)[data.rows] & alive
+        down = np.bincount(data.indices, weights=(positive & has_lb) | (negative & has_ub), minlength=data.n)
+        up = np.bincount(data.indices, weights=(positive & has_ub) | (negative & has_lb), minlength=data.n)
+        c = self.sense * data.c
+        free = self.lb < self.ub
+
+        to_lb = free & (c >= 0) & (down == 0) & np.isfinite(self.lb)
+        to_ub = free & ~to_lb & (c <= 0) & (up == 0) & np.isfinite(self.ub)
+        self.ub[to_lb] = self.lb[to_lb]
+        self.lb[to_ub] = self.ub[to_ub]
+        return bool(to_lb.any() or to_ub.any())
+
+    def run(self) -> bool:
+        """
+        Runs the presolve rounds until nothing changes.
+        Returns:
+            bool: False if the problem was found to be infeasible.
+        """
+        integer = self.data.integer
+        self.lb[integer] = np.ceil(self.lb[integer] - EPSILON)
+        self.ub[integer] = np.floor(self.ub[integer] + EPSILON)
+        if np.any(self.lb > self.ub + EPSILON):
+            return False
+
+        for _ in range(PRESOLVE_ROUNDS):
+            changed = False
+            for i in np.flatnonzero(self.rows_alive):
+                changed |= self.row_round(i)
+                if self.infeasible:
+                    return False
+            changed |= self.dual_fixing()
+            if not changed:
+                break
+        return True
+
+    def reduced_model(self) -> Tuple[Model, ProblemData, Postsolve]:
+        """
+        Builds the presolved model: the variables that are not fixed and the rows that are not
+        redundant, with the contribution of the fixed variables moved to the row sides and the
+        objective constant.
+        Returns:
+            Tuple[Model, ProblemData, Postsolve]: The presolved model, its arrays and its postsolve.
+        """
+        m, data = self.model, self.data
+        fixed = self.lb >= self.ub
+
+        # Keep a variable (declared integer, if there are any) when all of them are fixed, so that the
+        # model is not empty and the integer mask is not lost
+        if not (~fixed).any() or (data.declared.any() and not (data.declared & ~fixed).any()):
+            fixed[np.flatnonzero(data.declared)[0] if data.declared.any() else 0] = False
+        values = np.where(fixed, self.lb, 0.0)
+        kept = np.flatnonzero(~fixed)
+        rows = np.flatnonzero(self.rows_alive)
+
+        # Entries of the kept rows and columns, renumbered
+        column_index = np.full(data.n, -1)
+        column_index[kept] = np.arange(len(kept))
+        row_index = np.full(data.m, -1)
+        row_index[rows] = np.arange(len(rows))
+        entries = self.rows_alive[data.rows] & ~fixed[data.indices]
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(row_index[data.rows[entries]], minlength=len(rows)), out=indptr[1:])
+        constant = np.bincount(data.rows, weights=data.data * values[data.indices], minlength=data.m)[rows]
+
+        reduced = ProblemData.from_arrays(data.c[kept], data.const + float(np.dot(data.c, values)),
+                                          self.lb[kept], self.ub[kept], data.declared[kept],
+                                          indptr, column_index[data.indices[entries]], data.data[entries],
+                                          data.row_lb[rows] - constant, data.row_ub[rows] - constant,
+                                          [data.names[j] for j in kept], [data.row_names[i] for i in rows])
+        return reduced.model(m.sense, m.solver_name), reduced, Postsolve(data.n, kept, values, data.integer)
+
+def postsolve_solution(postsolve: Optional[Postsolve], solution: List[float]) -> List[float]:
+    """Maps a solution of the presolved model back to the original model (if there was a presolve)."""
+    return solution if postsolve is None else postsolve.solution(solution)
+
+def presolve(m: Model, sense: int, data: ProblemData = None) -> Optional[Tuple[Model, ProblemData, Postsolve]]:
+    """
+    Presolves a model (see Presolve).
+    Args:
+        m (Model): The model, it is not modified.
+        sense (int): 1 for minimization, -1 for maximization.
+        data (ProblemData): Arrays of the model (read from the model if None).
+    Returns:
+        Optional[Tuple[Model, ProblemData, Postsolve]]: The presolved model, its arrays and its
+        postsolve, or None if the problem is infeasible.
+    """
+    reductions = Presolve(m, sense, data)
+    if not reductions.run():
+        return None
+    return reductions.reduced_model()
@@ -0,0 +1,201 @@
+from mip import *
+import hashlib
+import numpy as np
+from lp_arrays import integer_mask_of
+
+# Bounds and sides at least this large are infinite (python-mip stores INF as the largest float)
+INFINITE_BOUND = 1e20
+
+def _finite(values: np.ndarray) -> np.ndarray:
+    """Replaces huge bounds by +-infinity."""
+    values = np.asarray(values, dtype=np.float64)
+    return np.where(values >= INFINITE_BOUND, np.inf, np.where(values <= -INFINITE_BOUND, -np.inf, values))
+
+class ProblemData:
+    """
+    Arrays of a (M)ILP model, read once so that candidate solutions can be checked
+    and evaluated without going through the solver. The constraint matrix is stored
+    row-wise (CSR): the entries of row i are data[indptr[i]:indptr[i+1]], in the
+    columns indices[indptr[i]:indptr[i+1]].
+
+    Attributes:
+        n (int): Number of variables.
+        m (int): Number of constraints.
+        c (np.ndarray): Objective coefficients.
+        const (float): Objective constant.
+        lb, ub (np.ndarray): Bounds of the variables (of the model when it was read).
+        row_lb, row_ub (np.ndarray): Sides of the constraints, row_lb <= A x <= row_ub.
+        declared (np.ndarray): Mask of the variables declared integer.
+        integer (np.ndarray): Integer variable mask (see integer_mask).
+        names, row_names (List[str]): Names of the variables and the constraints.
+    """
+
+    def __init__(self, model: Model):
+        """
+        Reads the arrays of the model.
+        Args:
+            model (Model): The model.
+        """
+        n = model.num_cols
+        c = np.zeros(n)
+        for x, coefficient in model.objective.expr.items():
+            c[x.idx] = coefficient
+
+        indptr, indices, data = [0], [], []
+        row_lb, row_ub = np.full(model.num_rows, -np.inf), np.full(model.num_rows, np.inf)
+        for i, constr in enumerate(model.constrs):
+            expr = constr.expr
+            for x, coefficient in expr.expr.items():
+                # Explicit zeros are kept by python-mip, they are not entries of the matrix
+                if coefficient == 0:
+                    continue
+                indices.append(x.idx)
+                data.append(coefficient)
+            indptr.append(len(indices))
+            rhs = -expr.const
+            if expr.sense in ("<", "="):
+                row_ub[i] = rhs
+            if expr.sense in (">", "="):
+                row_lb[i] = rhs
+
+        self.set_arrays(c, model.objective.const, [x.lb for x in model.vars], [x.ub for x in model.vars],
+                        np.array([x.var_type != CONTINUOUS for x in model.vars], dtype=bool),
+                        indptr, indices, data, row_lb, row_ub,
+                        [x.name for x in model.vars], [constr.name for constr in model.constrs])
+
+    @classmethod
+    def from_arrays(cls, c, const, lb, ub, declared, indptr, indices, data, row_lb, row_ub, names=None, row_names=None) -> "ProblemData":
+        """
+        Builds the arrays of a problem without a model (see the attributes of the class).
+        Names that are not given are generated (C0, C1, ... and R0, R1, ...).
+        Returns:
+            ProblemData: The problem.
+        """
+        problem = cls.__new__(cls)
+        problem.set_arrays(c, const, lb, ub, declared, indptr, indices, data, row_lb, row_ub, names, row_names)
+        return problem
+
+    def set_arrays(self, c, const, lb, ub, declared, indptr, indices, data, row_lb, row_ub, names, row_names):
+        """Sets the arrays of the problem (see the attributes of the class)."""
+        self.c = np.asarray(c, dtype=np.float64)
+        self.n = len(self.c)
+        self.const = float(const)
+        self.lb = _finite(lb)
+        self.ub = _finite(ub)
+        self.declared = np.asarray(declared, dtype=bool)
+        self.integer = integer_mask_of(self.declared)
+
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.data = np.asarray(data, dtype=np.float64)
+        self.m = len(self.indptr) - 1
+        self.rows = np.repeat(np.arange(self.m), np.diff(self.indptr))
+        self.row_lb = _finite(row_lb)
+        self.row_ub = _finite(row_ub)
+        self.names = [str(name) for name in names] if names is not None else ["C%d" % j for j in range(self.n)]
+        self.row_names = [str(name) for name in row_names] if row_names is not None else ["R%d" % i for i in range(self.m)]
+
+    def model(self, sense: str = MINIMIZE, solver_name: str = CBC) -> Model:
+        """
+        Builds a mip model of the problem. A constraint with two different finite sides becomes
+        two constraints, the second one named after the first with the suffix _lb.
+        Args:
+            sense (str): Sense of the model (MINIMIZE or MAXIMIZE).
+            solver_name (str): Solver of the model.
+        Returns:
+            Model: The model.
+        """
+        m = Model(sense=sense, solver_name=solver_name)
+        m.verbose = 0
+        variables = [m.add_var(name=self.names[j], lb=self.lb[j] if np.isfinite(self.lb[j]) else -INF,
+                               ub=self.ub[j] if np.isfinite(self.ub[j]) else INF,
+                               var_type=INTEGER if self.declared[j] else CONTINUOUS) for j in range(self.n)]
+
+        for i in range(self.m):
+            start, end = self.indptr[i], self.indptr[i+1]
+            expr = xsum(float(coefficient) * variables[j] for j, coefficient in zip(self.indices[start:end], self.data[start:end]))
+            row_lb, row_ub = self.row_lb[i], self.row_ub[i]
+            if row_lb == row_ub:
+                m.add_constr(expr == row_ub, name=self.row_names[i])
+            else:
+                if np.isfinite(row_ub):
+                    m.add_constr(expr <= row_ub, name=self.row_names[i])
+                if np.isfinite(row_lb):
+                    m.add_constr(expr >= row_lb, name=self.row_names[i] + ("_lb" if np.isfinite(row_ub) else ""))
+
+        m.objective = xsum(float(self.c[j]) * variables[j] for j in np.flatnonzero(self.c)) + self.const
+        return m
+
+    def digest(self) -> str:
+        """
+        Returns a digest of the arrays of the problem (objective, bounds, integrality and constraints),
+        which tells whether two problems are the same.
+        Returns:
+            str: The hexadecimal SHA-1 digest.
+        """
+        sha1 = hashlib.sha1()
+        for array in (self.c, np.array([self.const]), self.lb, self.ub, self.declared,
+                      self.indptr, self.indices, self.data, self.row_lb, self.row_ub):
+            sha1.update(np.ascontiguousarray(array).tobytes())
+        return sha1.hexdigest()
+
+    def activity(self, x: np.ndarray) -> np.ndarray:
+        """
+        Computes A x.
+        Args:
+            x (np.ndarray): Value of every variable.
+        Returns:
+            np.ndarray: Activity of every constraint.
+        """
+        return np.bincount(self.rows, weights=self.data * x[self.indices], minlength=self.m)
+
+    def objective(self, x: np.ndarray) -> float:
+        """
+        Evaluates the objective function.
+        Args:
+            x (np.ndarray): Value of every variable.
+        Returns:
+            float: c x + const.
+        """
+        return float(np.dot(self.c, x)) + self.const
+
+    def is_feasible(self, x: np.ndarray, lb: np.ndarray, ub: np.ndarray, epsilon: float = 1e-6) -> bool:
+        """
+        Checks the constraints and the given bounds.
+        Args:
+            x (np.ndarray): Value of every variable.
+            lb, ub (np.ndarray): Bounds of the variables.
+            epsilon (float): Feasibility tolerance.
+        Returns:
+            bool: True if x is feasible.
+        """
+        if np.any(x < lb - epsilon) or np.any(x > ub + epsilon):
+            return False
+        activity = self.activity(x)
+        return not (np.any(activity < self.row_lb - epsilon) or np.any(activity > self.row_ub + epsilon))
+
+    def locks(self):
+        """
+        Counts the down and up locks of every variable: the constraints that may become
+        violated when the variable decreases (down) or increases (up).
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The down and up locks of every variable.
+        """
+        has_lb = np.isfinite(self.row_lb)[self.rows]
+        has_ub = np.isfinite(self.row_ub)[self.rows]
+        positive = self.data > 0
+        negative = self.data < 0
+        down = np.bincount(self.indices, weights=(positive & has_lb) | (negative & has_ub), minlength=self.n)
+        up = np.bincount(self.indices, weights=(positive & has_ub) | (negative & has_lb), minlength=self.n)
+        return down.astype(np.int64), up.astype(np.int64)
+
+    def column_rows(self):
+        """
+        Returns the constraint matrix column-wise: the rows and coefficients of every variable.
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: Column pointers, row indices and coefficients.
+        """
+        order = np.argsort(self.indices, kind='stable')
+        colptr = np.zeros(self.n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.indices, minlength=self.n), out=colptr[1:])
+        return colptr, self.rows[order], self.data[order]
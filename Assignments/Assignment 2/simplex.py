@@ -0,0 +1,448 @@
+from mip import *
+import math
+import numpy as np
+from enum import Enum, unique
+from typing import List, Optional
+from problem import ProblemData, INFINITE_BOUND
+
+# Tolerances of the simplex
+PRIMAL_EPSILON = 1e-7
+DUAL_EPSILON = 1e-9
+PIVOT_EPSILON = 1e-9
+
+# The basis inverse is recomputed from scratch after this many pivots
+REFACTOR_FREQUENCY = 100
+
+# Nonbasic variables whose reduced cost asks for an infinite bound are put at this artificial bound
+ARTIFICIAL_BOUND = 1e7
+
+# Pivots allowed per solve (times the number of columns) before giving up
+MAX_PIVOTS = 20
+
+@unique
+class RelaxationBackend(Enum):
+    # optimize(relax=True) of the solver of the model (CBC)
+    SOLVER = 1
+    # In-process bounded dual simplex (DualSimplex), for small and medium models
+    SIMPLEX = 2
+
+def _bound(value: float) -> float:
+    """Replaces a huge bound by +-infinity."""
+    return value if -INFINITE_BOUND < value < INFINITE_BOUND else math.copysign(math.inf, value)
+
+class DualSimplex:
+    """
+    Bounded-variable dual simplex on dense NumPy arrays. The LP
+
+        min c x   s.t.   row_lb <= A x <= row_ub,   lb <= x <= ub
+
+    is written as [A -I] z = 0 over the structural variables and the row activities
+    z = (x, r), every one with its own bounds. The basis (and its inverse) is kept between
+    solves, so after a bound change only the pivots that repair the primal feasibility
+    of the basis are needed, which is the situation of a child node in the Branch & Bound.
+
+    Nonbasic variables sit at the bound their reduced cost asks for; when that bound is
+    infinite an artificial bound is used instead and removed at the end. Solves that would
+    need more than that (unbounded LPs or an infeasibility that depends on an artificial
+    bound) and solves that run out of pivots are reported as unresolved (None).
+    """
+
+    def __init__(self, A: np.ndarray, c: np.ndarray, lb: np.ndarray, ub: np.ndarray, row_lb: np.ndarray, row_ub: np.ndarray):
+        """
+        Constructor of the simplex.
+        Args:
+            A (np.ndarray): Dense constraint matrix.
+            c (np.ndarray): Objective coefficients (minimization).
+            lb, ub (np.ndarray): Bounds of the variables (+-infinity when there is none).
+            row_lb, row_ub (np.ndarray): Sides of the constraints (+-infinity when there is none).
+        """
+        self.n = A.shape[1]
+        self.A = np.array(A, dtype=np.float64)
+        self.cost = np.concatenate((c, np.zeros(A.shape[0])))
+        self.lower = np.concatenate((lb, row_lb)).astype(np.float64)
+        self.upper = np.concatenate((ub, row_ub)).astype(np.float64)
+        self.build()
+        self.slack_basis()
+
+    @property
+    def m(self) -> int:
+        return self.A.shape[0]
+
+    def build(self):
+        """Builds the matrix [A -I] of the structural variables and the row activities."""
+        self.M = np.hstack((self.A, -np.eye(self.m)))
+
+    def slack_basis(self):
+        """Starts from the basis of the row activities, whose inverse is -I."""
+        self.basic = np.arange(self.n, self.n + self.m)
+        self.Binv = -np.eye(self.m)
+        self.x = np.zeros(self.n + self.m)
+        self.at_upper = np.zeros(self.n + self.m, dtype=bool)
+        self.pivots = 0
+        # Reduced costs of the last optimal solution
+        self.d = np.zeros(self.n + self.m)
+
+    ####################
+    # Modifications    #
+    ####################
+
+    def set_objective(self, c: np.ndarray):
+        """Sets the objective coefficients (the basis stays, the next solve starts from it)."""
+        self.cost[:self.n] = c
+
+    def add_row(self, a: np.ndarray, row_lb: float, row_ub: float):
+        """
+        Adds the constraint row_lb <= a x <= row_ub. Its activity enters the basis, so the
+        basis stays dual feasible and the inverse is extended without refactoring:
+        the inverse of [[B, 0], [a_B, -1]] is [[B^-1, 0], [a_B B^-1, -1]].
+        """
+        m, n = self.m, self.n
+        a_B = np.concatenate((a, np.zeros(m)))[self.basic]
+        Binv = np.zeros((m + 1, m + 1))
+        Binv[:m, :m] = self.Binv
+        Binv[m, :m] = a_B @ self.Binv
+        Binv[m, m] = -1
+        self.Binv = Binv
+
+        self.A = np.vstack((self.A, a))
+        self.cost = np.append(self.cost, 0.0)
+        self.lower = np.append(self.lower, row_lb)
+        self.upper = np.append(self.upper, row_ub)
+        self.x = np.append(self.x, 0.0)
+        self.at_upper = np.append(self.at_upper, False)
+        self.basic = np.append(self.basic, n + m)
+        self.build()
+
+    def remove_rows(self, rows: List[int]):
+        """
+        Removes constraints. When the activities of all of them are basic, the inverse is kept by
+        dropping their rows and columns; otherwise the basis restarts from the row activities.
+        """
+        n = self.n
+        keep = np.setdiff1d(np.arange(self.m), rows)
+        activities = np.array(rows) + n
+        positions = np.flatnonzero(np.isin(self.basic, activities))
+        kept_columns = np.concatenate((np.arange(n), keep + n))
+
+        self.A = self.A[keep]
+        self.cost = self.cost[kept_columns]
+        self.lower = self.lower[kept_columns]
+        self.upper = self.upper[kept_columns]
+        self.x = self.x[kept_columns]
+        self.at_upper = self.at_upper[kept_columns]
+        self.build()
+
+        if len(positions) == len(rows):
+            # New column index of every kept variable
+            index = np.full(n + self.m + len(rows), -1)
+            index[kept_columns] = np.arange(len(kept_columns))
+            basic_positions = np.setdiff1d(np.arange(len(self.basic)), positions)
+            self.Binv = self.Binv[np.ix_(basic_positions, keep)]
+            self.basic = index[self.basic[basic_positions]]
+        else:
+            self.slack_basis()
+
+    ####################
+    # Solve            #
+    ####################
+
+    def refactor(self):
+        """Recomputes the basis inverse and the reduced costs."""
+        self.Binv = np.linalg.inv(self.M[:, self.basic])
+        self.pivots = 0
+
+    def reduced_costs(self) -> np.ndarray:
+        """Returns the reduced costs of all variables for the current basis (zero for the basic ones)."""
+        d = self.cost - (self.cost[self.basic] @ self.Binv) @ self.M
+        d[self.basic] = 0
+        return d
+
+    def place_nonbasic(self, d: np.ndarray) -> np.ndarray:
+        """
+        Puts every nonbasic variable at the bound its reduced cost asks for (which makes the basis dual
+        feasible), keeping its side when the reduced cost is zero.
+        Returns:
+            np.ndarray: Mask of the variables at an artificial bound.
+        """
+        nonbasic = np.ones(len(d), dtype=bool)
+        nonbasic[self.basic] = False
+        has_lower, has_upper = np.isfinite(self.lower), np.isfinite(self.upper)
+
+        upper = np.where(d < -DUAL_EPSILON, True, np.where(d > DUAL_EPSILON, False, self.at_upper))
+        # Without a reduced cost preference, use the finite bound
+        upper = np.where((np.abs(d) <= DUAL_EPSILON) & ~(upper & has_upper | ~upper & has_lower), has_upper, upper)
+        self.at_upper = upper & nonbasic
+
+        artificial = nonbasic & np.where(upper, ~has_upper, ~has_lower) & (np.abs(d) > DUAL_EPSILON)
+        free = nonbasic & ~has_lower & ~has_upper & (np.abs(d) <= DUAL_EPSILON)
+        values = np.where(upper, self.upper, self.lower)
+        values = np.where(artificial, np.where(upper, ARTIFICIAL_BOUND, -ARTIFICIAL_BOUND), values)
+        values[free] = 0
+        self.x[nonbasic] = values[nonbasic]
+        return artificial
+
+    def solve(self) -> Optional[OptimizationStatus]:
+        """
+        Solves the LP from the current basis.
+        Returns:
+            Optional[OptimizationStatus]: OPTIMAL or INFEASIBLE, None if the simplex could not decide.
+        """
+        d = self.reduced_costs()
+        artificial = self.place_nonbasic(d)
+        nonbasic = np.ones(len(d), dtype=bool)
+        nonbasic[self.basic] = False
+
+        for _ in range(MAX_PIVOTS * (self.n + self.m)):
+            # Primal values of the basic variables
+            x_N = np.where(nonbasic, self.x, 0)
+            x_B = -self.Binv @ (self.M @ x_N)
+            self.x[self.basic] = x_B
+
+            # Leaving variable: the largest violation of a bound
+            lower, upper = self.lower[self.basic], self.upper[self.basic]
+            tolerance = PRIMAL_EPSILON * (1 + np.abs(np.where(x_B < lower, lower, np.where(x_B > upper, upper, 0))))
+            below, above = lower - x_B, x_B - upper
+            violation = np.maximum(below, above)
+            violation[np.isnan(violation)] = 0
+            r = int(np.argmax(violation - tolerance)) if len(violation) > 0 else -1
+            if r < 0 or violation[r] <= tolerance[r]:
+                if not artificial.any():
+                    self.d = d
+                    return OptimizationStatus.OPTIMAL
+                # The variables at an artificial bound with a zero reduced cost can go to a real bound
+                movable = artificial & (np.abs(d) <= DUAL_EPSILON)
+                if not movable.any():
+                    return None
+                artificial &= ~movable
+                self.x[movable] = np.where(np.isfinite(self.lower[movable]), self.lower[movable],
+                                           np.where(np.isfinite(self.upper[movable]), self.upper[movable], 0))
+                self.at_upper[movable] = ~np.isfinite(self.lower[movable]) & np.isfinite(self.upper[movable])
+                continue
+
+            # Row r of the tableau; the leaving variable goes to the bound it violates
+            p = self.basic[r]
+            to_lower = below[r] > above[r]
+            alpha = self.Binv[r] @ self.M
+            signed = alpha if to_lower else -alpha
+            at_upper = self.at_upper & nonbasic
+            candidates = nonbasic & ((~at_upper & (signed < -PIVOT_EPSILON)) | (at_upper & (signed > PIVOT_EPSILON)))
+            if not candidates.any():
+                # Dual ray: infeasible, unless a variable at an artificial bound could move the other way
+                if np.any(artificial & (np.abs(alpha) > PIVOT_EPSILON)):
+                    return None
+                return OptimizationStatus.INFEASIBLE
+
+            # Bound flipping ratio test: the boxed variables whose breakpoints are passed flip to their other
+            # bound while the primal infeasibility of the leaving variable is not repaired; among the
+            # almost minimal ratios after that, the largest pivot enters (Harris)
+            indices = np.flatnonzero(candidates)
+            magnitude = np.abs(alpha[indices])
+            ratios = np.abs(d[indices]) / magnitude
+            order = np.argsort(ratios, kind='stable')
+            indices, magnitude, ratios = indices[order], magnitude[order], ratios[order]
+            slope = violation[r] - np.cumsum(magnitude * (self.upper[indices] - self.lower[indices]))
+            passed = int(np.searchsorted(-slope, -tolerance[r], side='left'))
+            if passed == len(indices):
+                if np.any(artificial & (np.abs(alpha) > PIVOT_EPSILON)):
+                    return None
+                return OptimizationStatus.INFEASIBLE
+            bound = ratios[passed] + DUAL_EPSILON / magnitude[passed]
+            eligible = passed + np.flatnonzero(ratios[passed:] <= bound)
+            entering = int(eligible[np.argmax(magnitude[eligible])])
+            q = int(indices[entering])
+            flipped = indices[:passed]
+            self.at_upper[flipped] = ~self.at_upper[flipped]
+            self.x[flipped] = np.where(self.at_upper[flipped], self.upper[flipped], self.lower[flipped])
+
+            # Dual update
+            theta = d[q] / alpha[q]
+            d -= theta * alpha
+            d[q] = 0
+            # Dual feasibility of the other nonbasic variables after the step (small errors are flipped to 0)
+            d[nonbasic & ~self.at_upper & (d < 0) & (d > -DUAL_EPSILON)] = 0
+            d[nonbasic & self.at_upper & (d > 0) & (d < DUAL_EPSILON)] = 0
+
+            # Basis update
+            column = self.Binv @ self.M[:, q]
+            row = self.Binv[r] / column[r]
+            self.Binv -= np.outer(column, row)
+            self.Binv[r] = row
+            self.basic[r] = q
+            nonbasic[q], nonbasic[p] = False, True
+            artificial[q] = False
+            self.at_upper[q] = False
+            self.at_upper[p] = not to_lower
+            self.x[p] = self.lower[p] if to_lower else self.upper[p]
+
+            self.pivots += 1
+            if self.pivots >= REFACTOR_FREQUENCY:
+                self.refactor()
+                d = self.reduced_costs()
+        return None
+
+class SimplexVar:
+    """
+    Variable of a SimplexModel: reads and writes its bounds in both the simplex and the
+    underlying mip variable, and builds linear expressions like the mip variable.
+    """
+
+    __slots__ = ("var", "model")
+
+    def __init__(self, var: mip.Var, model: "SimplexModel"):
+        self.var = var
+        self.model = model
+
+    @property
+    def idx(self) -> int:
+        return self.var.idx
+
+    @property
+    def name(self) -> str:
+        return self.var.name
+
+    @property
+    def var_type(self) -> str:
+        return self.var.var_type
+
+    @property
+    def lb(self) -> float:
+        return self.var.lb
+
+    @lb.setter
+    def lb(self, value: float):
+        self.var.lb = value
+        self.model.simplex.lower[self.var.idx] = _bound(value)
+
+    @property
+    def ub(self) -> float:
+        return self.var.ub
+
+    @ub.setter
+    def ub(self, value: float):
+        self.var.ub = value
+        self.model.simplex.upper[self.var.idx] = _bound(value)
+
+    @property
+    def x(self) -> float:
+        return self.model.values[self.var.idx]
+
+    def __mul__(self, other):
+        return self.var * other
+
+    def __rmul__(self, other):
+        return other * self.var
+
+    def __add__(self, other):
+        return self.var + other
+
+    def __radd__(self, other):
+        return other + self.var
+
+    def __sub__(self, other):
+        return self.var - other
+
+    def __rsub__(self, other):
+        return other - self.var
+
+    def __neg__(self):
+        return -self.var
+
+class SimplexModel:
+    """
+    Working model of the Branch & Bound whose LP relaxations are solved by a DualSimplex
+    in the same process instead of by the solver of the mip model. It offers the part of
+    the Model interface used by the search (bounds, objective, cuts, optimize(relax=True))
+    and keeps the mip model in sync, which solves the LPs the simplex cannot decide.
+    Everything else is read from the mip model.
+    """
+
+    def __init__(self, m: Model, data: ProblemData = None):
+        """
+        Constructor of the model.
+        Args:
+            m (Model): The mip model, the LPs are built from its current bounds, objective and constraints.
+            data (ProblemData): Arrays of m (read from m if None).
+        """
+        self.model = m
+        if data is None:
+            data = ProblemData(m)
+        A = np.zeros((data.m, data.n))
+        np.add.at(A, (data.rows, data.indices), data.data)
+        self.direction = 1 if m.sense == MINIMIZE else -1
+        self.simplex = DualSimplex(A, self.direction * data.c, data.lb, data.ub, data.row_lb, data.row_ub)
+        self.const = data.const
+        self.vars = [SimplexVar(x, self) for x in m.vars]
+        # Constraints added during the search, in the order of their rows in the simplex
+        self.added: List[mip.Constr] = []
+        self.base_rows = data.m
+        self.values = np.zeros(data.n)
+        # Reduced costs of the last LP, signed for the sense of the model like those of the solver
+        self.reduced_costs = np.zeros(data.n)
+        self.objective_value = None
+        self.status = None
+        # Number of LPs the simplex left to the solver
+        self.fallbacks = 0
+
+    def __getattr__(self, name):
+        if name == "model":
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+    @property
+    def objective(self) -> LinExpr:
+        return self.model.objective
+
+    @objective.setter
+    def objective(self, objective: LinExpr):
+        self.model.objective = objective
+        c = np.zeros(self.simplex.n)
+        for x, coefficient in objective.expr.items():
+            c[x.idx] = coefficient
+        self.const = objective.const
+        self.simplex.set_objective(self.direction * c)
+
+    def add_constr(self, expr: LinExpr, name: str = "") -> mip.Constr:
+        """Adds a constraint to the simplex and the mip model."""
+        a = np.zeros(self.simplex.n)
+        for x, coefficient in expr.expr.items():
+            a[x.idx] = coefficient
+        rhs = -expr.const
+        self.simplex.add_row(a, rhs if expr.sense in (">", "=") else -np.inf, rhs if expr.sense in ("<", "=") else np.inf)
+        constr = self.model.add_constr(expr, name=name)
+        self.added.append(constr)
+        return constr
+
+    def remove(self, constrs: List[mip.Constr]):
+        """Removes constraints added with add_constr from the simplex and the mip model."""
+        positions = [k for k, constr in enumerate(self.added) if any(constr is other for other in constrs)]
+        self.simplex.remove_rows([self.base_rows + k for k in positions])
+        self.added = [constr for k, constr in enumerate(self.added) if k not in set(positions)]
+        self.model.remove(constrs)
+
+    def optimize(self, relax: bool = True) -> OptimizationStatus:
+        """
+        Solves the LP relaxation with the dual simplex, warm from the basis of the last solve.
+        When the simplex cannot decide, the LP is solved by the solver of the mip model.
+        Args:
+            relax (bool): Only LP relaxations are supported.
+        Returns:
+            OptimizationStatus: Status of the LP.
+        """
+        simplex = self.simplex
+        status = simplex.solve()
+        if status is None:
+            self.fallbacks += 1
+            simplex.slack_basis()
+            status = self.model.optimize(relax=True)
+            optimal = status == OptimizationStatus.OPTIMAL
+            self.values = np.array([x.x for x in self.model.vars], dtype=np.float64) if optimal else np.zeros(simplex.n)
+            self.reduced_costs = np.array([x.rc for x in self.model.vars], dtype=np.float64) if optimal else np.zeros(simplex.n)
+            self.objective_value = self.model.objective_value if optimal else None
+        elif status == OptimizationStatus.OPTIMAL:
+            self.values = simplex.x[:simplex.n].copy()
+            self.reduced_costs = self.direction * simplex.d[:simplex.n]
+            self.objective_value = self.direction * float(simplex.cost[:simplex.n] @ self.values) + self.const
+        else:
+            self.objective_value = None
+        self.status = status
+        return status